@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.gis.admin import GeoModelAdmin
 
-from .models import Company, Location, Opening
+from .models import Company, Location, Opening, ScrapeRun
 
 
 @admin.register(Company)
@@ -9,7 +9,8 @@ class CompanyAdmin(admin.ModelAdmin):
     date_hierarchy = 'last_updated'
     prepopulated_fields = {'name_slug': ('name',)}
     list_display = (
-        'name', 'industry', 'vacancies_url', 'last_updated', 'update_freq'
+        'name', 'industry', 'vacancies_url', 'last_updated', 'update_freq',
+        'last_full_scrape'
     )
 
 
@@ -24,4 +25,11 @@ class LocationAdmin(GeoModelAdmin):
 @admin.register(Opening)
 class OpeningAdmin(admin.ModelAdmin):
     list_display = ('role_title', 'company', 'url', 'is_remote', 'has_401k')
-    readonly_fields = ('tsdocument',)
+    readonly_fields = ('tsdocument', 'content_hash')
+
+
+@admin.register(ScrapeRun)
+class ScrapeRunAdmin(admin.ModelAdmin):
+    date_hierarchy = 'date_started'
+    list_display = ('company', 'status', 'date_started', 'date_finished')
+    list_filter = ('status',)
@@ -0,0 +1,323 @@
+"""Defines objects for benchmarking scrapers offline against recorded pages.
+
+Recorded listing and details pages for each scraper are served by a local stand-in
+HTTP server, so benchmarks never reach the network and can be compared between commits.
+"""
+import logging
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from dataclasses import asdict
+from datetime import datetime
+from functools import reduce
+from http.server import BaseHTTPRequestHandler
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.utils import timezone
+from jobs import extract
+from jobs.mocksite import LocalServer
+from jobs.models import Company, Opening
+from jobs.network import HttpCache, RateLimiter
+from jobs.scraper import Engine, SequoiaScraper, SiteScraper, WorldBankGroupScraper
+
+
+log = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'html')
+
+
+class FixtureServer(LocalServer):
+    """Local HTTP server which stands in for the careers sites of the scrapers,
+    serving recorded pages from `FIXTURES_DIR`.
+
+    Pages are served for the following paths:
+
+    - `/world-bank-group/search.aspx`: the World Bank Group results pages, with the
+      page served for POST requests determined by the pager link posted back
+    - `/world-bank-group/requisition.aspx`: the World Bank Group details page
+    - `/sequoai/jobs`: the Sequoia listings page, as rendered by a browser
+    - `/sequoai/jobs/<company>/<role>`: the Sequoia details page
+    """
+
+    def __init__(self, fixtures_dir: str = None):
+        super().__init__()
+        self.fixtures_dir = fixtures_dir or FIXTURES_DIR
+        self.pages: Dict[str, bytes] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def read_page(self, name: str) -> bytes:
+        """Returns the contents of a recorded page, None if there is no such page.
+        """
+        if name not in self.pages:
+            path = os.path.join(self.fixtures_dir, name)
+            if not os.path.exists(path):
+                return None
+
+            with open(path, 'rb') as fp:
+                self.pages[name] = fp.read()
+        return self.pages[name]
+
+    def get_page_name(self, method: str, path: str, form: Dict[str, List[str]]) -> str:
+        """Returns the name of the recorded page to be served for a request.
+
+        :param method: the HTTP method for the request
+        :type method: str
+        :param path: the requested path without the query string
+        :type path: str
+        :param form: the form data posted along with the request
+        :type form: Dict[str, List[str]]
+        :return: name of the page relative to the fixtures directory
+        :rtype: str
+        """
+        if path == '/world-bank-group/search.aspx':
+            event_target = form.get('__EVENTTARGET', [''])[0]
+            match = re.search(r'pager\$(\d+)$', event_target)
+            page_no = match.group(1) if method == 'POST' and match else '1'
+            return f'world-bank-group/search-{page_no}.html'
+        if path == '/world-bank-group/requisition.aspx':
+            return 'world-bank-group/requisition.html'
+        if path == '/sequoai/jobs':
+            return 'sequoai/jobs.html'
+        if path.startswith('/sequoai/jobs/'):
+            return 'sequoai/job.html'
+        return None
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length).decode('utf-8') if length else ''
+        path = urlsplit(handler.path).path
+
+        name = self.get_page_name(handler.command, path, parse_qs(body))
+        content = self.read_page(name) if name else None
+        with self.lock:
+            self.requests += 1
+
+        if content is None:
+            self.respond(handler, 404, b'<h1>Page not found</h1>')
+            return
+        self.respond(handler, 200, content)
+
+
+class PrerenderedSequoiaScraper(SequoiaScraper):
+    """Sequoia scraper which reads the listings page as served, since the fixture
+    server serves it already rendered. Keeps benchmarks free of a browser.
+    """
+
+    def render(self, url: str, wait_for: str = None, timeout: float = None):
+        return self.request('GET', url).html
+
+
+class StatementCounter:
+    """Counts the database statements executed on all connections, including those
+    opened by worker threads, while active.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self._install)
+        self._install(None, connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._install)
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+
+def get_peak_rss() -> float:
+    """Returns the peak resident set size of this process in megabytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def get_commit() -> str:
+    """Returns the git commit checked out, None if not within a git repository.
+    """
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=10
+        )
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+class Benchmark:
+    """Benchmarks parsing of the recorded pages and engine runs against the fixture
+    server, with all scrapers sharing a rate limiter which doesn't pace requests.
+    """
+    LISTING_PAGES = {
+        WorldBankGroupScraper.ID: [
+            f'world-bank-group/search-{n}.html' for n in range(1, 5)
+        ],
+        SequoiaScraper.ID: ['sequoai/jobs.html'],
+    }
+
+    def __init__(self, server: FixtureServer, max_in_flight: int = None):
+        self.server = server
+        self.max_in_flight = max_in_flight
+
+    def get_companies(self) -> List[Company]:
+        """Returns companies for the scrapers, with vacancies urls on the fixture server.
+        """
+        urls = {
+            WorldBankGroupScraper.ID: f'{self.server.url}/world-bank-group/search.aspx',
+            SequoiaScraper.ID: f'{self.server.url}/sequoai/jobs',
+        }
+
+        companies = []
+        for (name_slug, url) in urls.items():
+            (company, _) = Company.objects.update_or_create(
+                name_slug=name_slug,
+                defaults={
+                    'name': name_slug, 'industry': 'Benchmark', 'vacancies_url': url,
+                    'last_updated': timezone.now()
+                }
+            )
+            companies.append(company)
+        return companies
+
+    def run_parse(self, rounds: int) -> Dict[str, dict]:
+        """Returns the throughput for extracting jobs from the recorded listing pages.
+
+        :param rounds: number of times each page is parsed
+        :type rounds: int
+        :return: pages and jobs extracted per second for each scraper
+        :rtype: Dict[str, dict]
+        """
+        scrapers = {
+            WorldBankGroupScraper.ID: WorldBankGroupScraper(self.server.url),
+            SequoiaScraper.ID: SequoiaScraper(self.server.url),
+        }
+        extractors = {
+            WorldBankGroupScraper.ID: lambda scraper, page: [
+                *scraper.get_jobs(page, '1'), *scraper.get_pagination_details(page)
+            ],
+            SequoiaScraper.ID: lambda scraper, page: [
+                job for section in scraper.SECTIONS.all(page)
+                for job in scraper._get_jobs(section, '1')
+            ],
+        }
+
+        results = {}
+        for (scraper_id, names) in self.LISTING_PAGES.items():
+            contents = [self.server.read_page(name).decode('utf-8') for name in names]
+            (pages, jobs) = (0, 0)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for content in contents:
+                    page = extract.parse_html(content)
+                    jobs += len(extractors[scraper_id](scrapers[scraper_id], page))
+                    pages += 1
+            elapsed = time.perf_counter() - start
+
+            results[scraper_id] = {
+                'pages': pages,
+                'jobs': jobs,
+                'elapsed': elapsed,
+                'pages_per_sec': pages / elapsed,
+                'jobs_per_sec': jobs / elapsed,
+            }
+        return results
+
+    def run_engine(self, name: str) -> dict:
+        """Runs the engine for all scrapers against the fixture server. The data version
+        bumped by the engine is kept within a temporary file, leaving cached search results
+        of the site valid.
+
+        :param name: name for the run within the results
+        :type name: str
+        :return: measurements for the run
+        :rtype: dict
+        """
+        companies = self.get_companies()
+        engine = Engine(
+            companies, max_in_flight=self.max_in_flight, full_scrape=True,
+            metrics_json='', metrics_textfile=''
+        )
+        engine.scrapers = {**engine.scrapers, SequoiaScraper.ID: PrerenderedSequoiaScraper}
+
+        requests_before = self.server.requests
+        with tempfile.TemporaryDirectory() as version_dir, override_settings(
+            SEARCH_DATA_VERSION_FILE=os.path.join(version_dir, 'data_version')
+        ), StatementCounter() as statements:
+            start = time.perf_counter()
+            engine.execute()
+            elapsed = time.perf_counter() - start
+
+        pages = self.server.requests - requests_before
+        total = reduce(lambda acc, item: acc + item, engine.stats.values())
+        jobs = total.created + total.updated + total.ignored + total.failed
+
+        return {
+            'name': name,
+            'elapsed': elapsed,
+            'pages': pages,
+            'pages_per_sec': pages / elapsed,
+            'jobs': jobs,
+            'jobs_per_sec': jobs / elapsed,
+            'openings': Opening.objects.count(),
+            'statements': statements.count,
+            'statements_per_opening': statements.count / jobs if jobs else None,
+            'peak_rss_mb': get_peak_rss(),
+            'stats': {scraper_id: asdict(stat) for (scraper_id, stat) in engine.stats.items()},
+            'stages': engine.metrics.to_dict(),
+        }
+
+    def run(self, runs: int = 2, parse_rounds: int = 20) -> dict:
+        """Runs the benchmark. The first engine run scrapes into an empty database, while
+        later runs find all openings known.
+
+        :param runs: number of engine runs, defaults to 2
+        :type runs: int, optional
+        :param parse_rounds: number of times each listing page is parsed, defaults to 20
+        :type parse_rounds: int, optional
+        :return: results of the benchmark
+        :rtype: dict
+        """
+        (rate_limiter, cache) = (SiteScraper.rate_limiter, SiteScraper.cache)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            SiteScraper.rate_limiter = RateLimiter(rate=1e6, burst=1000, respect_robots=False)
+            SiteScraper.cache = HttpCache(path=cache_dir)
+            try:
+                parse = self.run_parse(parse_rounds)
+                engine_runs = [
+                    self.run_engine('cold' if n == 0 else f'warm-{n}') for n in range(runs)
+                ]
+            finally:
+                (SiteScraper.rate_limiter, SiteScraper.cache) = (rate_limiter, cache)
+
+        return {
+            'commit': get_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'parse': parse,
+            'engine': engine_runs,
+        }
@@ -0,0 +1,171 @@
+"""Defines objects for checkpointing the progress of scrape runs.
+
+The progress of a scrape run is persisted for each company as the listing pages done,
+the jobs seen on those pages and the jobs whose details were processed. A run that is
+interrupted can then be resumed without listing pages done or processing details
+again.
+
+Progress is written once per listing page and once per batch of processed jobs, rather
+than once per job, as it is recorded on every run whether or not it is resumed.
+"""
+import logging
+
+from datetime import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.db import connection
+
+from jobs.models import Company, ScrapeRun, ScrapeRunPage
+
+
+log = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Records the progress of a scrape run for a company.
+
+    Listed jobs are recorded by the thread scraping listings, while processed jobs are
+    recorded by the thread persisting openings. Processed jobs are saved in batches of
+    `batch_size` jobs, and when `save` is called, with the page each job is listed on.
+    """
+
+    def __init__(self, run: ScrapeRun, batch_size: int = 100):
+        self.run = run
+        self.batch_size = batch_size
+        self.pages_done: Set[str] = set(run.pages_done)
+        self.processed_hashes: Set[str] = set()
+        self.unsaved_hashes: List[str] = []
+        self.entry_pages: Dict[str, str] = {}  # entry hash -> page number
+
+    @classmethod
+    def start(
+        cls,
+        company: Company,
+        date_started: datetime,
+        resume: bool = False,
+        batch_size: int = 100
+    ) -> 'Checkpoint':
+        """Returns the checkpoint for a new scrape run for a company, or for the last
+        unfinished run when resuming. Earlier runs for the company are discarded, their
+        pages being deleted along with them.
+
+        :param company: the company being scraped
+        :type company: Company
+        :param date_started: when the scrape run started
+        :type date_started: datetime
+        :param resume: indicates whether the last unfinished run is to be resumed,
+            defaults to False
+        :type resume: bool, optional
+        :param batch_size: number of processed jobs to save at once, defaults to 100
+        :type batch_size: int, optional
+        :return: the checkpoint for the run
+        :rtype: Checkpoint
+        """
+        runs = ScrapeRun.objects.filter(company=company)
+        run = None
+        if resume:
+            run = runs.filter(date_finished__isnull=True).order_by('-date_started').first()
+        runs.exclude(id=run.id if run else None).delete()
+
+        if not run:
+            run = ScrapeRun.objects.create(company=company, date_started=date_started)
+            return cls(run, batch_size)
+
+        log.debug(f'Resuming scrape run from {run.date_started} for {company.name} ...')
+        run.status = ScrapeRun.RUNNING
+        run.save(update_fields=['status'])
+
+        checkpoint = cls(run, batch_size)
+        for processed in run.pages.values_list('processed', flat=True):
+            checkpoint.processed_hashes.update(processed)
+        return checkpoint
+
+    def is_page_done(self, page_no: str) -> bool:
+        return page_no in self.pages_done
+
+    def is_processed(self, entry_hash: str) -> bool:
+        return entry_hash in self.processed_hashes
+
+    def get_pending(self) -> List[Tuple[dict, str, str]]:
+        """Returns jobs listed on pages done whose details were not processed, as
+        tuples of the job data, hash and page number.
+        """
+        pending = []
+        pages = self.run.pages.filter(page_no__in=self.pages_done)
+        for (page_no, jobs) in pages.values_list('page_no', 'jobs'):
+            for (data, entry_hash) in jobs:
+                if entry_hash not in self.processed_hashes:
+                    self.entry_pages[entry_hash] = page_no
+                    pending.append((data, entry_hash, page_no))
+        return pending
+
+    def record_listed(self, page_no: str, jobs: Iterable[Tuple[dict, str, str]]):
+        """Records jobs listed on a page as seen, within a single row for the page.
+
+        :param page_no: number of the page the jobs are listed on
+        :type page_no: str
+        :param jobs: listed jobs as tuples of the job data, hash and page number
+        :type jobs: Iterable[Tuple[dict, str, str]]
+        """
+        jobs = [[data, entry_hash] for (data, entry_hash, _) in jobs]
+        ScrapeRunPage.objects.bulk_create(
+            [ScrapeRunPage(run=self.run, page_no=page_no, jobs=jobs)], ignore_conflicts=True
+        )
+        for (_, entry_hash) in jobs:
+            self.entry_pages[entry_hash] = page_no
+
+    def record_page_done(self, page_no: str):
+        """Records a page as done once all the jobs listed on it have been recorded.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE jobs_scraperun SET pages_done = array_append(pages_done, %s) "
+                "WHERE id = %s;",
+                [page_no, self.run.id]
+            )
+        self.pages_done.add(page_no)
+
+    def record_processed(self, entry_hash: str):
+        """Records the details of a job as processed.
+        """
+        self.processed_hashes.add(entry_hash)
+        self.unsaved_hashes.append(entry_hash)
+        if len(self.unsaved_hashes) >= self.batch_size:
+            self.save()
+
+    def save(self):
+        """Saves jobs recorded as processed since the last save, with one update for
+        each page they are listed on.
+        """
+        if not self.unsaved_hashes:
+            return
+
+        (hashes, self.unsaved_hashes) = (self.unsaved_hashes, [])
+        pages = defaultdict(list)
+        for entry_hash in hashes:
+            page_no = self.entry_pages.get(entry_hash)
+            if page_no is not None:
+                pages[page_no].append(entry_hash)
+
+        with connection.cursor() as cursor:
+            for (page_no, page_hashes) in pages.items():
+                cursor.execute(
+                    "UPDATE jobs_scraperunpage SET processed = processed || %s::varchar[] "
+                    "WHERE run_id = %s AND page_no = %s;",
+                    [page_hashes, self.run.id, page_no]
+                )
+
+    def finish(self, status: str, date_finished: datetime = None):
+        """Records the scrape run as aborted or completed. The pages of completed runs
+        are kept until the next run for the company discards the run.
+
+        :param status: the status of the run
+        :type status: str
+        :param date_finished: when the run completed, only set for completed runs
+        :type date_finished: datetime, optional
+        """
+        self.save()
+        self.run.status = status
+        self.run.date_finished = date_finished
+        self.run.save(update_fields=['status', 'date_finished'])
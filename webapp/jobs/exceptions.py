@@ -15,3 +15,13 @@ class OpeningExistError(JobsError):
     def __init__(self, job_url):
         errmsg = f"Opening with job url already exist. Url: {job_url}"
         JobsError.__init__(self, errmsg)
+
+
+class NotModifiedError(JobsError):
+    """Error thrown when the details page for a known opening hasn't changed since it
+    was last scraped.
+    """
+
+    def __init__(self, job_url):
+        errmsg = f"Vacancy details page not modified. Url: {job_url}"
+        JobsError.__init__(self, errmsg)
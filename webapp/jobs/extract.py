@@ -0,0 +1,102 @@
+"""Defines helpers for extracting contents from scraped pages.
+
+Pages are parsed once into an lxml tree which is queried with precompiled selectors,
+returning plain strings. Text is extracted the same way `requests_html.Element.text`
+extracts it, without the overhead of wrapping every matched node in an `Element`.
+"""
+from typing import List, Optional
+
+import lxml.html
+
+from lxml import etree
+from lxml.cssselect import CSSSelector
+from lxml.html import HtmlElement
+from pyquery.text import extract_text
+from requests_html import HTMLResponse
+from w3lib.encoding import html_to_unicode
+
+
+class Selector:
+    """A css selector compiled once into an XPath expression.
+
+    Matches are made against the element queried and all its descendants, as
+    with `requests_html.Element.find`.
+    """
+
+    def __init__(self, css: str):
+        self.css = css
+        self.xpath = CSSSelector(css, translator='html')
+
+    def __repr__(self):
+        return f'<Selector {self.css!r}>'
+
+    def all(self, element: HtmlElement) -> List[HtmlElement]:
+        """Returns all elements matching the selector.
+
+        :param element: the element to query
+        :type element: HtmlElement
+        :return: matching elements in document order
+        :rtype: List[HtmlElement]
+        """
+        return self.xpath(element)
+
+    def first(self, element: HtmlElement) -> Optional[HtmlElement]:
+        """Returns the first element matching the selector.
+
+        :param element: the element to query
+        :type element: HtmlElement
+        :return: first matching element or None if there are no matches
+        :rtype: Optional[HtmlElement]
+        """
+        found = self.xpath(element)
+        return found[0] if found else None
+
+
+def parse_html(html: str) -> HtmlElement:
+    """Returns the root element for a html document.
+
+    :param html: the html document to parse
+    :type html: str
+    :return: the document root element
+    :rtype: HtmlElement
+    """
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # unicode strings with an encoding declaration are rejected by lxml
+        return lxml.html.document_fromstring(html.encode('utf-8'))
+
+
+def parse_response(res: HTMLResponse) -> HtmlElement:
+    """Returns the root element for the html document within a response, decoded as
+    `requests_html` would decode it.
+
+    :param res: the response to parse
+    :type res: HTMLResponse
+    :return: the document root element
+    :rtype: HtmlElement
+    """
+    encoding = html_to_unicode(res.encoding, res.content)[0]
+    return parse_html(res.content.decode(encoding, errors='replace'))
+
+
+def text(element: HtmlElement) -> str:
+    """Returns the text content of an element.
+
+    :param element: the element whose text is to be returned
+    :type element: HtmlElement
+    :return: the element text with whitespace squashed and a newline between blocks
+    :rtype: str
+    """
+    return extract_text(element)
+
+
+def outer_html(element: HtmlElement) -> str:
+    """Returns the html markup for an element.
+
+    :param element: the element whose markup is to be returned
+    :type element: HtmlElement
+    :return: the element markup including its own tag
+    :rtype: str
+    """
+    return etree.tostring(element, encoding='unicode').strip()
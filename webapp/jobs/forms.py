@@ -5,11 +5,21 @@ from django.db import models
 from django.core.exceptions import ValidationError
 
 from jobs.models import Location
+from jobs.paging import InvalidCursor, decode_cursor
 
 
 class PagingForm(forms.Form):
-    page = forms.IntegerField(required=False, min_value=1)
-    page_size = forms.IntegerField(required=False)
+    after = forms.CharField(required=False, max_length=500, strip=True)
+    page_size = forms.IntegerField(required=False, min_value=1, max_value=100)
+
+    def clean_after(self):
+        after = self.cleaned_data.get('after') or None
+        if after:
+            try:
+                decode_cursor(after)
+            except InvalidCursor:
+                raise ValidationError('Invalid page')
+        return after
 
 
 class SearchForm(PagingForm):
@@ -32,7 +42,7 @@ class SearchForm(PagingForm):
         data = {
             key: get(value)
             for key, value in self.cleaned_data.items()
-            if value is not None and get(value) and key != 'page'
+            if value is not None and get(value) and key != 'after'
         }
         return urlencode(data)
 
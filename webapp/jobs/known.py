@@ -0,0 +1,163 @@
+"""Defines a compact in-memory index of the openings known before a scrape run.
+
+Entry hashes of known openings are kept as raw sha256 digests within a single sorted
+buffer and looked up by binary search, with the ids, verification times and content
+hashes of the openings kept within parallel arrays, and whether each opening was seen
+by the run kept within a bitset. An opening takes up about 80 bytes, which keeps the
+index for millions of openings within a few hundred megabytes.
+"""
+import bisect
+import hashlib
+import math
+
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+DIGEST_SIZE = 32
+
+
+def to_digest(value: str) -> bytes:
+    """Returns the raw digest for a hex encoded sha256 hash. Values which are not such
+    hashes are hashed into a digest.
+
+    :param value: the hex encoded hash
+    :type value: str
+    :return: the 32 bytes digest
+    :rtype: bytes
+    """
+    if len(value) == DIGEST_SIZE * 2:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
+
+class DigestView:
+    """Read-only sequence view of the digests within a buffer, for binary searches.
+    """
+
+    def __init__(self, buffer: bytearray):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // DIGEST_SIZE
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * DIGEST_SIZE
+        return bytes(self.buffer[start:start + DIGEST_SIZE])
+
+
+class KnownOpenings:
+    """Index of known openings by entry hash, supporting `in` checks for entry hashes.
+
+    Openings are referred to by their position within the index, as returned by
+    `find`, for reading their details and marking them seen.
+    """
+
+    def __init__(self):
+        self.digests = bytearray()
+        self.ids = array('q')
+        self.verified = array('d')
+        self.content_hashes = bytearray()
+        self.seen = bytearray()
+        # entry hashes which are not hex encoded sha256 hashes, by their digest
+        self.hashes: Dict[bytes, str] = {}
+
+    @classmethod
+    def load(
+        cls,
+        openings: Iterable[Tuple[str, int, Optional[datetime], Optional[str]]]
+    ) -> 'KnownOpenings':
+        """Returns an index of openings. Openings are best provided ordered by entry
+        hash, otherwise they are sorted once loaded.
+
+        :param openings: entry hash, id, verification time and content hash of openings
+        :type openings: Iterable[Tuple[str, int, Optional[datetime], Optional[str]]]
+        :return: index of the openings
+        :rtype: KnownOpenings
+        """
+        known = cls()
+        (previous, ordered) = (b'', True)
+        for (entry_hash, opening_id, verified, content_hash) in openings:
+            digest = to_digest(entry_hash)
+            if digest.hex() != entry_hash:
+                known.hashes[digest] = entry_hash
+            ordered = ordered and previous < digest
+            previous = digest
+
+            known.digests += digest
+            known.ids.append(opening_id)
+            known.verified.append(verified.timestamp() if verified else math.nan)
+            known.content_hashes += (
+                to_digest(content_hash) if content_hash else bytes(DIGEST_SIZE)
+            )
+
+        if not ordered:
+            known._sort()
+        known.seen = bytearray((len(known) + 7) // 8)
+        return known
+
+    def _sort(self):
+        (digests, content_hashes) = (DigestView(self.digests), DigestView(self.content_hashes))
+        order = sorted(range(len(self)), key=digests.__getitem__)
+
+        (self.digests, self.content_hashes) = (bytearray(), bytearray())
+        for index in order:
+            self.digests += digests[index]
+            self.content_hashes += content_hashes[index]
+        self.ids = array('q', (self.ids[index] for index in order))
+        self.verified = array('d', (self.verified[index] for index in order))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, entry_hash: str) -> bool:
+        return self.find(entry_hash) is not None
+
+    def find(self, entry_hash: str) -> Optional[int]:
+        """Returns the position of the opening for an entry hash, None if unknown.
+        """
+        digest = to_digest(entry_hash)
+        index = bisect.bisect_left(DigestView(self.digests), digest)
+        start = index * DIGEST_SIZE
+        if self.digests[start:start + DIGEST_SIZE] == digest:
+            return index
+        return None
+
+    def get_id(self, index: int) -> int:
+        return self.ids[index]
+
+    def get_verified(self, index: int) -> Optional[float]:
+        """Returns when the opening was last verified as a unix time, if ever.
+        """
+        verified = self.verified[index]
+        return None if math.isnan(verified) else verified
+
+    def get_content_hash(self, index: int) -> str:
+        start = index * DIGEST_SIZE
+        return self.content_hashes[start:start + DIGEST_SIZE].hex()
+
+    def set_content_hash(self, index: int, content_hash: str):
+        start = index * DIGEST_SIZE
+        self.content_hashes[start:start + DIGEST_SIZE] = to_digest(content_hash)
+
+    def mark_seen(self, index: int):
+        self.seen[index >> 3] |= 1 << (index & 7)
+
+    def is_seen(self, index: int) -> bool:
+        return bool(self.seen[index >> 3] & (1 << (index & 7)))
+
+    def count_seen(self) -> int:
+        return sum(bin(byte).count('1') for byte in self.seen)
+
+    def seen_hashes(self) -> Iterator[str]:
+        """Returns the entry hashes of openings marked seen.
+        """
+        digests = DigestView(self.digests)
+        for index in range(len(self)):
+            if self.is_seen(index):
+                digest = digests[index]
+                yield self.hashes.get(digest) or digest.hex()
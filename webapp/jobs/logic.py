@@ -1,15 +1,24 @@
 """Handles data validation around data persistence.
 """
 
-from typing import Dict, List
+import io
+import logging
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Set
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import DatabaseError, connection, transaction
 from glom import glom
 
 from .exceptions import JobsError, OpeningExistError
 from .models import Company, Opening
 
 
+log = logging.getLogger(__name__)
+
+
 def opening_insert(data: dict) -> Opening:
     """Inserts an opening into the database.
 
@@ -53,3 +62,148 @@ def opening_update(opening: Opening, data: dict) -> Opening:
 
     opening.save()
     return opening
+
+
+def openings_bulk_insert(entries: List[dict]) -> List[Opening]:
+    """Inserts openings along with their locations into the database within a single
+    transaction. Openings are inserted one at a time, skipping those which conflict
+    with existing openings or hold invalid data, if the bulk insert fails.
+
+    :param entries: job openings details, each with a `locations` entry listing the
+        locations for the opening
+    :type entries: List[dict]
+    :return: the inserted openings
+    :rtype: List[Opening]
+    """
+    entries = [dict(entry) for entry in entries]
+    locations = [entry.pop('locations', None) or [] for entry in entries]
+
+    # openings are saved without calling `save`, which computes their content hash
+    openings = [Opening(**job) for job in entries]
+    for opening in filter(lambda opening: not opening.content_hash, openings):
+        opening.content_hash = opening.get_content_hash()
+
+    try:
+        with transaction.atomic():
+            openings = Opening.objects.bulk_create(openings)
+            _openings_add_locations(openings, locations)
+            return openings
+    except DatabaseError as ex:
+        log.debug(f'Bulk insert of {len(openings)} openings failed. Error: {ex}')
+
+    openings = []
+    for (job, job_locations) in zip(entries, locations):
+        try:
+            with transaction.atomic():
+                opening = Opening(**job)
+                opening.save()
+                _openings_add_locations([opening], [job_locations])
+                openings.append(opening)
+        except DatabaseError as ex:
+            log.error(f"Inserting opening failed. Url: {job.get('url')}. Error: {ex}")
+
+    return openings
+
+
+def _openings_add_locations(openings: List[Opening], locations: List[list]):
+    """Adds locations to openings using a single insert into the through table.
+    """
+    OpeningLocation = Opening.locations.through
+    OpeningLocation.objects.bulk_create([
+        OpeningLocation(opening_id=opening.id, location_id=location.id)
+        for (opening, opening_locations) in zip(openings, locations)
+        for location in {loc.id: loc for loc in opening_locations}.values()
+    ])
+
+
+def openings_refresh_tsdocument(opening_ids: List[int] = None) -> int:
+    """Refreshes the `tsdocument` of openings using a single update, for the provided
+    openings along with openings whose `tsdocument` is pending.
+
+    :param opening_ids: ids of the openings to refresh, defaults to None which
+        refreshes only openings whose `tsdocument` is pending
+    :type opening_ids: List[int], optional
+    :return: number of openings refreshed
+    :rtype: int
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT jobs_opening_refresh_tsdocument(%s::bigint[]);",
+            [list(opening_ids or [])]
+        )
+        return cursor.fetchone()[0]
+
+
+@contextmanager
+def openings_tsdocument_deferred(updated_ids: Set[int] = None):
+    """Defers maintenance of the `tsdocument` of openings written within the block on
+    the current database connection. Openings inserted within the block are left with
+    a pending `tsdocument`, and are refreshed on exit along with the openings whose ids
+    are added to `updated_ids` within the block.
+
+    :param updated_ids: ids of openings updated within the block, defaults to None
+    :type updated_ids: Set[int], optional
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SET jobs.defer_tsdocument = 'on';")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("RESET jobs.defer_tsdocument;")
+        openings_refresh_tsdocument(sorted(updated_ids or []))
+
+
+def openings_deactivate(
+    company_ids: List[int],
+    seen_hashes: Iterable[str],
+    date_inactive: date,
+    created_before: datetime
+) -> Dict[int, int]:
+    """Marks active openings of companies as inactive if they were not seen, using a
+    single update anti-joined against the seen hashes. Hashes are copied into a
+    temporary table, so the statement size doesn't grow with the number of openings.
+
+    :param company_ids: ids of the companies whose openings are to be deactivated
+    :type company_ids: List[int]
+    :param seen_hashes: entry hashes of the openings seen, which remain active
+    :type seen_hashes: Iterable[str]
+    :param date_inactive: date to record openings as inactive from
+    :type date_inactive: date
+    :param created_before: only openings created before this moment are deactivated,
+        which excludes those created after the openings were seen
+    :type created_before: datetime
+    :return: number of openings deactivated for each company id
+    :rtype: Dict[int, int]
+    """
+    if not company_ids:
+        return {}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE jobs_seen_opening "
+            "(entry_hash VARCHAR(200) PRIMARY KEY);"
+        )
+        cursor.copy_from(
+            io.StringIO(''.join(f'{entry_hash}\n' for entry_hash in set(seen_hashes))),
+            'jobs_seen_opening',
+            columns=('entry_hash',)
+        )
+        cursor.execute("ANALYZE jobs_seen_opening;")
+        cursor.execute(
+            "WITH deactivated AS ("
+            "  UPDATE jobs_opening o SET date_inactive = %s"
+            "  WHERE o.company_id = ANY(%s) AND o.date_inactive IS NULL"
+            "  AND o.date_created < %s"
+            "  AND NOT EXISTS ("
+            "    SELECT 1 FROM jobs_seen_opening s WHERE s.entry_hash = o.entry_hash"
+            "  )"
+            "  RETURNING o.company_id"
+            ") "
+            "SELECT company_id, COUNT(*) FROM deactivated GROUP BY company_id;",
+            [date_inactive, list(company_ids), created_before]
+        )
+        counts = dict(cursor.fetchall())
+        cursor.execute("DROP TABLE jobs_seen_opening;")
+
+    return counts
@@ -0,0 +1,93 @@
+import json
+import os
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs.benchmark import Benchmark, FixtureServer
+
+
+class Command(BaseCommand):
+    """
+    :opt --output: path of the file to save results to as JSON; defaults to a file
+        named after the current time within the benchmarks directory
+    :opt --runs int: number of engine runs; the first run scrapes into an empty
+        database while later runs find all openings known. defaults to 2
+    :opt --parse-rounds int: number of times each recorded listing page is parsed
+        for the parsing benchmark. defaults to 20
+    :opt --max-in-flight int: maximum number of vacancy details to be scraped
+        concurrently; defaults to the SCRAPER_MAX_IN_FLIGHT setting
+    """
+
+    help = 'Benchmark scrapers and the scraping engine offline against recorded pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o',
+            '--output',
+            default=None,
+            help='path of the file to save results to'
+        )
+
+        parser.add_argument(
+            '-r',
+            '--runs',
+            type=int,
+            default=2,
+            help='number of engine runs'
+        )
+
+        parser.add_argument(
+            '-p',
+            '--parse-rounds',
+            type=int,
+            default=20,
+            help='number of times each recorded listing page is parsed'
+        )
+
+        parser.add_argument(
+            '-n',
+            '--max-in-flight',
+            type=int,
+            default=None,
+            help='maximum number of vacancy details to be scraped concurrently'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+
+        # engine runs write to a throwaway test database, never the configured one
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with FixtureServer() as server:
+                benchmark = Benchmark(server, max_in_flight=options['max_in_flight'])
+                results = benchmark.run(
+                    runs=options['runs'], parse_rounds=options['parse_rounds']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+
+        for (scraper_id, parse) in results['parse'].items():
+            self.stdout.write(
+                f"parse ({scraper_id}) :: {parse['pages_per_sec']:.1f} pages/sec / " +
+                f"{parse['jobs_per_sec']:.1f} jobs/sec"
+            )
+        for run in results['engine']:
+            self.stdout.write(
+                f"engine ({run['name']}) :: {run['pages_per_sec']:.1f} pages/sec / " +
+                f"{run['jobs_per_sec']:.1f} jobs/sec / " +
+                f"{run['statements_per_opening'] or 0:.1f} statements/opening / " +
+                f"peak rss: {run['peak_rss_mb']:.1f} MB"
+            )
+        self.stdout.write(f'scraper:: Benchmark results saved to {output}')
@@ -0,0 +1,137 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.mocksite import MockSite
+from jobs.models import Company
+
+
+class Command(BaseCommand):
+    """
+    :opt --postings int: number of postings listed; defaults to 10000
+    :opt --page-size int: number of postings listed on each listings page; defaults to 100
+    :opt --latency float: average seconds taken to respond to a request; defaults to 0
+    :opt --error-rate float: fraction of requests failed with a 503 response; defaults to 0
+    :opt --churn float: fraction of postings replaced by new postings between scrapes;
+        defaults to 0
+    :opt --paragraphs int: number of paragraphs within posting descriptions; defaults to 5
+    :opt --seed int: seed for generated postings and random failures; defaults to 0
+    :opt --host: address to listen on; defaults to 127.0.0.1
+    :opt --port int: port to listen on; defaults to 8100
+    :opt --company: name slug of a company whose vacancies url is pointed at the mock
+        site while it runs; the original url is restored once it stops
+    """
+
+    help = 'Serve a synthetic careers site for load testing the scraping engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--postings',
+            type=int,
+            default=10000,
+            help='number of postings listed'
+        )
+
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='number of postings listed on each listings page'
+        )
+
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='average seconds taken to respond to a request'
+        )
+
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0,
+            help='fraction of requests failed with a 503 response'
+        )
+
+        parser.add_argument(
+            '--churn',
+            type=float,
+            default=0,
+            help='fraction of postings replaced by new postings between scrapes'
+        )
+
+        parser.add_argument(
+            '--paragraphs',
+            type=int,
+            default=5,
+            help='number of paragraphs within posting descriptions'
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='seed for generated postings and random failures'
+        )
+
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='address to listen on'
+        )
+
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8100,
+            help='port to listen on'
+        )
+
+        parser.add_argument(
+            '-c',
+            '--company',
+            default=None,
+            help='name slug of a company to point at the mock site while it runs'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(name_slug=options['company']).first()
+            if not company:
+                raise CommandError(f"mocksite:: Unknown company name slug: {options['company']}")
+
+        site = MockSite(
+            postings=options['postings'],
+            page_size=options['page_size'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            churn=options['churn'],
+            paragraphs=options['paragraphs'],
+            seed=options['seed'],
+            host=options['host'],
+            port=options['port']
+        )
+        site.bind()
+        self.stdout.write(
+            f'mocksite:: Serving {site.postings} postings over {site.pages} pages ' +
+            f'at {site.vacancies_url}'
+        )
+
+        original_url = company.vacancies_url if company else None
+        if company:
+            company.vacancies_url = site.vacancies_url
+            company.save(update_fields=['vacancies_url'])
+            self.stdout.write(f'mocksite:: Vacancies url for {company.name} pointed at mock site')
+
+        try:
+            site.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if company:
+                company.vacancies_url = original_url
+                company.save(update_fields=['vacancies_url'])
+                self.stdout.write(f'mocksite:: Vacancies url for {company.name} restored')
+
+            self.stdout.write(
+                f'mocksite:: {site.requests} requests served ({site.errors} failed)'
+            )
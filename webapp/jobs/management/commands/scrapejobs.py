@@ -18,6 +18,20 @@ class Command(BaseCommand):
         for update_freq; in minutes, hours or days. defaults to days
     :opt --ignore-update-freq boolean: causes all listed companies to be scrapped
         ignoring the update freq settings
+    :opt --max-in-flight int: maximum number of vacancy details to be scraped
+        concurrently; defaults to the SCRAPER_MAX_IN_FLIGHT setting
+    :opt --deep-verify boolean: causes details for all known openings to be scraped
+        even those verified within the SCRAPER_VERIFY_MAX_AGE setting
+    :opt --full-scrape boolean: causes all listings to be scraped for all companies
+        even those scraped in full within the SCRAPER_FULL_SCRAPE_INTERVAL setting
+    :opt --workers int: number of worker processes to scrape companies in parallel
+        with; defaults to 1 which scrapes companies one after the other
+    :opt --metrics-json: path of the file to export per-stage timing metrics to as
+        JSON; defaults to the SCRAPER_METRICS_JSON setting
+    :opt --metrics-textfile: path of the file to export per-stage timing metrics to in
+        the Prometheus text format; defaults to the SCRAPER_METRICS_TEXTFILE setting
+    :opt --resume boolean: causes the last unfinished scrape run for each company to be
+        resumed, skipping listing pages done and vacancies processed by that run
     """
 
     help = 'Scrape job openings from job listing pages of register companies'
@@ -46,6 +60,58 @@ class Command(BaseCommand):
             help='indicates whether to ignore update frequency settings for companies'
         )
 
+        parser.add_argument(
+            '-n',
+            '--max-in-flight',
+            type=int,
+            default=None,
+            help='maximum number of vacancy details to be scraped concurrently'
+        )
+
+        parser.add_argument(
+            '-d',
+            '--deep-verify',
+            action='store_true',
+            default=False,
+            help='indicates whether to scrape details for all known openings'
+        )
+
+        parser.add_argument(
+            '-a',
+            '--full-scrape',
+            action='store_true',
+            default=False,
+            help='indicates whether to scrape all listings for all companies'
+        )
+
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=1,
+            help='number of worker processes to scrape companies in parallel with'
+        )
+
+        parser.add_argument(
+            '--metrics-json',
+            default=None,
+            help='path of the file to export per-stage timing metrics to as JSON'
+        )
+
+        parser.add_argument(
+            '--metrics-textfile',
+            default=None,
+            help='path of the file to export per-stage timing metrics to as Prometheus text'
+        )
+
+        parser.add_argument(
+            '-r',
+            '--resume',
+            action='store_true',
+            default=False,
+            help='indicates whether to resume the last unfinished scrape run for companies'
+        )
+
     def allow_scraping(
         self,
         company: Company,
@@ -111,5 +177,13 @@ class Command(BaseCommand):
             self.stdout.write('')
 
         # run scraping engine for identified companies
-        engine = Engine(companies)
-        engine.execute()
+        engine = Engine(
+            companies,
+            max_in_flight=options['max_in_flight'],
+            deep_verify=options['deep_verify'],
+            full_scrape=options['full_scrape'],
+            metrics_json=options['metrics_json'],
+            metrics_textfile=options['metrics_textfile'],
+            resume=options['resume']
+        )
+        engine.execute(workers=options['workers'])
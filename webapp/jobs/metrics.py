@@ -0,0 +1,273 @@
+"""Defines objects for collecting timing metrics for scrape runs.
+
+Time spent within each stage of a scrape run is recorded within histograms labelled
+with the stage and the company being scraped. Metrics are exported at the end of a
+run as JSON and as a textfile in the Prometheus text format, which can be picked up by
+the textfile collector of the Prometheus node exporter.
+"""
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+# stages of a scrape run
+LISTING_FETCH = 'listing_fetch'
+RENDER = 'render'
+PARSE = 'parse'
+DETAIL_FETCH = 'detail_fetch'
+DB_READ = 'db_read'
+DB_WRITE = 'db_write'
+STAGES = (LISTING_FETCH, RENDER, PARSE, DETAIL_FETCH, DB_READ, DB_WRITE)
+
+# leading keywords of statements which only read data
+READ_KEYWORDS = frozenset(('SELECT', 'WITH', 'EXPLAIN', 'SHOW'))
+
+# label for operations not done on behalf of a single company
+ALL_COMPANIES = 'all'
+
+# upper bounds (in seconds) of the histogram buckets
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+PREFIX = 'jobscraper'
+
+
+class Histogram:
+    """Histogram of durations with counts for each of the `BUCKETS`, along with a
+    count for durations beyond the largest bucket.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, data: dict):
+        """Adds the observations of a histogram exported with `to_dict`.
+        """
+        cumulative = list(data['buckets'].values())
+        for (i, count) in enumerate(cumulative):
+            self.counts[i] += count - (cumulative[i - 1] if i else 0)
+        self.count += data['count']
+        self.sum += data['sum']
+        self.max = max(self.max, data['max'])
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def to_dict(self) -> dict:
+        bounds = [format_bound(bound) for bound in BUCKETS] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else 0,
+            'buckets': dict(zip(bounds, self.cumulative_counts())),
+        }
+
+
+def format_bound(bound: float) -> str:
+    return str(float(bound))
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def is_read(sql: str) -> bool:
+    """Returns True if a statement only reads data, going by its leading keyword.
+    """
+    match = re.match(r'\s*([A-Za-z]+)', sql)
+    return bool(match) and match.group(1).upper() in READ_KEYWORDS
+
+
+class Metrics:
+    """Collects durations for the stages of a scrape run broken down by company.
+
+    The company an operation is done on behalf of is tracked for each thread, so
+    durations recorded by scrapers and database statements are attributed to the
+    company being scraped by the thread recording them.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def get_company(self) -> str:
+        return getattr(self.local, 'company', ALL_COMPANIES)
+
+    @contextmanager
+    def company(self, company: str):
+        """Attributes durations recorded by the current thread to a company.
+
+        :param company: name slug of the company
+        :type company: str
+        """
+        previous = self.get_company()
+        self.local.company = company
+        try:
+            yield
+        finally:
+            self.local.company = previous
+
+    def observe(self, stage: str, seconds: float, company: str = None):
+        """Records the duration of an operation within a stage.
+
+        :param stage: the stage the operation is part of
+        :type stage: str
+        :param seconds: duration of the operation
+        :type seconds: float
+        :param company: name slug of the company the operation was done for, defaults
+            to the company set for the current thread
+        :type company: str, optional
+        """
+        key = (stage, company or self.get_company())
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if not histogram:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str, company: str = None):
+        """Records the time spent within the block as an operation within a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, company)
+
+    def __call__(self, execute, sql, params, many, context):
+        # database execute wrapper timing each statement as a read or a write
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stage = DB_READ if is_read(sql) else DB_WRITE
+            self.observe(stage, time.perf_counter() - start)
+
+    def _install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    @contextmanager
+    def database(self):
+        """Times database statements executed within the block on any connection,
+        including those opened by worker threads.
+        """
+        connection_created.connect(self._install)
+        self._install(None, connection)
+        try:
+            yield
+        finally:
+            connection_created.disconnect(self._install)
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    def merge(self, data: Dict[str, Dict[str, dict]]):
+        """Adds the durations of metrics exported with `to_dict`.
+        """
+        with self.lock:
+            for (stage, companies) in data.items():
+                for (company, histogram_data) in companies.items():
+                    histogram = self.histograms.setdefault((stage, company), Histogram())
+                    histogram.merge(histogram_data)
+
+    def to_dict(self) -> Dict[str, Dict[str, dict]]:
+        """Returns histograms for each stage keyed by stage and then company.
+        """
+        data = {}
+        with self.lock:
+            for ((stage, company), histogram) in sorted(self.histograms.items()):
+                data.setdefault(stage, {})[company] = histogram.to_dict()
+        return data
+
+    def to_prometheus(self, stats: Dict[str, dict] = None, finished: float = None) -> str:
+        """Returns the metrics in the Prometheus text format, as read by the textfile
+        collector of the node exporter.
+
+        :param stats: counts of openings for each company keyed by outcome, defaults
+            to None
+        :type stats: Dict[str, dict], optional
+        :param finished: unix time at which the run finished, defaults to None
+        :type finished: float, optional
+        :return: the metrics exposition
+        :rtype: str
+        """
+        name = f'{PREFIX}_stage_duration_seconds'
+        lines = [
+            f'# TYPE {name} histogram',
+            f'# HELP {name} Time spent within each stage of the last scrape run.',
+        ]
+        for (stage, companies) in self.to_dict().items():
+            for (company, histogram) in companies.items():
+                labels = f'stage="{escape_label(stage)}",company="{escape_label(company)}"'
+                for (bound, count) in histogram['buckets'].items():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}')
+
+        if stats:
+            name = f'{PREFIX}_openings'
+            lines.extend([
+                f'# TYPE {name} gauge',
+                f'# HELP {name} Openings processed within the last scrape run by outcome.',
+            ])
+            for (company, counts) in sorted(stats.items()):
+                for (outcome, count) in counts.items():
+                    labels = f'company="{escape_label(company)}",outcome="{outcome}"'
+                    lines.append(f'{name}{{{labels}}} {count}')
+
+        if finished:
+            name = f'{PREFIX}_last_run_timestamp_seconds'
+            lines.extend([
+                f'# TYPE {name} gauge',
+                f'# HELP {name} Unix time at which the last scrape run finished.',
+                f'{name} {finished}',
+            ])
+
+        return '\n'.join(lines) + '\n'
+
+
+def write_file(path: str, content: str):
+    """Writes a file atomically, so readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    (fd, tmp_path) = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_json(path: str, data: dict):
+    write_file(path, json.dumps(data, indent=2))
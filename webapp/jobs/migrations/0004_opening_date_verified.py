@@ -0,0 +1,18 @@
+# Generated by Django 3.0.8 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_adjust_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opening',
+            name='date_verified',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date Verified'),
+        ),
+    ]
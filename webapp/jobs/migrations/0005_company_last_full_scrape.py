@@ -0,0 +1,18 @@
+# Generated by Django 3.0.8 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_opening_date_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='last_full_scrape',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last Full Scrape'),
+        ),
+    ]
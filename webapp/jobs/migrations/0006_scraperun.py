@@ -0,0 +1,43 @@
+# Generated by Django 3.0.8 on 2026-10-18 13:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_company_last_full_scrape'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRun',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('aborted', 'Aborted'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('pages_done', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=20), blank=True, default=list, size=None, verbose_name='Pages Done')),
+                ('date_started', models.DateTimeField(verbose_name='Date Started')),
+                ('date_finished', models.DateTimeField(blank=True, null=True, verbose_name='Date Finished')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='jobs.Company')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ScrapeRunPage',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('page_no', models.CharField(max_length=20, verbose_name='Page No')),
+                ('jobs', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('processed', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=200), blank=True, default=list, size=None, verbose_name='Processed')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='jobs.ScrapeRun')),
+            ],
+            options={
+                'unique_together': {('run', 'page_no')},
+            },
+        ),
+    ]
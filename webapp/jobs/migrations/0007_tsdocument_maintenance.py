@@ -0,0 +1,203 @@
+# Generated by Django 3.0.8 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_scraperun'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            -- drop the trigger recomputing tsdocument on every insert or update
+            DROP TRIGGER jobs_opening_tsvector_update ON jobs_opening;
+
+            -- create function computing the tsdocument of an opening
+            CREATE OR REPLACE FUNCTION jobs_opening_tsdocument(
+                opening jobs_opening, company jobs_company, location_names VARCHAR[]
+            ) RETURNS tsvector AS $$
+                SELECT
+                    to_tsvector('english', COALESCE(opening.role_title, '')) ||
+                    to_tsvector('english', COALESCE(opening.description,'')) ||
+                    to_tsvector('english', COALESCE(company.name, '')) ||
+                    to_tsvector('english', COALESCE(company.industry, '')) ||
+                    to_tsvector('english', COALESCE(ARRAY_TO_STRING(location_names, '; '), '')) ||
+                    to_tsvector('english', CASE opening.is_remote WHEN 'true' THEN 'Remote' ELSE '' END) ||
+                    to_tsvector('english', CASE opening.part_time_permitted WHEN 'true' THEN 'Part-Time' ELSE '' END) ||
+                    to_tsvector('english', CASE opening.has_401k WHEN 'true' THEN '401K' ELSE '' END) ||
+                    to_tsvector('english', CASE opening.has_dentalins WHEN 'true' THEN 'Dental Insurance' ELSE '' END) ||
+                    to_tsvector('english', CASE opening.has_healthins WHEN 'true' THEN 'Health Insurance' ELSE '' END);
+            $$ LANGUAGE sql IMMUTABLE;
+
+            -- create function refreshing the tsdocument of the given openings along with
+            -- openings whose tsdocument is pending, using a single update
+            CREATE OR REPLACE FUNCTION jobs_opening_refresh_tsdocument(
+                opening_ids BIGINT[] DEFAULT NULL
+            ) RETURNS INTEGER AS $$
+            DECLARE
+                refreshed   INTEGER;
+            BEGIN
+                UPDATE jobs_opening o
+                SET tsdocument = jobs_opening_tsdocument(o, c, ARRAY(
+                    SELECT l.name
+                    FROM jobs_location l
+                    JOIN jobs_opening_locations ol
+                        ON (l.id = ol.location_id)
+                    WHERE ol.opening_id = o.id
+                    ORDER BY ol.id
+                ))
+                FROM jobs_company c
+                WHERE c.id = o.company_id
+                AND o.id IN (
+                    SELECT UNNEST(COALESCE(opening_ids, '{}'))
+                    UNION
+                    SELECT id FROM jobs_opening WHERE tsdocument = ''::tsvector
+                );
+
+                GET DIAGNOSTICS refreshed = ROW_COUNT;
+                RETURN refreshed;
+            END
+            $$ LANGUAGE plpgsql;
+
+            -- create partial index on openings whose tsdocument is pending
+            CREATE INDEX jobs_opening_tsdocument_pending ON jobs_opening (id)
+            WHERE tsdocument = ''::tsvector;
+
+            -- replace function populating the tsdocument field of inserted or updated
+            -- openings; when deferred for the session, inserted openings are left with
+            -- a pending (empty) tsdocument to be refreshed in bulk
+            CREATE OR REPLACE FUNCTION jobs_opening_tsvector_trigger() RETURNS trigger AS $$
+            DECLARE
+                company             jobs_company;
+                location_names      VARCHAR[];
+            BEGIN
+                IF current_setting('jobs.defer_tsdocument', true) = 'on' THEN
+                    IF TG_OP = 'INSERT' THEN
+                        NEW.tsdocument := ''::tsvector;
+                    END IF;
+                    RETURN NEW;
+                END IF;
+
+                SELECT * INTO company
+                FROM jobs_company
+                WHERE id = NEW.company_id;
+
+                -- locations are only added once an opening is inserted
+                IF TG_OP = 'UPDATE' THEN
+                    SELECT ARRAY(
+                        SELECT l.name
+                        FROM jobs_location l
+                        JOIN jobs_opening_locations ol
+                            ON (l.id = ol.location_id)
+                        WHERE ol.opening_id = NEW.id
+                        ORDER BY ol.id
+                    ) INTO location_names;
+                END IF;
+
+                NEW.tsdocument := jobs_opening_tsdocument(NEW, company, location_names);
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER jobs_opening_tsvector_insert
+            BEFORE INSERT ON jobs_opening
+            FOR EACH ROW EXECUTE PROCEDURE jobs_opening_tsvector_trigger();
+
+            -- recompute tsdocument only on updates which change indexed columns
+            CREATE TRIGGER jobs_opening_tsvector_update
+            BEFORE UPDATE OF
+                role_title, description, company_id, is_remote, part_time_permitted,
+                has_401k, has_dentalins, has_healthins
+            ON jobs_opening
+            FOR EACH ROW
+            WHEN (
+                OLD.role_title IS DISTINCT FROM NEW.role_title OR
+                OLD.description IS DISTINCT FROM NEW.description OR
+                OLD.company_id IS DISTINCT FROM NEW.company_id OR
+                OLD.is_remote IS DISTINCT FROM NEW.is_remote OR
+                OLD.part_time_permitted IS DISTINCT FROM NEW.part_time_permitted OR
+                OLD.has_401k IS DISTINCT FROM NEW.has_401k OR
+                OLD.has_dentalins IS DISTINCT FROM NEW.has_dentalins OR
+                OLD.has_healthins IS DISTINCT FROM NEW.has_healthins
+            )
+            EXECUTE PROCEDURE jobs_opening_tsvector_trigger();
+
+            -- create function refreshing the tsdocument of openings whose locations
+            -- were added or removed by a statement, unless deferred for the session
+            CREATE OR REPLACE FUNCTION jobs_opening_locations_tsvector_trigger() RETURNS trigger AS $$
+            BEGIN
+                IF current_setting('jobs.defer_tsdocument', true) IS DISTINCT FROM 'on' THEN
+                    PERFORM jobs_opening_refresh_tsdocument(
+                        ARRAY(SELECT DISTINCT opening_id FROM changed_rows)
+                    );
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER jobs_opening_locations_tsvector_insert
+            AFTER INSERT ON jobs_opening_locations
+            REFERENCING NEW TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE jobs_opening_locations_tsvector_trigger();
+
+            CREATE TRIGGER jobs_opening_locations_tsvector_delete
+            AFTER DELETE ON jobs_opening_locations
+            REFERENCING OLD TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE jobs_opening_locations_tsvector_trigger();
+
+            -- index location names of existing openings, missed when they were inserted
+            SELECT jobs_opening_refresh_tsdocument(ARRAY(SELECT id FROM jobs_opening));
+            """,
+            reverse_sql="""
+            DROP TRIGGER jobs_opening_locations_tsvector_delete ON jobs_opening_locations;
+            DROP TRIGGER jobs_opening_locations_tsvector_insert ON jobs_opening_locations;
+            DROP FUNCTION jobs_opening_locations_tsvector_trigger();
+            DROP TRIGGER jobs_opening_tsvector_update ON jobs_opening;
+            DROP TRIGGER jobs_opening_tsvector_insert ON jobs_opening;
+            DROP INDEX jobs_opening_tsdocument_pending;
+            DROP FUNCTION jobs_opening_refresh_tsdocument(BIGINT[]);
+            DROP FUNCTION jobs_opening_tsdocument(jobs_opening, jobs_company, VARCHAR[]);
+
+            CREATE OR REPLACE FUNCTION jobs_opening_tsvector_trigger() RETURNS trigger AS $$
+            DECLARE
+                company_name        VARCHAR(100);
+                company_industry    VARCHAR(100);
+                location_names      VARCHAR(100) ARRAY[20];
+            BEGIN
+                SELECT name, industry INTO company_name, company_industry
+                FROM jobs_company
+                WHERE id = NEW.company_id;
+
+                SELECT ARRAY(
+                    SELECT l.name
+                    FROM jobs_location l
+                    JOIN jobs_opening_locations ol
+                        ON (l.id = ol.location_id)
+                    WHERE ol.opening_id = NEW.id
+                ) INTO location_names;
+
+                NEW.tsdocument :=
+                    to_tsvector('english', COALESCE(NEW.role_title, '')) ||
+                    to_tsvector('english', COALESCE(NEW.description,'')) ||
+                    to_tsvector('english', COALESCE(company_name, '')) ||
+                    to_tsvector('english', COALESCE(company_industry, '')) ||
+                    to_tsvector('english', COALESCE(ARRAY_TO_STRING(location_names, '; '), '')) ||
+                    to_tsvector('english', CASE NEW.is_remote WHEN 'true' THEN 'Remote' ELSE '' END) ||
+                    to_tsvector('english', CASE NEW.part_time_permitted WHEN 'true' THEN 'Part-Time' ELSE '' END) ||
+                    to_tsvector('english', CASE NEW.has_401k WHEN 'true' THEN '401K' ELSE '' END) ||
+                    to_tsvector('english', CASE NEW.has_dentalins WHEN 'true' THEN 'Dental Insurance' ELSE '' END) ||
+                    to_tsvector('english', CASE NEW.has_healthins WHEN 'true' THEN 'Health Insurance' ELSE '' END);
+
+                return NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER jobs_opening_tsvector_update
+            BEFORE INSERT OR UPDATE ON jobs_opening
+            FOR EACH ROW EXECUTE PROCEDURE jobs_opening_tsvector_trigger();
+            """
+        )
+    ]
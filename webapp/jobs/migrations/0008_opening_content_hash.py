@@ -0,0 +1,67 @@
+# Generated by Django 3.0.8 on 2026-10-18 15:02
+
+import hashlib
+import json
+
+from django.db import migrations, models
+from psycopg2.extras import Range
+
+
+BATCH_SIZE = 500
+
+# frozen copies of `jobs.models.OPENING_CONTENT_FIELDS` and `compute_content_hash` as of
+# this migration, so later changes to them don't change what this migration computes
+OPENING_CONTENT_FIELDS = (
+    'role_title', 'description', 'url', 'is_remote', 'part_time_permitted', 'has_401k',
+    'has_dentalins', 'has_healthins', 'salary_range',
+)
+
+
+def compute_content_hash(data: dict) -> str:
+    values = []
+    for field in OPENING_CONTENT_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+        elif isinstance(value, Range) and not value.isempty:
+            value = [value.lower, value.upper, value.lower_inc, value.upper_inc]
+        elif isinstance(value, Range):
+            value = None
+        values.append(value)
+
+    content = json.dumps(values, default=str, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def forwards_func(apps, schema_editor):
+    """Computes the content hash of existing openings.
+    """
+    Opening = apps.get_model('jobs', 'Opening')
+
+    batch = []
+    for opening in Opening.objects.only('id', *OPENING_CONTENT_FIELDS).iterator():
+        opening.content_hash = compute_content_hash({
+            f: getattr(opening, f) for f in OPENING_CONTENT_FIELDS
+        })
+        batch.append(opening)
+        if len(batch) >= BATCH_SIZE:
+            Opening.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+
+    Opening.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_tsdocument_maintenance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opening',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Content Hash'),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
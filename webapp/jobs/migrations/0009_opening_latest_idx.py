@@ -0,0 +1,17 @@
+# Generated by Django 3.0.8 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_opening_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='opening',
+            index=models.Index(fields=['-date_active', '-id'], name='jobs_opening_latest_idx'),
+        ),
+    ]
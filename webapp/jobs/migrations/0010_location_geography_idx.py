@@ -0,0 +1,23 @@
+# Generated by Django 3.0.8 on 2026-10-18 16:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_opening_latest_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            -- index the geography of locations for ST_DWithin searches in meters
+            CREATE INDEX jobs_location_geography_idx ON jobs_location
+            USING GIST ((geom::geography));
+            """,
+            reverse_sql="""
+            DROP INDEX jobs_location_geography_idx;
+            """
+        )
+    ]
@@ -0,0 +1,373 @@
+"""Defines a synthetic careers site for load testing the scraping engine locally.
+
+The site mimics the World Bank Group careers site, with listings paged through
+ASP.NET postbacks carrying `__VIEWSTATE`, so it can be scraped by the
+`WorldBankGroupScraper` once a company's `vacancies_url` points at it.
+"""
+import base64
+import html
+import logging
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+log = logging.getLogger(__name__)
+
+
+class LocalServer:
+    """HTTP server which serves requests on a local port, either from a background
+    thread or in the foreground. Derived classes implement `handle`.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """Initializes a new local server.
+
+        :param host: address to listen on, defaults to '127.0.0.1'
+        :type host: str, optional
+        :param port: port to listen on, defaults to 0 which picks a free port
+        :type port: int, optional
+        """
+        self.address = (host, port)
+        self.httpd = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        (host, port) = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        raise NotImplementedError()
+
+    def respond(self, handler: BaseHTTPRequestHandler, status: int, content: bytes):
+        """Writes a html response for a request.
+        """
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'text/html; charset=utf-8')
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def bind(self):
+        """Binds the server to its address without serving requests.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            def do_POST(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(self.address, Handler)
+        self.httpd.daemon_threads = True
+
+    def start(self):
+        """Starts serving requests from a background thread.
+        """
+        if not self.httpd:
+            self.bind()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def serve_forever(self):
+        """Serves requests from the calling thread until interrupted.
+        """
+        if not self.httpd:
+            self.bind()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.httpd = None
+
+    def stop(self):
+        """Stops the server.
+        """
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.thread.join()
+            self.httpd = None
+
+
+class MockSite(LocalServer):
+    """Synthetic careers site listing generated postings.
+
+    The site serves the following paths:
+
+    - `/ats/careersite/search.aspx`: listings, with page 1 served for GET requests and
+      the page posted back as `__EVENTTARGET` served for POST requests. Postbacks must
+      carry the `__VIEWSTATE` of a page served since the postings last changed.
+    - `/ats/careersite/requisition.aspx?id=<id>`: details for a posting
+
+    Each GET request for the listings starts a new generation of postings, in which
+    `churn` of the postings are replaced by new ones, as happens between scrapes.
+    """
+    PATH = '/ats/careersite'
+    PAGER_ID = 'ctl00_siteContent_widgetLayout_rptWidgets_ctl03_widgetContainer_ctl00_pager'
+
+    TITLES = [
+        'Senior Economist', 'Operations Officer', 'Financial Analyst', 'Data Scientist',
+        'Procurement Specialist', 'Communications Officer', 'Program Assistant',
+        'Health Specialist', 'Energy Specialist', 'Legal Counsel', 'Transport Specialist',
+        'Education Specialist', 'Environmental Specialist', 'Risk Officer',
+    ]
+    FAMILIES = [
+        'Economics', 'Operations', 'Finance & Accounting', 'Information Technology',
+        'Procurement', 'External Affairs & Communications', 'Health', 'Legal', 'Energy',
+        'Transport', 'Education', 'Environment', 'Risk Management',
+    ]
+    LOCATIONS = [
+        'Washington, DC,United States', 'Amman, Jordan', 'Nairobi, Kenya', 'Dhaka, Bangladesh',
+        'Jakarta, Indonesia', 'Lagos, Nigeria', 'Lima, Peru', 'Kyiv, Ukraine', 'Hanoi, Vietnam',
+        'Dakar, Senegal', 'New Delhi, India', 'Beijing, China', 'Cairo, Egypt',
+        'Mexico City, Mexico', 'Istanbul, Turkey', 'Paris, France', 'Tokyo, Japan',
+    ]
+
+    def __init__(
+        self,
+        postings: int = 10000,
+        page_size: int = 100,
+        latency: float = 0,
+        error_rate: float = 0,
+        churn: float = 0,
+        paragraphs: int = 5,
+        seed: int = 0,
+        host: str = '127.0.0.1',
+        port: int = 0
+    ):
+        """Initializes a new mock site.
+
+        :param postings: number of postings listed, defaults to 10000
+        :type postings: int, optional
+        :param page_size: number of postings listed on each listings page, defaults to 100
+        :type page_size: int, optional
+        :param latency: average seconds taken to respond to a request, with responses
+            taken between half and one and a half times as long, defaults to 0
+        :type latency: float, optional
+        :param error_rate: fraction of requests failed with a 503 response, defaults to 0
+        :type error_rate: float, optional
+        :param churn: fraction of postings replaced by new postings for each
+            generation, defaults to 0
+        :type churn: float, optional
+        :param paragraphs: number of paragraphs within posting descriptions, defaults to 5
+        :type paragraphs: int, optional
+        :param seed: seed for the generated postings and the random failures, defaults to 0
+        :type seed: int, optional
+        :param host: address to listen on, defaults to '127.0.0.1'
+        :type host: str, optional
+        :param port: port to listen on, defaults to 0 which picks a free port
+        :type port: int, optional
+        """
+        super().__init__(host, port)
+        self.postings = postings
+        self.page_size = max(page_size, 1)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.churn = churn
+        self.paragraphs = paragraphs
+        self.seed = seed
+        self.generation = 0
+        self.versions = [0] * postings
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    @property
+    def vacancies_url(self) -> str:
+        return f'{self.url}{self.PATH}/search.aspx'
+
+    @property
+    def pages(self) -> int:
+        return max((self.postings + self.page_size - 1) // self.page_size, 1)
+
+    def new_generation(self):
+        """Starts a new generation of postings, replacing `churn` of the postings
+        listed in the previous generation.
+        """
+        with self.lock:
+            self.generation += 1
+            if self.churn and self.generation > 1:
+                churned = random.Random(f'{self.seed}:{self.generation}')
+                for slot in range(self.postings):
+                    if churned.random() < self.churn:
+                        self.versions[slot] += 1
+
+    def get_posting_ids(self, page_no: int) -> List[int]:
+        """Returns ids of the postings listed on a listings page.
+        """
+        start = (page_no - 1) * self.page_size
+        slots = range(start, min(start + self.page_size, self.postings))
+        return [self.versions[slot] * self.postings + slot + 1 for slot in slots]
+
+    def get_posting(self, posting_id: int) -> Dict[str, str]:
+        """Returns the generated details for a posting.
+        """
+        rand = random.Random(f'{self.seed}:posting:{posting_id}')
+        return {
+            'id': str(posting_id),
+            'title': f'{rand.choice(self.TITLES)} (req{posting_id})',
+            'family': rand.choice(self.FAMILIES),
+            'locations': rand.sample(self.LOCATIONS, rand.randint(1, 3)),
+            'deadline': f'{rand.randint(1, 12):02d}/{rand.randint(1, 28):02d}/2020',
+        }
+
+    def is_listed(self, posting_id: int) -> bool:
+        """Returns True if the posting is listed within the current generation.
+        """
+        slot = (posting_id - 1) % self.postings
+        return 0 < posting_id and self.versions[slot] == (posting_id - 1) // self.postings
+
+    def get_viewstate(self, page_no: int) -> str:
+        value = f'{self.seed}:{self.generation}:{page_no}'.encode('utf-8')
+        return base64.b64encode(value).decode('ascii')
+
+    def is_valid_viewstate(self, viewstate: str) -> bool:
+        try:
+            (seed, generation, _) = base64.b64decode(viewstate).decode('utf-8').split(':')
+            return (int(seed), int(generation)) == (self.seed, self.generation)
+        except Exception:
+            return False
+
+    def render_listings(self, page_no: int) -> str:
+        rows = []
+        for posting_id in self.get_posting_ids(page_no):
+            posting = self.get_posting(posting_id)
+            rows.append(
+                '<tr class="resultRow">' +
+                f'<td class="titleCell"><a href="requisition.aspx?id={posting["id"]}">' +
+                f'{html.escape(posting["title"])}</a></td>' +
+                f'<td>{html.escape(posting["locations"][0])}</td>' +
+                f'<td>{html.escape(posting["family"])}</td>' +
+                f'<td>{posting["deadline"]}</td></tr>'
+            )
+
+        links = [
+            f'<span class="pagerLink" id="{self.PAGER_ID}_{n}">{n}</span>'
+            for n in range(1, self.pages + 1)
+        ]
+        return (
+            '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8" />' +
+            '<title>Career Site - Search Results</title></head><body>' +
+            '<form method="post" action="./search.aspx" id="aspnetForm">' +
+            '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" ' +
+            f'value="{self.get_viewstate(page_no)}" />' +
+            '<input type="hidden" name="__VIEWSTATEGENERATOR" ' +
+            'id="__VIEWSTATEGENERATOR" value="3B4D6A9C" />' +
+            '<table id="tableResults"><thead><tr><th>Title</th><th>Location</th>' +
+            '<th>Job Family</th><th>Closing Date</th></tr></thead><tbody>' +
+            ''.join(rows) + '</tbody></table>' +
+            '<div class="results-paging">' + ''.join(links) + '</div>' +
+            '</form></body></html>'
+        )
+
+    def render_details(self, posting_id: int) -> str:
+        posting = self.get_posting(posting_id)
+        rand = random.Random(f'{self.seed}:description:{posting_id}')
+        info = [
+            ('Job #:', f'req{posting["id"]}'),
+            ('Organization:', 'World Bank'),
+            ('Sector:', posting['family']),
+            ('Grade:', rand.choice(['GE', 'GF', 'GG', 'GH'])),
+            ('Term Duration:', f'{rand.randint(1, 4)} years 0 months'),
+            ('Recruitment Type:', 'International Recruitment'),
+            ('Location:', '; '.join(posting['locations'])),
+            ('Required Language(s):', 'English'),
+            ('Closing Date:', f'{posting["deadline"]} (MM/DD/YYYY) at 11:59pm UTC'),
+        ]
+        words = ['development', 'policy', 'analysis', 'operations', 'clients', 'teams',
+                 'projects', 'support', 'lead', 'design', 'review', 'countries']
+        paragraphs = [
+            '<p>' + ' '.join(rand.choice(words) for _ in range(60)) + '.</p>'
+            for _ in range(self.paragraphs)
+        ]
+        return (
+            '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8" />' +
+            '<title>Career Site - Job Details</title></head><body>' +
+            '<div class="cs-atscs-jobdet-rtpane">' +
+            f'<p><span>{html.escape(posting["title"])}</span></p>' +
+            '<table class="jobInfo">' +
+            ''.join(f'<tr><td>{k}</td><td>{html.escape(v)}</td></tr>' for (k, v) in info) +
+            '</table>' +
+            '<table class="jobDescription"><tr><td>' + ''.join(paragraphs) +
+            '</td></tr></table></div></body></html>'
+        )
+
+    def get_response(
+        self, method: str, url: str, form: Dict[str, List[str]]
+    ) -> Tuple[int, str]:
+        """Returns the status and contents of the response for a request.
+
+        :param method: the HTTP method for the request
+        :type method: str
+        :param url: the requested path along with its query string
+        :type url: str
+        :param form: the form data posted along with the request
+        :type form: Dict[str, List[str]]
+        :return: response status and contents
+        :rtype: Tuple[int, str]
+        """
+        (_, _, path, query, _) = urlsplit(url)
+        if path == f'{self.PATH}/search.aspx':
+            if method == 'GET':
+                self.new_generation()
+                return (200, self.render_listings(1))
+
+            if not self.is_valid_viewstate(form.get('__VIEWSTATE', [''])[0]):
+                return (500, '<h1>Validation of viewstate MAC failed.</h1>')
+
+            event_target = form.get('__EVENTTARGET', [''])[0]
+            (_, _, page_no) = event_target.rpartition('$')
+            page_no = int(page_no) if page_no.isdigit() else 1
+            if not 1 <= page_no <= self.pages:
+                return (404, '<h1>Page not found</h1>')
+            return (200, self.render_listings(page_no))
+
+        if path == f'{self.PATH}/requisition.aspx':
+            posting_id = parse_qs(query).get('id', [''])[0]
+            if not posting_id.isdigit() or not self.is_listed(int(posting_id)):
+                return (404, '<h1>Job not found</h1>')
+            return (200, self.render_details(int(posting_id)))
+
+        return (404, '<h1>Page not found</h1>')
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length).decode('utf-8') if length else ''
+
+        with self.lock:
+            self.requests += 1
+            delay = self.latency * self.random.uniform(0.5, 1.5) if self.latency else 0
+            failed = self.random.random() < self.error_rate
+
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            with self.lock:
+                self.errors += 1
+            self.respond(handler, 503, b'<h1>Service Unavailable</h1>')
+            return
+
+        (status, content) = self.get_response(handler.command, handler.path, parse_qs(body))
+        self.respond(handler, status, content.encode('utf-8'))
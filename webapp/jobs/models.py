@@ -1,4 +1,5 @@
-import re
+import hashlib
+import json
 from enum import Enum
 
 from django.db import models
@@ -6,10 +7,42 @@ from django.contrib.gis.db import models as gismodels
 from django.contrib.postgres import fields as pgmodels
 from django.contrib.postgres import search
 from django.utils.text import slugify
+from psycopg2.extras import Range
 
 from core.models import Entity
 
 
+# fields of an opening holding scraped contents, fingerprinted by its content hash
+OPENING_CONTENT_FIELDS = (
+    'role_title', 'description', 'url', 'is_remote', 'part_time_permitted', 'has_401k',
+    'has_dentalins', 'has_healthins', 'salary_range',
+)
+
+
+def compute_content_hash(data: dict) -> str:
+    """Returns a fingerprint of the scraped contents of an opening. Whitespace within
+    text contents is normalized, so it doesn't affect the fingerprint.
+
+    :param data: opening details keyed by field name, with missing fields taken as None
+    :type data: dict
+    :return: hex digest of the sha256 hash of the contents
+    :rtype: str
+    """
+    values = []
+    for field in OPENING_CONTENT_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+        elif isinstance(value, Range) and not value.isempty:
+            value = [value.lower, value.upper, value.lower_inc, value.upper_inc]
+        elif isinstance(value, Range):
+            value = None
+        values.append(value)
+
+    content = json.dumps(values, default=str, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
 class DurationUnit(Enum):
     DAYS = 'days'
     HOURS = 'hours'
@@ -28,6 +61,9 @@ class Company(Entity):
     vacancies_url = models.URLField('Vacancies Url', max_length=200)
     last_updated = models.DateTimeField('Last Updated', auto_now=False, auto_now_add=False)
     update_freq = models.IntegerField('Update Frequency', default=0)
+    last_full_scrape = models.DateTimeField(
+        'Last Full Scrape', auto_now=False, auto_now_add=False, blank=True, null=True
+    )
 
     class Meta:
         verbose_name_plural = 'Companies'
@@ -77,35 +113,80 @@ class Opening(Entity):
         'Date Inactive', auto_now=False, auto_now_add=False, blank=True, null=True
     )
     date_created = models.DateTimeField('Date Created', auto_now=False, auto_now_add=True)
+    date_verified = models.DateTimeField(
+        'Date Verified', auto_now=False, auto_now_add=False, blank=True, null=True
+    )
     tsdocument = search.SearchVectorField('Document')
+    content_hash = models.CharField('Content Hash', max_length=64, blank=True, default='')
 
-    def is_match(self, data: dict):
-        """Returns True if data matches opening details otherwise False.
+    class Meta:
+        indexes = [
+            # serves keyset pagination of openings listed latest first
+            models.Index(fields=['-date_active', '-id'], name='jobs_opening_latest_idx'),
+        ]
 
-        :param data: details to match against this opening instance.
-        :type data: dict
+    def save(self, *args, **kwargs):
+        """Saves an instance of the model.
+        """
+        self.content_hash = self.get_content_hash()
+        super().save(*args, **kwargs)
+
+    def get_content_hash(self) -> str:
+        """Returns a fingerprint of the scraped contents of this opening.
         """
-        pattern = re.compile('date_*')
-        exclude_list = (
-            'id', 'company', 'locations', 'entry_hash', 'tsdocument'
-        )
-
-        field_names = list(filter(
-            lambda f: f not in exclude_list and not pattern.match(f),
-            [f.name for f in self._meta.get_fields()]
-        ))
-
-        for field in field_names:
-            if (
-                field in data['job'] and
-                hasattr(self, field) and
-                getattr(self, field) != data['job'][field]
-            ):
-                return False
-
-        return True
+        return compute_content_hash({f: getattr(self, f) for f in OPENING_CONTENT_FIELDS})
 
     def __str__(self):
         """Returns string representation of the model.
         """
         return f'{self.role_title} at {self.company.name}'
+
+
+class ScrapeRun(Entity):
+    """Defines fields for recording the progress of a scrape run for a company, which
+    allows a run that was interrupted to be resumed.
+    """
+    RUNNING = 'running'
+    ABORTED = 'aborted'
+    COMPLETED = 'completed'
+    STATUSES = (
+        (RUNNING, 'Running'),
+        (ABORTED, 'Aborted'),
+        (COMPLETED, 'Completed'),
+    )
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUSES, default=RUNNING)
+    pages_done = pgmodels.ArrayField(
+        models.CharField(max_length=20), verbose_name='Pages Done', blank=True, default=list
+    )
+    date_started = models.DateTimeField('Date Started', auto_now=False, auto_now_add=False)
+    date_finished = models.DateTimeField(
+        'Date Finished', auto_now=False, auto_now_add=False, blank=True, null=True
+    )
+
+    def __str__(self):
+        """Returns string representation of the model.
+        """
+        return f'{self.company.name} ({self.status}) at {self.date_started}'
+
+
+class ScrapeRunPage(Entity):
+    """Defines fields for recording the jobs listed on a page within a scrape run, along
+    with the hashes of those whose details were processed. Jobs are held as a list of
+    their data and hash.
+    """
+    run = models.ForeignKey(ScrapeRun, on_delete=models.CASCADE, related_name='pages')
+    page_no = models.CharField('Page No', max_length=20)
+    jobs = pgmodels.JSONField(default=list)
+    processed = pgmodels.ArrayField(
+        models.CharField(max_length=200), verbose_name='Processed', blank=True, default=list
+    )
+
+    class Meta:
+        unique_together = ('run', 'page_no')
+
+    def __str__(self):
+        """Returns string representation of the model.
+        """
+        return f'page {self.page_no} ({len(self.jobs)} jobs)'
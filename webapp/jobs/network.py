@@ -0,0 +1,501 @@
+"""Defines objects for managing the HTTP traffic generated by scrapers.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from typing import Dict, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import pyppeteer
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests_html import HTML, HTMLResponse, HTMLSession
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket which allows `rate` requests per second on average with bursts
+    of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes a token from the bucket blocking until one is available.
+
+        Tokens are reserved while holding the lock and waited for after releasing it,
+        so concurrent callers are served in the order they arrive.
+
+        :return: the number of seconds spent waiting for a token
+        :rtype: float
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            self.tokens -= 1
+            delay = 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class RateLimiter:
+    """Limits the rate of requests made to each host, with each host having its own
+    token bucket. Requests to different hosts do not wait on each other.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        respect_robots: bool = None,
+        user_agent: str = '*'
+    ):
+        """Initializes a new rate limiter.
+
+        :param rate: requests per second allowed for each host, defaults to the
+            `SCRAPER_RATE_LIMIT` setting
+        :type rate: float, optional
+        :param burst: number of requests allowed in a burst, defaults to the
+            `SCRAPER_RATE_BURST` setting
+        :type burst: int, optional
+        :param respect_robots: indicates whether the Crawl-delay within a host's
+            robots.txt should be honored, defaults to the `SCRAPER_RESPECT_ROBOTS` setting
+        :type respect_robots: bool, optional
+        :param user_agent: user agent to read the Crawl-delay for, defaults to '*'
+        :type user_agent: str, optional
+        """
+        self.rate = rate or settings.SCRAPER_RATE_LIMIT
+        self.burst = burst or settings.SCRAPER_RATE_BURST
+        self.respect_robots = (
+            settings.SCRAPER_RESPECT_ROBOTS if respect_robots is None else respect_robots
+        )
+        self.user_agent = user_agent
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def get_crawl_delay(self, url: str) -> float:
+        """Returns the Crawl-delay set within the robots.txt for the host of a url.
+
+        :param url: url whose host robots.txt is to be read
+        :type url: str
+        :return: the crawl delay in seconds, None if not set or robots.txt isn't readable
+        :rtype: float
+        """
+        (scheme, netloc, *_) = urlsplit(url)
+        robots_url = urlunsplit((scheme, netloc, '/robots.txt', '', ''))
+        try:
+            res = requests.get(robots_url, timeout=10)
+            if res.status_code != 200:
+                return None
+
+            parser = RobotFileParser(robots_url)
+            parser.parse(res.text.splitlines())
+            delay = parser.crawl_delay(self.user_agent)
+            return float(delay) if delay else None
+        except Exception as ex:
+            log.debug(f'Reading {robots_url} failed. Error: {ex}')
+            return None
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """Returns the token bucket for the host of a url.
+        """
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+        if bucket:
+            return bucket
+
+        # robots.txt is read outside the lock to not hold up requests to other hosts
+        rate = self.rate
+        if self.respect_robots:
+            delay = self.get_crawl_delay(url)
+            if delay:
+                rate = min(rate, 1 / delay)
+                log.debug(f'Using Crawl-delay of {delay}s for {host} ...')
+
+        with self.lock:
+            return self.buckets.setdefault(host, TokenBucket(rate, self.burst))
+
+    def wait(self, url: str) -> float:
+        """Blocks until a request can be made to the host of a url.
+
+        :param url: url a request is to be made to
+        :type url: str
+        :return: the number of seconds spent waiting
+        :rtype: float
+        """
+        return self.get_bucket(url).acquire()
+
+
+class SessionManager:
+    """Manages pooled keep-alive sessions with one session kept for each scraper and
+    host pair, so requests made by a scraper to a host reuse connections and cookies.
+    """
+
+    def __init__(self, pool_size: int = None, timeout: float = None):
+        """Initializes a new session manager.
+
+        :param pool_size: maximum number of connections kept alive for each session,
+            defaults to the `SCRAPER_POOL_SIZE` setting
+        :type pool_size: int, optional
+        :param timeout: seconds to wait for a response before giving up, defaults to
+            the `SCRAPER_TIMEOUT` setting
+        :type timeout: float, optional
+        """
+        self.pool_size = pool_size or settings.SCRAPER_POOL_SIZE
+        self.timeout = timeout or settings.SCRAPER_TIMEOUT
+        self.sessions: Dict[Tuple[str, str], HTMLSession] = {}
+        self.lock = threading.Lock()
+
+    def create_session(self) -> HTMLSession:
+        """Returns a new session with a connection pool of `pool_size` connections.
+        """
+        session = HTMLSession()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        # brotli is included within ACCEPT_ENCODING when a brotli decoder is installed
+        session.headers.update({
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    def get_session(self, scraper_id: str, url: str) -> HTMLSession:
+        """Returns the session for requests made by a scraper to the host of a url.
+
+        :param scraper_id: identifier of the scraper making requests
+        :type scraper_id: str
+        :param url: url requests are to be made to
+        :type url: str
+        :return: the session for the scraper and url host
+        :rtype: HTMLSession
+        """
+        key = (scraper_id, urlsplit(url).netloc)
+        with self.lock:
+            session = self.sessions.get(key)
+            if not session:
+                session = self.sessions[key] = self.create_session()
+            return session
+
+    def close(self):
+        """Closes all managed sessions along with their pooled connections.
+        """
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as ex:
+                log.debug(f'Closing session failed. Error: {ex}')
+
+
+class HttpCache:
+    """On-disk cache of responses which carry validators (ETag or Last-Modified).
+
+    Validators for cached responses are sent along with requests as conditional
+    headers, a `304 Not Modified` response is then served from the cache. Entries are
+    evicted in least recently used order once the cache grows beyond `max_size`.
+    """
+
+    def __init__(self, path: str = None, max_size: int = None):
+        """Initializes a new http cache.
+
+        :param path: directory in which cached responses are stored, defaults to the
+            `SCRAPER_CACHE_DIR` setting
+        :type path: str, optional
+        :param max_size: maximum size of the cache in bytes, defaults to the
+            `SCRAPER_CACHE_SIZE` setting (in megabytes)
+        :type max_size: int, optional
+        """
+        self.path = path or settings.SCRAPER_CACHE_DIR
+        self.max_size = max_size or settings.SCRAPER_CACHE_SIZE * 1024 * 1024
+        self.entries: Dict[str, int] = None  # key -> size, in least recently used order
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _get_paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return (os.path.join(self.path, f'{key}.json'), os.path.join(self.path, f'{key}.body'))
+
+    def _load_entries(self):
+        """Reads cached entries from disk ordered by their last access time.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.body'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len('.body')], stat.st_size))
+
+        self.entries = {key: size for (_, key, size) in sorted(entries)}
+        self.size = sum(self.entries.values())
+
+    def _touch(self, key: str, size: int):
+        """Marks an entry as the most recently used. Expects the lock to be held.
+        """
+        if self.entries is None:
+            self._load_entries()
+
+        self.size -= self.entries.pop(key, 0)
+        self.entries[key] = size
+        self.size += size
+
+    def _evict(self):
+        """Removes least recently used entries until the cache is within its size.
+        Expects the lock to be held.
+        """
+        while self.size > self.max_size and self.entries:
+            key = next(iter(self.entries))
+            self.size -= self.entries.pop(key)
+            for ext in ('json', 'body'):
+                try:
+                    os.remove(os.path.join(self.path, f'{key}.{ext}'))
+                except FileNotFoundError:
+                    pass
+
+    def get_headers(self, url: str) -> Dict[str, str]:
+        """Returns conditional request headers for the cached response of a url.
+
+        :param url: url to return conditional headers for
+        :type url: str
+        :return: the conditional headers, empty if no response is cached for url
+        :rtype: Dict[str, str]
+        """
+        (meta_path, _) = self._get_paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url: str, res: HTMLResponse) -> HTMLResponse:
+        """Fills a `304 Not Modified` response with the cached response for a url.
+
+        :param url: url the response was returned for
+        :type url: str
+        :param res: the not modified response
+        :type res: HTMLResponse
+        :return: the response with cached status, content and encoding
+        :rtype: HTMLResponse
+        """
+        (meta_path, body_path) = self._get_paths(url)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+
+        os.utime(body_path)
+        with self.lock:
+            self._touch(os.path.basename(body_path)[:-len('.body')], len(content))
+
+        res._content = content
+        res.status_code = 200
+        res.encoding = meta.get('encoding')
+        return res
+
+    def store(self, url: str, res: HTMLResponse):
+        """Caches a response if it carries validators.
+
+        :param url: url the response was returned for
+        :type url: str
+        :param res: the response to cache
+        :type res: HTMLResponse
+        """
+        meta = {
+            'url': url,
+            'etag': res.headers.get('ETag'),
+            'last_modified': res.headers.get('Last-Modified'),
+            'encoding': res.encoding,
+        }
+        if not (meta['etag'] or meta['last_modified']) or len(res.content) > self.max_size:
+            return
+
+        (meta_path, body_path) = self._get_paths(url)
+        with self.lock:
+            if self.entries is None:
+                self._load_entries()
+
+        # write to temp files first so readers never see a partially written entry
+        suffix = f'.{threading.get_ident()}.tmp'
+        with open(body_path + suffix, 'wb') as f:
+            f.write(res.content)
+        with open(meta_path + suffix, 'w') as f:
+            json.dump(meta, f)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+
+        with self.lock:
+            self._touch(os.path.basename(body_path)[:-len('.body')], len(res.content))
+            self._evict()
+
+    def process(self, url: str, res: HTMLResponse) -> HTMLResponse:
+        """Returns the response for a conditional request to a url; served from the
+        cache if not modified, otherwise cached if successful.
+
+        The returned response has its `from_cache` attribute set to True when served
+        from the cache.
+        """
+        res.from_cache = False
+        if res.status_code == 304:
+            try:
+                res = self.load(url, res)
+                res.from_cache = True
+            except (OSError, ValueError) as ex:
+                log.debug(f'Reading cached response for {url} failed. Error: {ex}')
+        elif res.status_code == 200:
+            self.store(url, res)
+        return res
+
+
+class BrowserPool:
+    """Keeps a headless Chromium browser alive across renders, handing out pages (tabs)
+    to at most `max_pages` renders at a time.
+
+    The browser is driven from an event loop running within a dedicated thread, so
+    renders can be requested from any thread.
+    """
+
+    def __init__(self, max_pages: int = None, timeout: float = None):
+        """Initializes a new browser pool.
+
+        :param max_pages: maximum number of pages open at any moment, defaults to the
+            `SCRAPER_BROWSER_PAGES` setting
+        :type max_pages: int, optional
+        :param timeout: seconds to wait for a page to load, defaults to the
+            `SCRAPER_TIMEOUT` setting
+        :type timeout: float, optional
+        """
+        self.max_pages = max_pages or settings.SCRAPER_BROWSER_PAGES
+        self.timeout = timeout or settings.SCRAPER_TIMEOUT
+        self.browser = None
+        self.loop: asyncio.AbstractEventLoop = None
+        self.semaphore: asyncio.Semaphore = None
+        self.thread: threading.Thread = None
+        self.lock = threading.Lock()
+
+    async def _launch(self):
+        # semaphore is created within the coroutine to bind it to the pool loop
+        self.semaphore = asyncio.Semaphore(self.max_pages)
+        self.browser = await pyppeteer.launch(
+            headless=True,
+            args=['--no-sandbox'],
+            # signal handlers can only be installed from the main thread
+            handleSIGINT=False,
+            handleSIGTERM=False,
+            handleSIGHUP=False
+        )
+
+    def _start(self):
+        """Launches the browser within the pool thread if not launched yet.
+        """
+        with self.lock:
+            if self.loop:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='browser-pool', daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._launch(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                raise
+
+            (self.loop, self.thread) = (loop, thread)
+            log.debug('Browser launched ...')
+
+    async def _render(
+        self, url: str, wait_for: str, timeout: float, user_agent: str
+    ) -> str:
+        async with self.semaphore:
+            page = await self.browser.newPage()
+            try:
+                if user_agent:
+                    await page.setUserAgent(user_agent)
+
+                options = {'timeout': int(timeout * 1000)}
+                await page.goto(url, {**options, 'waitUntil': 'domcontentloaded'})
+                if wait_for:
+                    await page.waitForSelector(wait_for, options)
+                return await page.content()
+            finally:
+                await page.close()
+
+    def render(
+        self,
+        url: str,
+        wait_for: str = None,
+        timeout: float = None,
+        session: HTMLSession = None
+    ) -> HTML:
+        """Returns the contents of a page once rendered by the browser.
+
+        :param url: url of the page to render
+        :type url: str
+        :param wait_for: css selector for an element which is to be present for the page
+            to be considered rendered, defaults to waiting only for the page to load
+        :type wait_for: str, optional
+        :param timeout: seconds to wait for the page to be rendered, defaults to the
+            pool timeout
+        :type timeout: float, optional
+        :param session: session whose user agent is used for the render and which is
+            attached to the returned html
+        :type session: HTMLSession, optional
+        :return: the rendered page contents
+        :rtype: HTML
+        """
+        self._start()
+        user_agent = session.headers.get('User-Agent') if session else None
+        coro = self._render(url, wait_for, timeout or self.timeout, user_agent)
+        content = asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        return HTML(session=session, url=url, html=content)
+
+    def close(self):
+        """Closes the browser and stops the pool thread.
+        """
+        with self.lock:
+            if not self.loop:
+                return
+
+            try:
+                coro = self.browser.close()
+                asyncio.run_coroutine_threadsafe(coro, self.loop).result(self.timeout)
+            except Exception as ex:
+                log.debug(f'Closing browser failed. Error: {ex}')
+            finally:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.thread.join()
+                self.loop.close()
+                (self.browser, self.loop, self.thread) = (None, None, None)
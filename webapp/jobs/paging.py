@@ -0,0 +1,271 @@
+"""Defines keyset (cursor) pagination of querysets.
+
+Pages are fetched by filtering on the ordering keys of the last row of the previous
+page, rather than with an OFFSET, and without counting the rows of the queryset. Every
+page then costs the same as the first one when the ordering is served by an index.
+
+The position of a page is passed around as an opaque, signed `after` token holding the
+ordering and the key values of the last row of the previous page.
+
+As counting all the rows of a large queryset is costly, rows are only counted exactly up
+to a threshold, beyond which their number is estimated by the query planner.
+"""
+import json
+
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import BooleanField, F, Func, Model, Q, QuerySet, Value
+
+
+SIGNING_SALT = 'jobs.paging'
+
+
+class InvalidCursor(ValueError):
+    """Error thrown when an `after` token cannot be decoded.
+    """
+
+
+def encode_cursor(ordering: Sequence[str], values: Sequence[Any]) -> str:
+    """Returns an opaque token for the position after a row.
+
+    :param ordering: the ordering of the paginated queryset
+    :type ordering: Sequence[str]
+    :param values: the values of the ordering keys for the row
+    :type values: Sequence[Any]
+    :return: the token
+    :rtype: str
+    """
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return signing.dumps([list(ordering), values], salt=SIGNING_SALT)
+
+
+def decode_cursor(token: str) -> List[list]:
+    """Returns the ordering and key values held by a token.
+
+    :param token: token returned by `encode_cursor`
+    :type token: str
+    :return: the ordering and the values of its keys
+    :rtype: List[list]
+    """
+    try:
+        (ordering, values) = signing.loads(token, salt=SIGNING_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursor(f'Invalid cursor: {token}')
+
+    if not (isinstance(ordering, list) and isinstance(values, list)) \
+            or len(ordering) != len(values):
+        raise InvalidCursor(f'Invalid cursor: {token}')
+    return [ordering, values]
+
+
+class RowComparison(Func):
+    """Compares rows of values, such as `(date_active, id) < (%s, %s)`, which can be
+    served as a range scan by an index on the compared columns.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, keys: Sequence[str], values: Sequence[Any], operator: str):
+        self.operator = operator
+        super().__init__(*[F(key) for key in keys], *[Value(value) for value in values])
+
+    def as_sql(self, compiler, connection):
+        (parts, params) = ([], [])
+        for expression in self.get_source_expressions():
+            (sql, expression_params) = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+
+        size = len(parts) // 2
+        sql = f"(({', '.join(parts[:size])}) {self.operator} ({', '.join(parts[size:])}))"
+        return (sql, params)
+
+
+def _is_field(model: Optional[Model], name: str) -> bool:
+    try:
+        return model is not None and bool(model._meta.get_field(name).concrete)
+    except FieldDoesNotExist:
+        return False
+
+
+def keyset_filter(
+    ordering: Sequence[str], values: Sequence[Any], model: Model = None
+) -> Q:
+    """Returns the filter for rows ordered after the row with the given key values.
+    Ordering keys are expected to be non-null and to end with a unique key.
+
+    When all keys are fields of the model ordered in the same direction, rows are
+    compared as a whole, for example `(date_active, id) < (d, i)` for ordering
+    `('-date_active', '-id')`, which an index on the keys serves as a range scan.
+    Otherwise the comparison is expanded, for example `rank <= r AND (rank < r OR
+    (rank = r AND id > i))` for ordering `('-rank', 'id')`, bounded by the leading key.
+
+    :param ordering: the ordering keys, prefixed with '-' when descending
+    :type ordering: Sequence[str]
+    :param values: the values of the ordering keys for the row
+    :type values: Sequence[Any]
+    :param model: the model of the paginated queryset, defaults to None
+    :type model: Model, optional
+    :return: the filter
+    :rtype: Q
+    """
+    fields = [key.lstrip('-') for key in ordering]
+    directions = {key.startswith('-') for key in ordering}
+    if len(directions) == 1 and all(_is_field(model, field) for field in fields):
+        operator = '<' if directions.pop() else '>'
+        values = [
+            model._meta.get_field(field).to_python(value)
+            for (field, value) in zip(fields, values)
+        ]
+        return Q(RowComparison(fields, values, operator))
+
+    condition = Q()
+    for (index, key) in enumerate(ordering):
+        (field, descending) = (fields[index], key.startswith('-'))
+        preceding = dict(zip(fields[:index], values))
+        lookup = f"{field}__{'lt' if descending else 'gt'}"
+        condition |= Q(**preceding, **{lookup: values[index]})
+
+    # the bound on the leading key lets an index on it bound the range scanned
+    lookup = f"{fields[0]}__{'lte' if ordering[0].startswith('-') else 'gte'}"
+    return Q(**{lookup: values[0]}) & condition
+
+
+class KeysetPage(Sequence):
+    """Page of rows fetched by keyset pagination.
+    """
+
+    def __init__(
+        self, object_list: list, ordering: Sequence[str], has_next: bool,
+        has_previous: bool
+    ):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    @property
+    def next_after(self) -> Optional[str]:
+        """Returns the token for the next page, None on the last page.
+        """
+        if not (self.has_next and self.object_list):
+            return None
+
+        last = self.object_list[-1]
+        return encode_cursor(self.ordering, [
+            getattr(last, key.lstrip('-')) for key in self.ordering
+        ])
+
+
+def keyset_paginate(
+    queryset: QuerySet, ordering: Sequence[str], page_size: int, after: str = None
+) -> KeysetPage:
+    """Returns the page of a queryset following the position of an `after` token, or
+    the first page without a token. Tokens for another ordering are ignored.
+
+    :param queryset: the queryset to paginate
+    :type queryset: QuerySet
+    :param ordering: the ordering keys, prefixed with '-' when descending, the last of
+        which must be unique
+    :type ordering: Sequence[str]
+    :param page_size: number of rows per page
+    :type page_size: int
+    :param after: the token for the page, defaults to None
+    :type after: str, optional
+    :raises InvalidCursor: when the token cannot be decoded
+    :return: the page
+    :rtype: KeysetPage
+    """
+    ordering = list(ordering)
+    queryset = queryset.order_by(*ordering)
+
+    has_previous = False
+    if after:
+        (after_ordering, values) = decode_cursor(after)
+        if after_ordering == ordering:
+            queryset = queryset.filter(keyset_filter(ordering, values, queryset.model))
+            has_previous = True
+
+    # fetch an extra row to find out whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    return KeysetPage(rows[:page_size], ordering, len(rows) > page_size, has_previous)
+
+
+class RowCount(NamedTuple):
+    """Number of rows of a queryset along with how it was arrived at.
+    """
+    value: int
+    mode: str
+
+    EXACT = 'exact'
+    PLANNER = 'planner'
+    RELTUPLES = 'reltuples'
+
+    @property
+    def is_exact(self) -> bool:
+        return self.mode == RowCount.EXACT
+
+
+def count_rows(
+    queryset: QuerySet, threshold: int = None, filtered: bool = True
+) -> RowCount:
+    """Returns the number of rows of a queryset, counted exactly when there are no more
+    rows than a threshold. Beyond the threshold, the number of rows is estimated from
+    the row estimate of the query plan, or from the statistics of the table for
+    querysets which are not filtered.
+
+    :param queryset: the queryset to count the rows of
+    :type queryset: QuerySet
+    :param threshold: number of rows up to which rows are counted exactly, defaults to
+        the `SEARCH_COUNT_THRESHOLD` setting
+    :type threshold: int, optional
+    :param filtered: indicates whether the queryset filters the rows of its table,
+        defaults to True
+    :type filtered: bool, optional
+    :return: the number of rows
+    :rtype: RowCount
+    """
+    threshold = settings.SEARCH_COUNT_THRESHOLD if threshold is None else threshold
+
+    # counting rows stops at the threshold, bounding the cost of counting
+    queryset = queryset.order_by()
+    value = queryset[:threshold + 1].count()
+    if value <= threshold:
+        return RowCount(value, RowCount.EXACT)
+    if not filtered:
+        return RowCount(max(_table_estimate(queryset), value), RowCount.RELTUPLES)
+    return RowCount(max(_planner_estimate(queryset), value), RowCount.PLANNER)
+
+
+def _planner_estimate(queryset: QuerySet) -> int:
+    (sql, params) = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _table_estimate(queryset: QuerySet) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass;',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row else 0
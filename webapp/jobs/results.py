@@ -0,0 +1,245 @@
+"""Defines caching of search results between scrape runs.
+
+Openings only change when jobs are scraped, so the results of a search are cached along
+with the data version they were computed for. The data version is kept within a file,
+`SEARCH_DATA_VERSION_FILE`, which the scraping engine replaces once it is done. Results
+cached for an earlier data version are never served.
+
+Cached results hold the ordering key values of the matching openings, up to
+`SEARCH_CACHE_MAX_RESULTS` openings, and their count. Pages within the cached results
+are served by fetching the openings on the page by id, without running the search again.
+"""
+import logging
+import os
+import threading
+import uuid
+
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from jobs.models import Opening
+from jobs.paging import KeysetPage, RowCount, count_rows, decode_cursor, keyset_paginate
+
+
+log = logging.getLogger(__name__)
+
+# data version when jobs were never scraped
+INITIAL_VERSION = '0'
+
+
+def get_data_version(path: str = None) -> str:
+    """Returns the current data version.
+
+    :param path: path of the data version file, defaults to the
+        `SEARCH_DATA_VERSION_FILE` setting
+    :type path: str, optional
+    :return: the data version
+    :rtype: str
+    """
+    path = path or settings.SEARCH_DATA_VERSION_FILE
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip() or INITIAL_VERSION
+    except FileNotFoundError:
+        return INITIAL_VERSION
+
+
+def bump_data_version(path: str = None) -> str:
+    """Replaces the data version with a new one, invalidating all cached results.
+
+    :param path: path of the data version file, defaults to the
+        `SEARCH_DATA_VERSION_FILE` setting
+    :type path: str, optional
+    :return: the new data version
+    :rtype: str
+    """
+    path = path or settings.SEARCH_DATA_VERSION_FILE
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    # the file is replaced at once so readers never see a partly written version
+    version = uuid.uuid4().hex
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, path)
+
+    log.debug(f'Data version bumped to {version} ...')
+    return version
+
+
+class SearchResult(NamedTuple):
+    """Results of a search as the ordering key values of the matching openings, along
+    with their count. `complete` is False when only the first matching openings are
+    held.
+    """
+    rows: List[tuple]
+    count: RowCount
+    complete: bool
+
+    def find(self, opening_id: int) -> Optional[int]:
+        """Returns the position of an opening within the results, None if not held.
+        """
+        for (index, row) in enumerate(self.rows):
+            if row[-1] == opening_id:
+                return index
+        return None
+
+
+class ResultCache:
+    """Cache of search results for the current data version, bounded to `max_size`
+    results with least recently used results evicted.
+    """
+
+    def __init__(self, max_size: int = None, path: str = None):
+        """Initializes a new result cache.
+
+        :param max_size: maximum number of search results to keep in memory, defaults
+            to the `SEARCH_CACHE_SIZE` setting
+        :type max_size: int, optional
+        :param path: path of the data version file, defaults to the
+            `SEARCH_DATA_VERSION_FILE` setting
+        :type path: str, optional
+        """
+        self.max_size = max_size or settings.SEARCH_CACHE_SIZE
+        self.path = path
+        self.version = INITIAL_VERSION
+        self.results: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_version(self) -> str:
+        """Returns the current data version, dropping cached results when it changed.
+        """
+        version = get_data_version(self.path)
+        with self.lock:
+            if version != self.version:
+                self.results.clear()
+                self.version = version
+        return version
+
+    def get(self, key: Sequence[Any], version: str) -> Optional[SearchResult]:
+        """Returns the search results cached for a key and data version, if any.
+        """
+        with self.lock:
+            entry = self.results.get(tuple(key))
+            if not entry or entry[0] != version:
+                return None
+
+            self.results.move_to_end(tuple(key))
+            return entry[1]
+
+    def set(self, key: Sequence[Any], version: str, result: SearchResult):
+        """Caches search results computed for a data version, unless the data version
+        changed since.
+        """
+        with self.lock:
+            if version != self.version:
+                return
+
+            self.results[tuple(key)] = (version, result)
+            self.results.move_to_end(tuple(key))
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+
+# process-wide cache of search results
+result_cache = ResultCache()
+
+
+def _fetch_results(
+    queryset: QuerySet, ordering: Sequence[str], filtered: bool
+) -> SearchResult:
+    max_results = settings.SEARCH_CACHE_MAX_RESULTS
+    fields = [key.lstrip('-') for key in ordering]
+    rows = list(queryset.order_by(*ordering).values_list(*fields)[:max_results + 1])
+
+    if len(rows) <= max_results:
+        return SearchResult(rows, RowCount(len(rows), RowCount.EXACT), True)
+    return SearchResult(rows[:max_results], count_rows(queryset, filtered=filtered), False)
+
+
+def _get_page(
+    result: SearchResult, ordering: Sequence[str], page_size: int, after: str = None
+) -> Optional[KeysetPage]:
+    """Returns the page following the position of an `after` token within search
+    results, None when the page isn't held by the results.
+    """
+    ordering = list(ordering)
+    start = 0
+    if after:
+        (after_ordering, values) = decode_cursor(after)
+        if after_ordering == ordering:
+            position = result.find(values[-1])
+            if position is None:
+                return None
+            start = position + 1
+
+    rows = result.rows[start:start + page_size]
+    end = start + len(rows)
+    if len(rows) < page_size and not result.complete:
+        return None
+
+    openings = Opening.objects.defer('description', 'tsdocument').in_bulk(
+        [row[-1] for row in rows]
+    )
+    object_list = []
+    for row in rows:
+        opening = openings.get(row[-1])
+        if opening is None:
+            return None
+
+        # ordering keys may be annotations, such as the rank or distance
+        for (key, value) in zip(ordering, row):
+            setattr(opening, key.lstrip('-'), value)
+        object_list.append(opening)
+
+    has_next = end < len(result.rows) or not result.complete
+    return KeysetPage(object_list, ordering, has_next, start > 0)
+
+
+def paginate_results(
+    queryset: QuerySet,
+    ordering: Sequence[str],
+    page_size: int,
+    after: str = None,
+    key: Sequence[Any] = (),
+    filtered: bool = True
+) -> Tuple[KeysetPage, RowCount]:
+    """Returns a page of search results along with the number of results. Results are
+    cached by key for the current data version, and pages beyond the cached results are
+    fetched by keyset pagination.
+
+    :param queryset: the openings matching the search
+    :type queryset: QuerySet
+    :param ordering: the ordering keys, prefixed with '-' when descending, the last of
+        which must be the opening id
+    :type ordering: Sequence[str]
+    :param page_size: number of openings per page
+    :type page_size: int
+    :param after: the token for the page, defaults to None
+    :type after: str, optional
+    :param key: values identifying the search, such as normalized search terms
+    :type key: Sequence[Any]
+    :param filtered: indicates whether the queryset filters openings, defaults to True
+    :type filtered: bool, optional
+    :raises InvalidCursor: when the token cannot be decoded
+    :return: the page and the number of results
+    :rtype: Tuple[KeysetPage, RowCount]
+    """
+    key = (tuple(ordering), *key)
+    version = result_cache.get_version()
+    result = result_cache.get(key, version)
+    if result is None:
+        result = _fetch_results(queryset, ordering, filtered)
+        result_cache.set(key, version, result)
+
+    page = _get_page(result, ordering, page_size, after)
+    if page is None:
+        page = keyset_paginate(queryset, ordering, page_size, after)
+    return (page, result.count)
@@ -2,18 +2,39 @@
 """
 import hashlib
 import logging
-import time
-
-from collections import namedtuple
-from dataclasses import dataclass
-from datetime import datetime
+import queue
+import threading
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+)
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
 from functools import reduce
-from urllib.parse import urljoin
-from typing import Dict, Iterable, List
-
-from django.db import connection
-from requests_html import AsyncHTMLSession, Element, HTMLResponse, HTMLSession
-from jobs.models import Company, Location, Opening
+from itertools import groupby
+from operator import attrgetter
+from urllib.parse import urljoin, urlsplit
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils import timezone
+from lxml.html import HtmlElement
+from requests_html import HTML, HTMLResponse
+from jobs import extract
+from jobs.checkpoint import Checkpoint
+from jobs.exceptions import NotModifiedError
+from jobs.known import KnownOpenings
+from jobs.logic import openings_bulk_insert, openings_deactivate, openings_tsdocument_deferred
+from jobs.metrics import (
+    DETAIL_FETCH, LISTING_FETCH, PARSE, RENDER, Metrics, write_file, write_json
+)
+from jobs.models import (
+    OPENING_CONTENT_FIELDS, Company, Location, Opening, ScrapeRun, compute_content_hash
+)
+from jobs.network import BrowserPool, HttpCache, RateLimiter, SessionManager
+from jobs.results import bump_data_version
 
 
 log = logging.getLogger(__name__)
@@ -33,6 +54,7 @@ class Stats:
     failed: int = 0
     ignored: int = 0
     updated: int = 0
+    deactivated: int = 0
 
     def __add__(self, other):
         return Stats(
@@ -40,6 +62,7 @@ class Stats:
             failed=self.failed + other.failed,
             ignored=self.ignored + other.ignored,
             updated=self.updated + other.updated,
+            deactivated=self.deactivated + other.deactivated,
         )
 
     def __str__(self):
@@ -49,39 +72,250 @@ class Stats:
     def format(stat):
         return (
             "created: {stat.created} / updated: {stat.updated} /" +
-            "ignored: {stat.ignored} / failed: {stat.failed}"
+            "ignored: {stat.ignored} / failed: {stat.failed} / " +
+            "deactivated: {stat.deactivated}"
         ).format(stat=stat)
 
 
+class LocationResolver:
+    """Resolves location names to locations, keeping an in-memory map of location
+    names to ids bounded to `max_size` names with least recently used names evicted.
+
+    Names missing from the map are resolved with a single insert for all missing names
+    which ignores names that already exist, then a lookup for the ignored names.
+    """
+
+    def __init__(self, max_size: int = None):
+        """Initializes a new location resolver.
+
+        :param max_size: maximum number of location names to keep in memory, defaults
+            to the `SCRAPER_LOCATIONS_CACHE_SIZE` setting
+        :type max_size: int, optional
+        """
+        self.max_size = max_size or settings.SCRAPER_LOCATIONS_CACHE_SIZE
+        self.ids: Dict[str, int] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _add(self, ids: Dict[str, int]):
+        """Adds location names to the map. Expects the lock to be held.
+        """
+        self.ids.update(ids)
+        while len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
+
+    def warm(self):
+        """Loads the most recently created locations into the map.
+        """
+        locations = Location.objects.order_by('-id').values_list('name', 'id')
+        ids = list(locations[:self.max_size])
+        with self.lock:
+            self.ids.clear()
+            self._add(dict(reversed(ids)))
+
+        log.debug(f'{len(ids)} known locations loaded ...')
+
+    def _create(self, names: List[str]) -> Dict[str, int]:
+        """Creates locations for names that don't exist yet and returns the ids for all
+        names.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO jobs_location (name) SELECT UNNEST(%s::varchar[]) "
+                "ON CONFLICT (name) DO NOTHING RETURNING name, id;",
+                [names]
+            )
+            ids = dict(cursor.fetchall())
+
+        # names that already existed or were created by a concurrent insert
+        existing = [name for name in names if name not in ids]
+        if existing:
+            ids.update(Location.objects.filter(name__in=existing).values_list('name', 'id'))
+        return ids
+
+    def resolve(self, names: List[str]) -> List[Location]:
+        """Returns locations for provided names, creating locations for unknown names.
+
+        :param names: names of locations to resolve
+        :type names: List[str]
+        :return: locations for provided names
+        :rtype: List[Location]
+        """
+        max_length = Location._meta.get_field('name').max_length
+        names = [name for name in OrderedDict.fromkeys(names) if name]
+        for name in filter(lambda name: len(name) > max_length, names):
+            log.debug(f'Ignoring location name longer than {max_length}: {name} ...')
+        names = [name for name in names if len(name) <= max_length]
+
+        with self.lock:
+            ids = {name: self.ids[name] for name in names if name in self.ids}
+            for name in ids:
+                self.ids.move_to_end(name)
+
+        missing = [name for name in names if name not in ids]
+        if missing:
+            created = self._create(missing)
+            ids.update(created)
+            with self.lock:
+                self._add(created)
+
+        return [Location(id=ids[name], name=name) for name in names if name in ids]
+
+
+@dataclass
+class QueueDepth:
+    """Tracks the depth of a queue between pipeline stages as items are queued.
+    """
+    count: int = 0
+    max: int = 0
+    total: int = 0
+
+    def add(self, depth: int):
+        self.count += 1
+        self.max = max(self.max, depth)
+        self.total += depth
+
+    def __str__(self):
+        average = self.total / self.count if self.count else 0
+        return f"queued: {self.count} / max: {self.max} / average: {average:.1f}"
+
+
 class SiteScraper:
     """Scraps a site to collect all job listings.
+
+    Scrapers with `ASYNC` set to True have their vacancy details scraped concurrently
+    by the engine, hence `scrape_vacancy_details` must not depend on state shared with
+    other detail fetches.
+
+    All HTTP requests should be made through `request` so they are paced by the rate
+    limiter shared by all scrapers and reuse the pooled sessions for the scraper.
+
+    The engine sets `known_hashes` to the index of known openings, which supports `in`
+    checks for hashes of known openings. This allows skipping the processing of
+    unchanged vacancy details pages for known openings.
+
+    The engine also sets `incremental` to True when listings need not be scraped in
+    full. Scrapers may then stop scraping listings once only known openings are being
+    listed, setting `is_partial` to True so that known openings not listed are not
+    taken as inactive.
+
+    The engine also sets `metrics` to the metrics collected for the scrape run, within
+    which scrapers should record the time spent parsing pages with `metrics.time`.
+
+    When resuming an interrupted scrape run, the engine sets `pages_done` to the numbers
+    of the listing pages done by the interrupted run. Scrapers may skip fetching these
+    pages, as jobs listed on them are dropped by the engine.
     """
+    ASYNC = False
+    ID = None
+    incremental = False
+    is_partial = False
+    browsers = BrowserPool()
+    cache = HttpCache()
+    known_hashes = frozenset()
+    location_resolver = LocationResolver()
+    metrics = Metrics()
+    pages_done = frozenset()
+    rate_limiter = RateLimiter()
+    sessions = SessionManager()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        cache: bool = False,
+        stage: str = LISTING_FETCH,
+        **kwargs
+    ) -> HTMLResponse:
+        """Makes a HTTP request once allowed by the rate limiter for the url host.
+
+        :param method: the HTTP method for the request
+        :type method: str
+        :param url: the url to make the request to
+        :type url: str
+        :param cache: indicates whether the request should be made conditionally
+            against the http cache, defaults to False
+        :type cache: bool, optional
+        :param stage: the stage of the scrape run the request is timed as part of,
+            defaults to the listing fetch stage
+        :type stage: str, optional
+        :return: the response for the request
+        :rtype: HTMLResponse
+        """
+        kwargs.setdefault('timeout', self.sessions.timeout)
+        session = self.sessions.get_session(self.ID, url)
+        headers = kwargs.pop('headers', None) or {}
+        conditional_headers = self.cache.get_headers(url) if cache else {}
+
+        self.rate_limiter.wait(url)
+        with self.metrics.time(stage):
+            res = session.request(
+                method, url, headers={**headers, **conditional_headers}, **kwargs
+            )
+            if cache:
+                res = self.cache.process(url, res)
+
+        if cache and res.status_code == 304:
+            # cached response has gone missing; request again unconditionally
+            self.rate_limiter.wait(url)
+            with self.metrics.time(stage):
+                res = session.request(method, url, headers=headers, **kwargs)
+                res = self.cache.process(url, res)
+
+        res.raise_for_status()
+        return res
+
+    def render(self, url: str, wait_for: str = None, timeout: float = None) -> HTML:
+        """Returns the contents of a page rendered by the browser pool shared by all
+        scrapers, once allowed by the rate limiter for the url host.
+
+        :param url: url of the page to render
+        :type url: str
+        :param wait_for: css selector for an element which is to be present for the page
+            to be considered rendered, defaults to None
+        :type wait_for: str, optional
+        :param timeout: seconds to wait for the page to be rendered, defaults to None
+        :type timeout: float, optional
+        :return: the rendered page contents
+        :rtype: HTML
+        """
+        session = self.sessions.get_session(self.ID, url)
+
+        self.rate_limiter.wait(url)
+        with self.metrics.time(RENDER):
+            return self.browsers.render(url, wait_for=wait_for, timeout=timeout, session=session)
+
+    def get_vacancy_page(self, job: Job, job_url: str) -> HTMLResponse:
+        """Returns the details page for a vacancy.
+
+        :param job: the vacancy whose details page is to be returned
+        :type job: Job
+        :param job_url: url for the vacancy details page
+        :type job_url: str
+        :raises NotModifiedError: if page hasn't changed since it was last scraped and
+            the vacancy is for a known opening
+        :return: the vacancy details page
+        :rtype: HTMLResponse
+        """
+        res = self.request('GET', job_url, cache=True, stage=DETAIL_FETCH)
+        if res.from_cache and job.hash in self.known_hashes:
+            raise NotModifiedError(job_url)
+        return res
 
     def get_locations(self, location_names: List[str]) -> List[Location]:
-        """Retrives locations matching provided names.
+        """Retrives locations matching provided names, creating locations for names
+        which do not match any known location.
 
         :param location_names: names of locations to retrieve
         :type location_names: List[str]
         :return: locations matching provided names.
         :rtype: List[Location]
         """
-        locations = []
-        if location_names:
-            locations = list(Location.objects.filter(name__in=location_names))
-
-        if len(locations) < len(location_names):
-            known_names = {loc.name for loc in locations}
-            for name in set(location_names).difference(known_names):
-                loc = Location(name=name)
-                try:
-                    loc.save()
-                    locations.append(loc)
-                except Exception:
-                    pass
+        return self.location_resolver.resolve(location_names)
 
-        return locations
-
-    def scrape_vacancies(self) -> List[Job]:
+    def scrape_vacancies(self) -> Iterable[Job]:
+        """Returns jobs listed on the site. Jobs should be returned as they are scraped,
+        so their details can be scraped while the rest of the listings are scraped.
+        """
         raise NotImplementedError()
 
     def scrape_vacancy_details(self, company: Company, job: Job):
@@ -93,18 +327,25 @@ class SequoiaScraper(SiteScraper):
     """
     ASYNC = True
     ID = 'sequoai'
-    JS_RENDER_WAIT = 5  # seconds
+    JS_RENDER_SELECTOR = '.jobs._company'
     JS_RENDER_TIMEOUT = 30 # seconds
+    SECTIONS = extract.Selector(JS_RENDER_SELECTOR)
+    SECTION_COMPANY = extract.Selector('span')
+    SECTION_JOBS = extract.Selector('ul.jobs._list')
+    SECTION_JOB_LINKS = extract.Selector('li > a')
+    JOB_CONTENT = extract.Selector('.job._content')
+    JOB_DESCRIPTION = extract.Selector('.job._job-description')
+    JOB_TITLE = extract.Selector('.job._job-desc-title')
+    JOB_DIVS = extract.Selector('div')
 
     def __init__(self, url: str):
         self.url = url
-        self.session = HTMLSession()
 
-    def _get_jobs(self, section: Element, page_no: str) -> List[Job]:
+    def _get_jobs(self, section: HtmlElement, page_no: str) -> List[Job]:
         """Returns job postings within a company section
 
         :param section: html content to proces to extract jobs.
-        :type section: Element
+        :type section: HtmlElement
         :param page_no: the section part being processed
         :type page_no: str
         :return: list of jobs
@@ -112,12 +353,13 @@ class SequoiaScraper(SiteScraper):
         """
         jobs: List[Job] = []
 
-        company = section.find('span', first=True)
-        content = section.find('ul.jobs._list', first=True)
+        company = self.SECTION_COMPANY.first(section)
+        content = self.SECTION_JOBS.first(section)
 
-        rows = [] if not content else content.find('li > a')
+        company_name = '' if company is None else extract.text(company)
+        rows = [] if content is None else self.SECTION_JOB_LINKS.all(content)
         for row in rows:
-            title_parts = row.text.split('\n')
+            title_parts = extract.text(row).split('\n')
 
             text = '::'.join(title_parts)
             text_hash = hashlib.sha256(text.encode('utf-8'))
@@ -126,9 +368,9 @@ class SequoiaScraper(SiteScraper):
                 'page_no': page_no,
                 'hash': text_hash.hexdigest(),
                 'data': {
-                    'company_name': company.text if company else '',
+                    'company_name': company_name,
                     'title': ' | '.join(title_parts),
-                    'href': urljoin(self.url, row.attrs['href']),
+                    'href': urljoin(self.url, row.get('href')),
                     'location': None if len(title_parts) == 1 else title_parts[1],
                     'deadline': None,
                 }
@@ -137,38 +379,42 @@ class SequoiaScraper(SiteScraper):
         return jobs
 
     def _read_sections(self):
-        res = self.session.get(self.url)
-        res.raise_for_status()
-
-        res.html.render(wait=self.JS_RENDER_WAIT, timeout=self.JS_RENDER_TIMEOUT)
-        contents = res.html.find('.jobs._company')
+        html = self.render(
+            self.url, wait_for=self.JS_RENDER_SELECTOR, timeout=self.JS_RENDER_TIMEOUT
+        )
+        with self.metrics.time(PARSE):
+            contents = self.SECTIONS.all(extract.parse_html(html.html))
         log.debug(f'{len(contents)} contents found ...')
         return contents or []
 
-    def scrape_vacancies(self) -> List[Job]:
+    def scrape_vacancies(self) -> Iterable[Job]:
         log.debug(f'processing page: {self.url} ...')
+        if '1' in self.pages_done:
+            log.debug('page 1 already done ...')
+            return
 
-        jobs: List[Job] = []
+        count = 0
         for section in self._read_sections():
-            jobs.extend(self._get_jobs(section, '1'))
+            with self.metrics.time(PARSE):
+                jobs = self._get_jobs(section, '1')
+            count += len(jobs)
+            yield from jobs
 
-        log.debug(f'{len(jobs)} job(s) extracted ...')
-        return jobs
+        log.debug(f'{count} job(s) extracted ...')
 
     def scrape_vacancy_details(self, company: Company, job: Job) -> JobDetail:
-        session = HTMLSession()
         job_url = job.data['href']
-        res = session.get(job_url)
-        res.raise_for_status()
+        res = self.get_vacancy_page(job, job_url)
 
         # extract page contents
-        content = res.html.find('.job._content', first=True)
-        desc = content.find('.job._job-description', first=True)
-        header = content.find('.job._job-desc-title', first=True)
-        role_title = f"{header.text} | {job.data['id']}"
+        with self.metrics.time(PARSE):
+            content = self.JOB_CONTENT.first(extract.parse_response(res))
+            description = extract.outer_html(self.JOB_DESCRIPTION.first(content))
+            header = self.JOB_TITLE.first(content)
+            role_title = f"{extract.text(header)} | {job.data['company_name']}"
 
-        locations_data = content.find('div')[1]
-        location_names = locations_data.text.split('\n')
+            locations_data = self.JOB_DIVS.all(content)[1]
+            location_names = extract.text(locations_data).split('\n')
 
         is_remote = 'Remote' in location_names
         locations = self.get_locations(list(filter(
@@ -180,7 +426,7 @@ class SequoiaScraper(SiteScraper):
             entry_hash=job.hash,
             company=company,
             date_active=datetime.today(),
-            description=desc.raw_html.decode('utf-8'),
+            description=description,
             locations=locations,
             role_title=role_title,
             url=job_url,
@@ -191,7 +437,7 @@ class SequoiaScraper(SiteScraper):
 class WorldBankGroupScraper(SiteScraper):
     """Scraper for the World Bank Group careers page.
     """
-    ASYNC = False
+    ASYNC = True
     ID = 'world-bank-group'
     VIEW_FIELDS = ['__VIEWSTATE', '__VIEWSTATEGENERATOR']
     FORM_DATA = {
@@ -201,75 +447,85 @@ class WorldBankGroupScraper(SiteScraper):
         'ctl00$siteContent$widgetLayout$rptWidgets$ctl03$widgetContainer$ctl00$rptCustomFields$ctl03$customFieldWrapper$ctl00$selectOu$itemName':'',
         'ctl00$siteContent$widgetLayout$rptWidgets$ctl03$widgetContainer$ctl00$rptCustomFields$ctl03$customFieldWrapper$ctl00$selectOu$itemId': 0,
     }
+    VIEW_INPUTS = {f: extract.Selector(f'input[name={f}]') for f in VIEW_FIELDS}
+    PAGING = extract.Selector('div.results-paging')
+    PAGER_LINKS = extract.Selector('.pagerLink')
+    RESULTS_TABLE = extract.Selector('table#tableResults')
+    ROWS = extract.Selector('tr')
+    CELLS = extract.Selector('td')
+    LINK = extract.Selector('a')
+    JOB_CONTENT = extract.Selector('.cs-atscs-jobdet-rtpane')
+    JOB_TABLES = extract.Selector('table')
+    JOB_TITLE = extract.Selector('p > span')
 
     def __init__(self, url: str):
         self.url = url
         self.form_state = {}
-        self.session = HTMLSession()
+        self.incremental_pages = settings.SCRAPER_INCREMENTAL_PAGES
 
-    def get_pagination_details(self, page: Element) -> List[Dict[str, str]]:
+    def get_pagination_details(self, page: HtmlElement) -> List[Dict[str, str]]:
         """Returns paging details within a html page.
 
         :param page: html page to process to extract paging details
-        :type page: Element
+        :type page: HtmlElement
         :return: list of paging details
         :rtype: List[Dict[str, str]]
         """
         links = []
-        paging = page.find('div.results-paging', first=True)
+        paging = self.PAGING.first(page)
 
-        spans = [] if not paging else paging.find('.pagerLink')
+        spans = [] if paging is None else self.PAGER_LINKS.all(paging)
         for span in spans:
             links.append({
-                'page_no': span.text,
-                'event_target': span.attrs.get('id').replace('_', '$')
+                'page_no': extract.text(span),
+                'event_target': span.get('id').replace('_', '$')
             })
 
         return links
 
-    def get_jobs(self, page: Element, page_no: str) -> List[Job]:
+    def get_jobs(self, page: HtmlElement, page_no: str) -> List[Job]:
         """Returns job postings within a html page.
 
         :param page: html page to process to extract jobs.
-        :type page: Element
+        :type page: HtmlElement
         :param page_no: the page number being processes
         :type page_no: str
         :return: list of jobs
         :rtype: List[Job]
         """
         jobs: List[Job] = []
-        table = page.find('table#tableResults', first=True)
+        table = self.RESULTS_TABLE.first(page)
 
-        rows = [] if not table else table.find('tr')
+        rows = [] if table is None else self.ROWS.all(table)
         for row in rows:
-            cells = row.find('td')
+            cells = self.CELLS.all(row)
             if not cells:
                 continue
 
-            text = '::'.join([c.text for c in cells])
+            texts = [extract.text(c) for c in cells]
+            text = '::'.join(texts)
             text_hash = hashlib.sha256(text.encode('utf-8'))
 
             jobs.append(Job(**{
                 'page_no': page_no,
                 'hash': text_hash.hexdigest(),
                 'data': {
-                    'title': cells[0].text.replace('\xa0', ' '),
-                    'href': cells[0].find('a', first=True).attrs['href'],
-                    'location': cells[1].text,
-                    'job-family': cells[2].text,
-                    'deadline': cells[3].text
+                    'title': texts[0].replace('\xa0', ' '),
+                    'href': self.LINK.first(cells[0]).get('href'),
+                    'location': texts[1],
+                    'job-family': texts[2],
+                    'deadline': texts[3]
                 }
             }))
 
         return jobs
 
-    def _update_state(self, res: HTMLResponse) -> None:
+    def _update_state(self, page: HtmlElement) -> None:
         self.form_state.clear()
 
-        find_input = lambda f: res.html.find(f'input[name={f}]', first=True)
-        elems = {f: find_input(f) for f in self.VIEW_FIELDS}
+        elems = {f: selector.first(page) for (f, selector) in self.VIEW_INPUTS.items()}
         self.form_state.update({
-            f: elem.attrs.get('value') for (f, elem) in elems.items()
+            f: elem.get('value') for (f, elem) in elems.items()
         })
 
     def _get_page(self, page_no: str = '1', event_target: str = None) -> Page:
@@ -281,43 +537,61 @@ class WorldBankGroupScraper(SiteScraper):
                 'ctl00$ScriptManager': event_target
             })
 
-        res = self.session.post(self.url, data=data)
-        res.raise_for_status()
-        self._update_state(res)
+        res = self.request('POST', self.url, data=data)
+        with self.metrics.time(PARSE):
+            page = extract.parse_response(res)
+            self._update_state(page)
 
-        return Page(
-            jobs=self.get_jobs(res.html, page_no),
-            paging=self.get_pagination_details(res.html)
-        )
+            return Page(
+                jobs=self.get_jobs(page, page_no),
+                paging=self.get_pagination_details(page)
+            )
+
+    def _is_known_page(self, jobs: List[Job]) -> bool:
+        return bool(jobs) and all(job.hash in self.known_hashes for job in jobs)
 
-    def scrape_vacancies(self) -> List[Job]:
+    def scrape_vacancies(self) -> Iterable[Job]:
         log.debug(f'processing page: {self.url} ...')
-        res = self.session.get(self.url)
-        res.raise_for_status()
-        self._update_state(res)
+        res = self.request('GET', self.url)
+        with self.metrics.time(PARSE):
+            self._update_state(extract.parse_response(res))
 
         (jobs, paging) = self._get_page()
+        count = len(jobs)
+        known_pages = int(self._is_known_page(jobs))
+        yield from jobs
+
         for page_info in paging[1:]:
-            time.sleep(15)
+            # stop once enough consecutive pages list only known openings
+            if self.incremental and known_pages >= self.incremental_pages:
+                log.debug(f'{known_pages} consecutive pages of known jobs found ...')
+                self.is_partial = True
+                break
+
+            if page_info['page_no'] in self.pages_done:
+                log.debug(f"page {page_info['page_no']} already done ...")
+                continue
+
             page = self._get_page(**page_info)
-            jobs.extend(page.jobs)
+            count += len(page.jobs)
+            known_pages = known_pages + 1 if self._is_known_page(page.jobs) else 0
+            yield from page.jobs
 
-        log.debug(f'{len(jobs)} job(s) extracted ...')
-        return jobs
+        log.debug(f'{count} job(s) extracted ...')
 
     def scrape_vacancy_details(self, company: Company, job: Job) -> JobDetail:
-        session = HTMLSession()
         job_url = urljoin(self.url, job.data['href'])
-        res = session.get(job_url)
-        res.raise_for_status()
+        res = self.get_vacancy_page(job, job_url)
 
         # extract page contents
-        content = res.html.find('.cs-atscs-jobdet-rtpane', first=True)
-        info, desc = content.find('table')
-        title = content.find('p > span', first=True).text
+        with self.metrics.time(PARSE):
+            content = self.JOB_CONTENT.first(extract.parse_response(res))
+            info, desc = self.JOB_TABLES.all(content)
+            title = extract.text(self.JOB_TITLE.first(content))
+            description = extract.outer_html(desc)
 
-        rows = [[td.text for td in tr.find('td')] for tr in info.find('tr')]
-        role_title = f'{title} | {rows[1][1]} | {rows[0][1]}'
+            rows = [[extract.text(td) for td in self.CELLS.all(tr)] for tr in self.ROWS.all(info)]
+            role_title = f'{title} | {rows[1][1]} | {rows[0][1]}'
 
         locations = []
         if len(rows) >= 7:
@@ -328,7 +602,7 @@ class WorldBankGroupScraper(SiteScraper):
             entry_hash=job.hash,
             company=company,
             date_active=datetime.today(),
-            description=desc.raw_html.decode('utf-8'),
+            description=description,
             locations=locations,
             role_title=role_title,
             url=job_url,
@@ -343,22 +617,80 @@ class Engine:
         SequoiaScraper.ID: SequoiaScraper,
     }
 
-    stats = {
-        scraper_id: Stats(created=0, failed=0, updated=0, ignored=0)
-        for scraper_id in scrapers.keys()
-    }
-
-    def __init__(self, companies: List[Company]):
+    QUEUE_POLL_INTERVAL = 0.5  # seconds
+    VERIFIED_BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        companies: List[Company],
+        max_in_flight: int = None,
+        deep_verify: bool = False,
+        full_scrape: bool = False,
+        metrics_json: str = None,
+        metrics_textfile: str = None,
+        resume: bool = False
+    ):
         """Initializes a new engine object.
 
         :param scrapers: list of companies to scrap jobs from
         :type scrapers: List[Company]
+        :param max_in_flight: maximum number of vacancy details to be scraped
+            concurrently, defaults to the `SCRAPER_MAX_IN_FLIGHT` setting
+        :type max_in_flight: int, optional
+        :param deep_verify: indicates whether details for all known openings are to
+            be scraped regardless of when they were last verified, defaults to False
+        :type deep_verify: bool, optional
+        :param full_scrape: indicates whether all listings are to be scraped for all
+            companies even those not yet due for a full scrape, defaults to False
+        :type full_scrape: bool, optional
+        :param metrics_json: path of the file to export metrics for the run to as
+            JSON, defaults to the `SCRAPER_METRICS_JSON` setting; an empty path
+            disables the export
+        :type metrics_json: str, optional
+        :param metrics_textfile: path of the file to export metrics for the run to in
+            the Prometheus text format, defaults to the `SCRAPER_METRICS_TEXTFILE`
+            setting; an empty path disables the export
+        :type metrics_textfile: str, optional
+        :param resume: indicates whether the last unfinished scrape run for each company
+            is to be resumed, skipping listing pages done and vacancies whose details
+            were processed by that run, defaults to False
+        :type resume: bool, optional
         """
         self.companies = companies
-        self.known_openings = {}
+        self.stats = {
+            scraper_id: Stats(created=0, failed=0, updated=0, ignored=0)
+            for scraper_id in self.scrapers.keys()
+        }
+        self.known_openings = KnownOpenings()
+        self.known_openings_loaded = False
+        self.new_openings = []
+        self.verified_openings = []
+        self.updated_openings: Set[int] = set()
+        self.batch_size = settings.SCRAPER_BATCH_SIZE
+        self.queue_size = settings.SCRAPER_QUEUE_SIZE
+        self.queue_depths = {'listings': QueueDepth(), 'details': QueueDepth()}
+        self.max_in_flight = max_in_flight or settings.SCRAPER_MAX_IN_FLIGHT
+        self.deep_verify = deep_verify
+        self.full_scrape = full_scrape
+        self.metrics = Metrics()
+        self.metrics_json = (
+            settings.SCRAPER_METRICS_JSON if metrics_json is None else metrics_json
+        )
+        self.metrics_textfile = (
+            settings.SCRAPER_METRICS_TEXTFILE if metrics_textfile is None else metrics_textfile
+        )
+        self.full_scrape_interval = timedelta(hours=settings.SCRAPER_FULL_SCRAPE_INTERVAL)
+        self.scraped_companies = []
+        self.failed_companies = []
+        self.resume = resume
+        self.checkpoints: Dict[int, Checkpoint] = {}
+        self.verify_max_age = timedelta(hours=settings.SCRAPER_VERIFY_MAX_AGE)
+        self.scrape_time = timezone.now()
 
     def scrape_vacancies(self) -> Iterable[ScrapResult]:
         """Returns jobs scraped from vacancies urls for companies added to engine.
+        Companies whose listings fail to be scraped, such as when a page takes too long
+        to render, are recorded as failed while other companies are still scraped.
         """
         # find scrapable companies
         scrapable = [c for c in self.companies if c.name_slug in self.scrapers]
@@ -370,42 +702,320 @@ class Engine:
 
             scraper_cls = self.scrapers[company.name_slug]
             scraper = scraper_cls(company.vacancies_url)
-            for job in scraper.scrape_vacancies():
-                yield ScrapResult(company, job, scraper)
+            scraper.known_hashes = self.known_openings
+            scraper.incremental = not self.is_full_scrape_due(company)
+            scraper.metrics = self.metrics
+            checkpoint = self.checkpoints.get(company.id)
+            with self.metrics.company(company.name_slug):
+                try:
+                    jobs = scraper.scrape_vacancies()
+                    if checkpoint:
+                        scraper.pages_done = frozenset(checkpoint.pages_done)
+                        jobs = self.checkpoint_listings(checkpoint, jobs)
+
+                    for job in jobs:
+                        yield ScrapResult(company, job, scraper)
+                except Exception as ex:
+                    log.error(f'Scraping vacancies for {company.name} failed. Error: {ex}')
+                    self.failed_companies.append(company)
+                    continue
+
+            # companies with all listings scraped can have their openings deactivated
+            if not scraper.is_partial:
+                self.scraped_companies.append(company)
+
+    def checkpoint_listings(self, checkpoint: Checkpoint, jobs: Iterable[Job]) -> Iterator[Job]:
+        """Returns listed jobs which were not processed by an interrupted scrape run,
+        recording the jobs listed on each page before they are returned and the page as
+        done once they have all been returned.
+
+        Jobs on pages done by the interrupted run whose details were not processed are
+        returned first, while jobs listed on those pages again are dropped.
+        """
+        for job in checkpoint.get_pending():
+            yield Job(*job)
+
+        for (page_no, page_jobs) in groupby(jobs, key=attrgetter('page_no')):
+            if checkpoint.is_page_done(page_no):
+                continue
+
+            page_jobs = list(page_jobs)
+            checkpoint.record_listed(page_no, page_jobs)
+            for job in page_jobs:
+                if not checkpoint.is_processed(job.hash):
+                    yield job
+            checkpoint.record_page_done(page_no)
+
+    def record_processed(self, results: Iterable[ScrapResult]):
+        """Records vacancies whose details have been processed with the checkpoint of
+        their company.
+        """
+        if not self.checkpoints:
+            return
+
+        for result in results:
+            checkpoint = self.checkpoints.get(result.company.id)
+            if checkpoint:
+                checkpoint.record_processed(result.job.hash)
+
+    def is_full_scrape_due(self, company: Company) -> bool:
+        """Returns True if all listings are to be scraped for the company, otherwise
+        False, in which case scraping may stop once only known openings are listed.
+        """
+        return bool(
+            self.full_scrape or not company.last_full_scrape or
+            self.scrape_time - company.last_full_scrape >= self.full_scrape_interval
+        )
+
+    def is_verified(self, job: Job) -> bool:
+        """Returns True if the job is for a known opening whose details were verified
+        within the verification max age, otherwise False.
+        """
+        index = self.known_openings.find(job.hash)
+        if self.deep_verify or index is None:
+            return False
+
+        verified = self.known_openings.get_verified(index)
+        return bool(
+            verified and
+            self.scrape_time.timestamp() - verified < self.verify_max_age.total_seconds()
+        )
+
+    def scrape_vacancy_details(self, result: ScrapResult) -> JobDetail:
+        """Returns details scraped for a vacancy. Meant to be run within a worker
+        thread for scrapers which support concurrent scraping of vacancy details.
+        """
+        (company, job, scraper) = result
+        with self.metrics.company(company.name_slug):
+            return scraper.scrape_vacancy_details(company, job)
+
+    def scrape_vacancies_details(
+        self, results: Iterable[ScrapResult]
+    ) -> Iterator[Tuple[ScrapResult, JobDetail, Exception]]:
+        """Returns details scraped for vacancies along with the error raised while
+        scraping for vacancies whose details couldn't be scraped.
+
+        Details for vacancies of scrapers which support it are scraped concurrently
+        with at most `max_in_flight` vacancies being scraped at any moment. Details for
+        recently verified known openings are not scraped, these vacancies are returned
+        with neither details nor error.
+        """
+        pending = {}
+        thread_connections = []
+
+        def collect(future):
+            result = pending.pop(future)
+            error = future.exception()
+            return (result, None if error else future.result(), error)
+
+        def register_connection():
+            # db connections are thread local; those of worker threads are closed once
+            # the threads exit, rather than after each vacancy
+            thread_connection = connections[DEFAULT_DB_ALIAS]
+            thread_connection.inc_thread_sharing()
+            thread_connections.append(thread_connection)
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.max_in_flight, initializer=register_connection
+            ) as executor:
+                for result in results:
+                    if self.is_verified(result.job):
+                        yield (result, None, None)
+                        continue
+
+                    # requests are paced by the scrapers' rate limiter hence no waits here
+                    if not result.scraper.ASYNC:
+                        (company, job, scraper) = result
+                        try:
+                            with self.metrics.company(company.name_slug):
+                                job_detail = scraper.scrape_vacancy_details(company, job)
+                            yield (result, job_detail, None)
+                        except Exception as ex:
+                            yield (result, None, ex)
+                        continue
+
+                    future = executor.submit(self.scrape_vacancy_details, result)
+                    pending[future] = result
+                    if len(pending) >= self.max_in_flight:
+                        (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield collect(future)
+
+                for future in as_completed(list(pending)):
+                    yield collect(future)
+        finally:
+            for thread_connection in thread_connections:
+                thread_connection.close()
+                thread_connection.dec_thread_sharing()
+
+    def scrape_pipeline(self) -> Iterator[Tuple[ScrapResult, JobDetail, Exception]]:
+        """Returns details scraped for vacancies from a pipeline of stages connected by
+        bounded queues. Listings are scraped within one thread and the details for
+        scraped listings within another, while returned details are persisted by the
+        caller. Stages wait on full queues, keeping at most `queue_size` items queued
+        between stages.
+
+        :raises Exception: the error raised by a stage, once all items produced before
+            the error are returned
+        """
+        DONE = object()
+        (listings, details) = (queue.Queue(self.queue_size), queue.Queue(self.queue_size))
+        stopped = threading.Event()
+        errors = []
+
+        def put(stage: str, items: queue.Queue, item) -> bool:
+            while not stopped.is_set():
+                try:
+                    items.put(item, timeout=self.QUEUE_POLL_INTERVAL)
+                    if item is not DONE:
+                        self.queue_depths[stage].add(items.qsize())
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def drain(items: queue.Queue):
+            while True:
+                try:
+                    item = items.get(timeout=self.QUEUE_POLL_INTERVAL)
+                except queue.Empty:
+                    if stopped.is_set():
+                        return
+                    continue
+
+                if item is DONE:
+                    return
+                yield item
+
+        def run_stage(stage: str, items: queue.Queue, produce: Iterable):
+            try:
+                for item in produce:
+                    if not put(stage, items, item):
+                        break
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                put(stage, items, DONE)
+                connection.close()
+
+        stages = [
+            threading.Thread(
+                name='scrape-listings',
+                target=run_stage,
+                args=('listings', listings, self.scrape_vacancies())
+            ),
+            threading.Thread(
+                name='scrape-details',
+                target=run_stage,
+                args=('details', details, self.scrape_vacancies_details(drain(listings)))
+            ),
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            yield from drain(details)
+        finally:
+            stopped.set()
+            for stage in stages:
+                stage.join()
+
+        if errors:
+            raise errors[0]
 
-    def process_vacancy(self, result: ScrapResult):
-        # scrap job details
+    def process_verified_vacancy(self, result: ScrapResult):
+        """Records a recently verified known opening as active.
+        """
+        self.known_openings.mark_seen(self.known_openings.find(result.job.hash))
+        self.stats[result.company.name_slug].ignored += 1
+        self.record_processed([result])
+
+    def process_vacancy(self, result: ScrapResult, job_detail: JobDetail = None):
+        # scrap job details if not already scraped
         (company, job, scraper) = result
-        job_detail = scraper.scrape_vacancy_details(company, job)
+        if job_detail is None:
+            job_detail = scraper.scrape_vacancy_details(company, job)
         stat = self.stats[company.name_slug]
+        data = job_detail._asdict()
+        content_hash = compute_content_hash(data)
 
-        if result.job.hash in self.known_openings:
-            opening = Opening.objects.filter(entry_hash=result.job.hash).first()
-            self.known_openings[result.job.hash].update({ 'active': True })
+        index = self.known_openings.find(result.job.hash)
+        if index is not None:
+            self.known_openings.mark_seen(index)
+            opening_id = self.known_openings.get_id(index)
 
-            # check if job is to be updated
-            if not opening.is_match({ 'job': job_detail._asdict() }):
+            # check if job is to be updated against the content hash of the known opening
+            if self.known_openings.get_content_hash(index) != content_hash:
                 log.debug('Updating existing job ...')
-                opening.description = job_detail.description
-                opening.role_title = job_detail.role_title
-                opening.save()
+                Opening.objects.filter(id=opening_id).update(
+                    content_hash=content_hash,
+                    date_verified=self.scrape_time,
+                    **{f: data[f] for f in OPENING_CONTENT_FIELDS}
+                )
+                self.known_openings.set_content_hash(index, content_hash)
+                self.updated_openings.add(opening_id)
                 stat.updated += 1
+                self.record_processed([result])
                 return
 
+            self.verified_openings.append(opening_id)
             stat.ignored += 1
+            self.record_processed([result])
             return
 
-        # persist new job
-        log.debug('Saving new job ...')
+        # queue new job to be persisted along with other new jobs
+        log.debug('Queuing new job ...')
+        self.queue_opening(result, job_detail, content_hash)
+
+    def queue_opening(self, result: ScrapResult, job_detail: JobDetail, content_hash: str = None):
+        """Queues a new opening to be persisted. Queued openings are persisted in
+        batches of `batch_size` openings, with each batch for a single company.
+        """
+        if self.new_openings and self.new_openings[-1][0].company.id != result.company.id:
+            self.flush_openings()
+
         data = job_detail._asdict()
-        locations = data.pop('locations')
+        data['content_hash'] = content_hash or compute_content_hash(data)
+        data['date_verified'] = self.scrape_time
+        self.new_openings.append((result, data))
+
+        if len(self.new_openings) >= self.batch_size:
+            self.flush_openings()
+
+    def flush_openings(self):
+        """Persists queued new openings within a single transaction.
+        """
+        if not self.new_openings:
+            return
 
-        opening = Opening(**data)
-        opening.save()
+        (results, entries) = zip(*self.new_openings)
+        self.new_openings = []
 
-        stat.created += 1
-        if locations:
-            opening.locations.add(*locations)
+        log.debug(f'Saving {len(entries)} new job(s) ...')
+        try:
+            with self.metrics.company(results[0].company.name_slug):
+                openings = openings_bulk_insert(list(entries))
+        except Exception as ex:
+            log.error(f'Saving new jobs failed. Error: {ex}')
+            openings = []
+
+        stat = self.stats[results[0].company.name_slug]
+        stat.created += len(openings)
+        stat.failed += len(entries) - len(openings)
+
+        created = {opening.entry_hash for opening in openings}
+        self.record_processed(r for r in results if r.job.hash in created)
+
+    def process_unchanged_vacancy(self, result: ScrapResult):
+        """Records a known opening whose details page hasn't changed as active.
+        """
+        index = self.known_openings.find(result.job.hash)
+        self.known_openings.mark_seen(index)
+
+        self.verified_openings.append(self.known_openings.get_id(index))
+        self.stats[result.company.name_slug].ignored += 1
+        self.record_processed([result])
 
     def _display_stats(self):
         """Display stats for the scraping operation.
@@ -418,32 +1028,91 @@ class Engine:
         total = reduce(lambda acc, item: acc + item, self.stats.values())
         log.debug(f"Total :: {total}")
 
-    def _update_inactive_openings(self):
-        # idenfy known openings that are no longer active
-        inactive_openings = list(filter(
-            lambda value: 'active' not in value,
-            self.known_openings.values()
-        ))
-
-        log.debug(f'{len(self.known_openings)} active known openings ...')
-        if inactive_openings:
-            log.debug(f'{len(inactive_openings)} openings have gone inactive ...')
-            with connection.cursor() as cursor:
-                dml = (
-                    "UPDATE jobs_opening SET date_inactive='{0}' "
-                    "WHERE id in ({1}) AND company_id in ({2});"
-                )
-                cursor.execute(dml.format(
-                    datetime.today().date().isoformat(),
-                    ', '.join([str(o['id']) for o in inactive_openings]),
-                    ', '.join([str(c.id) for c in self.companies])
-                ))
+        # display depths of queues between pipeline stages
+        for (stage, depth) in self.queue_depths.items():
+            log.debug(f"Queue depth ({stage}) :: {depth}")
+
+        # display time spent within each stage across companies
+        for (stage, companies) in self.metrics.to_dict().items():
+            (count, seconds) = (0, 0)
+            for histogram in companies.values():
+                (count, seconds) = (count + histogram['count'], seconds + histogram['sum'])
+            log.debug(f"Stage ({stage}) :: operations: {count} / seconds: {seconds:.2f}")
+
+    def _export_metrics(self, start_time: datetime, finish_time: datetime):
+        """Exports metrics for the scraping operation as JSON and in the Prometheus
+        text format.
+        """
+        stats = {id: asdict(stat) for (id, stat) in self.stats.items()}
+        try:
+            if self.metrics_json:
+                write_json(self.metrics_json, {
+                    'started': start_time.isoformat(timespec='seconds'),
+                    'finished': finish_time.isoformat(timespec='seconds'),
+                    'duration': (finish_time - start_time).total_seconds(),
+                    'stats': stats,
+                    'stages': self.metrics.to_dict(),
+                })
+
+            if self.metrics_textfile:
+                content = self.metrics.to_prometheus(stats, finish_time.timestamp())
+                write_file(self.metrics_textfile, content)
+        except Exception as ex:
+            log.error(f'Exporting metrics failed. Error: {ex}')
 
-    def _after_scrape(self):
-        """Performs a series of operations after the scrapping operation.
+    def _update_inactive_openings(self):
+        # deactivate openings of companies scraped in full which were known before the
+        # scrape but weren't seen; openings created by this scrape were seen
+        log.debug(f'{self.known_openings.count_seen()} active known openings ...')
+        counts = openings_deactivate(
+            [c.id for c in self.scraped_companies],
+            self.known_openings.seen_hashes(),
+            datetime.today().date(),
+            self.scrape_time
+        )
+        for company in self.scraped_companies:
+            count = counts.get(company.id, 0)
+            self.stats[company.name_slug].deactivated += count
+            log.debug(f'{count} openings of {company.name} have gone inactive ...')
+
+    def _update_scraped_companies(self):
+        # record when all listings were last scraped for companies
+        company_ids = [c.id for c in self.scraped_companies]
+        Company.objects.filter(id__in=company_ids).update(last_full_scrape=self.scrape_time)
+
+    def _update_verified_openings(self):
+        # record when details of unchanged known openings were last verified
+        log.debug(f'{len(self.verified_openings)} openings verified unchanged ...')
+        for i in range(0, len(self.verified_openings), self.VERIFIED_BATCH_SIZE):
+            ids = self.verified_openings[i:i + self.VERIFIED_BATCH_SIZE]
+            Opening.objects.filter(id__in=ids).update(date_verified=self.scrape_time)
+
+    def _finish_checkpoints(self, completed: bool):
+        # record scrape runs as completed, or as aborted so they can be resumed
+        failed = {company.id for company in self.failed_companies}
+        for (company_id, checkpoint) in self.checkpoints.items():
+            if completed and company_id not in failed:
+                checkpoint.finish(ScrapeRun.COMPLETED, timezone.now())
+            else:
+                checkpoint.finish(ScrapeRun.ABORTED)
+
+    def _after_scrape(self, completed: bool = True):
+        """Performs a series of operations after the scrapping operation. Openings are
+        only marked inactive once the scraping operation completes, as listings scraped
+        by an aborted operation are incomplete.
         """
         try:
-            self._update_inactive_openings()
+            for company in self.failed_companies:
+                self.stats[company.name_slug].failed += 1
+
+            self.flush_openings()
+            SiteScraper.sessions.close()
+            SiteScraper.browsers.close()
+            if completed:
+                self._update_inactive_openings()
+                self._update_scraped_companies()
+            self._update_verified_openings()
+            self._finish_checkpoints(completed)
             self._display_stats()
         except Exception as ex:
             log.error(f"After scrape operation failed. Error: {ex}")
@@ -451,46 +1120,185 @@ class Engine:
     def _before_scrape(self):
         """Performs a series of operation before the actual scrapping begins.
         """
-        # compile hash of all known active openings
-        try:
-            fields = ('id', 'entry_hash')
-            openings = Opening.objects.filter(date_inactive__isnull=True).values(*fields)
-            for opening in openings:
-                self.known_openings.update({
-                    opening['entry_hash']: {'id': opening['id']}
-                })
+        self.scrape_time = timezone.now()
 
-            log.debug(f'{len(openings)} known active openings found ...')
+        # load known locations and index known active openings of companies to scrape
+        try:
+            SiteScraper.location_resolver.warm()
+            company_ids = [c.id for c in self.companies if c.name_slug in self.scrapers]
+            openings = Opening.objects.filter(
+                company_id__in=company_ids, date_inactive__isnull=True
+            ).order_by('entry_hash').values_list(
+                'entry_hash', 'id', 'date_verified', 'content_hash'
+            )
+            self.known_openings = KnownOpenings.load(openings.iterator())
+            self.known_openings_loaded = True
+
+            log.debug(f'{len(self.known_openings)} known active openings found ...')
         except Exception as ex:
+            # without known openings, all openings would be taken as unseen
+            self.known_openings_loaded = False
             log.error(f'Before scrape operation failed. Error: {ex}')
 
-    def execute(self):
+        try:
+            self._start_checkpoints()
+        except Exception as ex:
+            log.error(f'Starting scrape run checkpoints failed. Error: {ex}')
+
+    def _start_checkpoints(self):
+        # start scrape runs for companies, resuming their last unfinished runs if asked
+        scrapable = [c for c in self.companies if c.name_slug in self.scrapers]
+        for company in scrapable:
+            checkpoint = Checkpoint.start(
+                company, self.scrape_time, resume=self.resume, batch_size=self.batch_size
+            )
+            self.checkpoints[company.id] = checkpoint
+
+            # known openings processed by the resumed run are active
+            for entry_hash in checkpoint.processed_hashes:
+                index = self.known_openings.find(entry_hash)
+                if index is not None:
+                    self.known_openings.mark_seen(index)
+
+    def process_result(self, result: ScrapResult, job_detail: JobDetail, error: Exception):
+        """Processes a vacancy returned by the scrape pipeline.
+        """
+        try:
+            if isinstance(error, NotModifiedError):
+                self.process_unchanged_vacancy(result)
+                return
+            elif error:
+                raise error
+            elif not job_detail:
+                self.process_verified_vacancy(result)
+                return
+
+            self.process_vacancy(result, job_detail)
+        except Exception as ex:
+            log.error(ex)
+            stat = self.stats[result.company.name_slug]
+            stat.failed += 1
+
+    def execute_in_workers(self, workers: int):
+        """Initiates jobs scraping for added companies with companies scraped in
+        parallel within worker processes. Each worker process runs its own engine, with
+        its own database connection, for one host at a time.
+
+        Rate limits are kept within each process, so companies whose vacancies are
+        hosted on the same host are scraped together by a single worker, keeping requests
+        to that host within its rate limit. Requests to other hosts, such as details
+        pages linked to from listings, may still be made by several workers at once.
+
+        :param workers: number of worker processes
+        :type workers: int
+        """
+        start_time = datetime.now()
+        log.info(
+            f"Scraping started ... at {start_time.strftime('%H:%M')} " +
+            f"({workers} workers)"
+        )
+
+        # forked worker processes must not share the connections of this process
+        connections.close_all()
+        options = {
+            'max_in_flight': self.max_in_flight,
+            'deep_verify': self.deep_verify,
+            'full_scrape': self.full_scrape,
+            'resume': self.resume,
+            # metrics from workers are exported once merged
+            'metrics_json': '',
+            'metrics_textfile': ''
+        }
+
+        # companies sharing a host are scraped by the same worker
+        hosts: Dict[str, List[Company]] = {}
+        for company in self.companies:
+            if company.name_slug in self.scrapers:
+                host = urlsplit(company.vacancies_url).netloc.lower()
+                hosts.setdefault(host, []).append(company)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for companies in hosts.values():
+                company_ids = [company.id for company in companies]
+                futures[executor.submit(execute_companies, company_ids, options)] = companies
+            for future in as_completed(futures):
+                try:
+                    (stats, stages) = future.result()
+                    for (scraper_id, stat) in stats.items():
+                        self.stats[scraper_id] += stat
+                    self.metrics.merge(stages)
+                except Exception as ex:
+                    names = ', '.join(company.name for company in futures[future])
+                    log.error(f'Scraping {names} failed. Error: {ex}')
+
+        # search results cached by the webapp are stale once openings are written
+        bump_data_version()
+        finish_time = datetime.now()
+        self._display_stats()
+        self._export_metrics(start_time, finish_time)
+        log.info(
+            f"Scraping finished at {finish_time.strftime('%H:%M')} " +
+            f"(duration: {str(finish_time - start_time)})"
+        )
+
+    def execute(self, workers: int = 1):
         """Initiates jobs scraping for added companies.
+
+        :param workers: number of worker processes to scrape companies in parallel
+            with, defaults to 1 which scrapes companies within this process
+        :type workers: int, optional
         """
+        if workers > 1:
+            return self.execute_in_workers(workers)
+
         start_time = datetime.now()
         log.info(f"Scraping started ... at {start_time.strftime('%H:%M')}")
-        self._before_scrape()
 
-        try:
-            for result in self.scrape_vacancies():
+        with self.metrics.database():
+            self._before_scrape()
+
+            # search documents of written openings are refreshed in bulk afterwards
+            with openings_tsdocument_deferred(self.updated_openings):
                 try:
-                    time.sleep(10)
-                    self.process_vacancy(result)
-                    time.sleep(10)
+                    if not self.known_openings_loaded:
+                        raise RuntimeError('Known openings could not be loaded')
+
+                    for (result, job_detail, error) in self.scrape_pipeline():
+                        with self.metrics.company(result.company.name_slug):
+                            self.process_result(result, job_detail, error)
+
+                    finish_time = datetime.now()
+                    op = 'finished'
                 except Exception as ex:
                     log.error(ex)
-                    stat = self.stats[result.company.name_slug]
-                    stat.failed += 1
+                    finish_time = datetime.now()
+                    op = 'aborted'
 
-            finish_time = datetime.now()
-            op = 'finished'
-        except Exception as ex:
-            log.error(ex)
-            finish_time = datetime.now()
-            op = 'aborted'
+                self._after_scrape(completed=op == 'finished')
 
-        self._after_scrape()
+        # search results cached by the webapp are stale once openings are written
+        bump_data_version()
+        self._export_metrics(start_time, finish_time)
         log.info(
             f"Scraping {op} at {finish_time.strftime('%H:%M')} " +
             f"(duration: {str(finish_time - start_time)})"
         )
+
+
+def execute_companies(
+    company_ids: List[int], options: dict
+) -> Tuple[Dict[str, Stats], dict]:
+    """Scrapes jobs for companies sharing a host, with a single engine whose requests
+    share the rate limiter of the process. Meant to be run within a worker process.
+
+    :param company_ids: ids of the companies to scrape
+    :type company_ids: List[int]
+    :param options: options for the engine scraping the companies
+    :type options: dict
+    :return: stats and metrics for the scraping operation
+    :rtype: Tuple[Dict[str, Stats], dict]
+    """
+    engine = Engine(list(Company.objects.filter(id__in=company_ids)), **options)
+    engine.execute()
+    return (engine.stats, engine.metrics.to_dict())
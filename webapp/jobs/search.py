@@ -0,0 +1,188 @@
+"""Defines ranked full-text search of openings.
+
+User input is parsed with `websearch_to_tsquery`, which accepts the syntax of web search
+engines (quoted phrases, `or` and `-` to exclude words) and never fails on malformed
+input. Matching openings are found through the GIN index on `tsdocument` and ranked with
+`ts_rank_cd`. Headline snippets are only produced for the openings on the page shown, as
+`ts_headline` processes the whole description of each opening.
+
+Openings near a point are found with `ST_DWithin` on the geography of locations, served
+by a GiST index on that expression, and joined to openings within the same query.
+"""
+import html
+import re
+
+from typing import Iterable
+
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    BooleanField, F, FloatField, Func, Min, QuerySet, TextField, Value
+)
+from django.db.models.functions import Cast
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+from jobs.models import Opening
+
+
+# text search configuration used to compute the tsdocument of openings
+SEARCH_CONFIG = 'english'
+
+# ordering of search results, most relevant first
+RANKED_ORDERING = ('-rank', 'id')
+
+# ordering of spatial search results, nearest first
+NEAREST_ORDERING = ('distance', 'id')
+
+HEADLINE_START = '<mark>'
+HEADLINE_STOP = '</mark>'
+HEADLINE_OPTIONS = (
+    f'StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, '
+    'MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" ... "'
+)
+
+
+class WebSearchQuery(SearchQuery):
+    """Search query parsing user input with websearch syntax.
+    """
+    SEARCH_TYPES = dict(SearchQuery.SEARCH_TYPES, websearch='websearch_to_tsquery')
+
+    def __init__(self, value, output_field=None, *, config=SEARCH_CONFIG, invert=False,
+                 search_type='websearch'):
+        super().__init__(
+            value, output_field, config=config, invert=invert, search_type=search_type
+        )
+
+
+class SearchRankCD(SearchRank):
+    """Ranks documents by the cover density of the query lexemes, which favours
+    documents where the lexemes are found close together.
+    """
+    function = 'ts_rank_cd'
+
+
+class SearchHeadline(Func):
+    """Returns a snippet of text with the words matching a query highlighted.
+    """
+    function = 'ts_headline'
+    template = "%(function)s('" + SEARCH_CONFIG + "', %(expressions)s)"
+    output_field = TextField()
+
+
+class StripTags(Func):
+    """Replaces the html tags within text with spaces.
+    """
+    function = 'regexp_replace'
+    template = "%(function)s(%(expressions)s, '<[^>]*>', ' ', 'g')"
+    output_field = TextField()
+
+
+class AsGeography(Func):
+    """Casts a geometry to geography, matching the expression of the GiST index on the
+    geography of locations.
+    """
+    template = '(%(expressions)s)::geography'
+
+
+class GeogFromText(Func):
+    function = 'ST_GeogFromText'
+
+
+class DWithin(Func):
+    """Returns whether geographies are within a distance in meters of each other.
+    """
+    function = 'ST_DWithin'
+    output_field = BooleanField()
+
+
+class GeogDistance(Func):
+    """Returns the distance in meters between geographies.
+    """
+    function = 'ST_Distance'
+    output_field = FloatField()
+
+
+def openings_search(openings: QuerySet, q: str) -> QuerySet:
+    """Returns openings matching a websearch query ordered by relevance, most relevant
+    first, and annotated with their `rank`. Descriptions are deferred as they are not
+    needed to rank openings. Ranks are cast to double precision so that ranks read back
+    compare equal to those computed, for keyset pagination.
+
+    :param openings: openings to search
+    :type openings: QuerySet
+    :param q: the search terms
+    :type q: str
+    :return: the matching openings
+    :rtype: QuerySet
+    """
+    query = WebSearchQuery(q)
+    return openings\
+        .filter(tsdocument=query)\
+        .annotate(rank=Cast(SearchRankCD(F('tsdocument'), query), FloatField()))\
+        .defer('description', 'tsdocument')\
+        .order_by(*RANKED_ORDERING)
+
+
+def openings_nearby(openings: QuerySet, origin: Point, distance: Distance) -> QuerySet:
+    """Returns openings with a location within a distance of a point ordered by distance,
+    nearest first, and annotated with the `distance` in meters to their nearest location.
+    Openings with several locations nearby are returned once, by grouping them rather
+    than with DISTINCT.
+
+    :param openings: openings to search
+    :type openings: QuerySet
+    :param origin: the point to search around
+    :type origin: Point
+    :param distance: the distance to search within
+    :type distance: Distance
+    :return: the openings nearby
+    :rtype: QuerySet
+    """
+    origin = GeogFromText(Value(origin.ewkt))
+    return openings\
+        .filter(DWithin(AsGeography(F('locations__geom')), origin, Value(distance.m)))\
+        .annotate(distance=Min(GeogDistance(AsGeography(F('locations__geom')), origin)))\
+        .defer('description', 'tsdocument')\
+        .order_by(*NEAREST_ORDERING)
+
+
+def openings_add_headlines(openings: Iterable[Opening], q: str):
+    """Sets the `headline` of openings to a snippet of their description highlighting
+    the words matching a websearch query. Headlines are produced with a single query.
+
+    :param openings: openings to set headlines for, typically those on a page
+    :type openings: Iterable[Opening]
+    :param q: the search terms
+    :type q: str
+    """
+    openings = list(openings)
+    headlines = dict(
+        Opening.objects
+        .filter(id__in=[opening.id for opening in openings])
+        .annotate(headline=SearchHeadline(
+            StripTags('description'), WebSearchQuery(q), Value(HEADLINE_OPTIONS)
+        ))
+        .values_list('id', 'headline')
+    )
+
+    for opening in openings:
+        opening.headline = format_headline(headlines.get(opening.id) or '')
+
+
+def format_headline(headline: str) -> SafeString:
+    """Returns a headline safe for rendering, with its text escaped and the matching
+    words within `<mark>` tags.
+
+    :param headline: headline returned by `ts_headline`
+    :type headline: str
+    :return: the headline as html
+    :rtype: SafeString
+    """
+    markers = (HEADLINE_START, HEADLINE_STOP)
+    parts = re.split(f'({re.escape(HEADLINE_START)}|{re.escape(HEADLINE_STOP)})', headline)
+    return mark_safe(''.join(
+        part if part in markers else escape(re.sub(r'\s+', ' ', html.unescape(part)))
+        for part in parts
+    ))
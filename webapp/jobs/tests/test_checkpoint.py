@@ -0,0 +1,123 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from jobs.checkpoint import Checkpoint
+from jobs.models import Company, ScrapeRun, ScrapeRunPage
+from jobs.scraper import Engine, Job
+
+
+class FakeCheckpoint:
+
+    def __init__(self, pages_done=(), processed=(), pending=()):
+        self.pages_done = set(pages_done)
+        self.processed_hashes = set(processed)
+        self.pending = list(pending)
+        self.listed = []
+
+    def is_page_done(self, page_no):
+        return page_no in self.pages_done
+
+    def is_processed(self, entry_hash):
+        return entry_hash in self.processed_hashes
+
+    def get_pending(self):
+        return self.pending
+
+    def record_listed(self, page_no, jobs):
+        self.listed.extend(job.hash for job in jobs)
+
+    def record_page_done(self, page_no):
+        self.pages_done.add(page_no)
+
+
+class EngineCheckpointTests(SimpleTestCase):
+
+    def test_listings_resume_after_pages_done(self):
+        jobs = [Job({}, h, p) for (h, p) in [('a', '1'), ('b', '1'), ('c', '2'), ('d', '3')]]
+        checkpoint = FakeCheckpoint(pages_done={'1'}, processed={'d'}, pending=[({}, 'b', '1')])
+
+        listed = Engine([]).checkpoint_listings(checkpoint, iter(jobs))
+        self.assertEqual([job.hash for job in listed], ['b', 'c'])
+        self.assertEqual(checkpoint.listed, ['c', 'd'])
+        self.assertEqual(checkpoint.pages_done, {'1', '2', '3'})
+
+    def test_inactive_openings_not_marked_for_aborted_runs(self):
+        engine = Engine([])
+        names = (
+            '_update_inactive_openings', '_update_scraped_companies', '_update_verified_openings'
+        )
+        patchers = [mock.patch.object(engine, name) for name in names]
+        (inactive, scraped, _) = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        engine._after_scrape(completed=False)
+        inactive.assert_not_called()
+        scraped.assert_not_called()
+
+        engine._after_scrape(completed=True)
+        inactive.assert_called_once()
+
+
+class CheckpointTestCase(TestCase):
+    fixtures = ['companies.json']
+
+    def setUp(self):
+        self.company = Company.objects.get(name_slug='world-bank-group')
+        self.started = timezone.now() - timedelta(hours=1)
+
+    def _interrupted_run(self):
+        checkpoint = Checkpoint.start(self.company, self.started, batch_size=2)
+        checkpoint.record_listed('1', [Job({'title': h}, h, '1') for h in ('a', 'b', 'c')])
+        checkpoint.record_page_done('1')
+        checkpoint.record_listed('2', [Job({'title': 'd'}, 'd', '2')])
+        for entry_hash in ('a', 'd'):
+            checkpoint.record_processed(entry_hash)
+        checkpoint.finish(ScrapeRun.ABORTED)
+        return checkpoint.run
+
+    def test_resumed_run_skips_pages_done_and_processed_jobs(self):
+        run = self._interrupted_run()
+
+        checkpoint = Checkpoint.start(self.company, timezone.now(), resume=True)
+        self.assertEqual(checkpoint.run.id, run.id)
+        self.assertEqual(checkpoint.run.status, ScrapeRun.RUNNING)
+        self.assertEqual(checkpoint.pages_done, {'1'})
+        self.assertEqual(checkpoint.processed_hashes, {'a', 'd'})
+        pending = sorted(checkpoint.get_pending(), key=lambda job: job[1])
+        self.assertEqual(pending, [({'title': 'b'}, 'b', '1'), ({'title': 'c'}, 'c', '1')])
+
+    def test_unfinished_runs_discarded_unless_resumed(self):
+        run = self._interrupted_run()
+
+        checkpoint = Checkpoint.start(self.company, timezone.now())
+        self.assertNotEqual(checkpoint.run.id, run.id)
+        self.assertFalse(ScrapeRun.objects.filter(id=run.id).exists())
+        self.assertEqual(checkpoint.pages_done, set())
+
+    def test_jobs_recorded_once_per_page(self):
+        run = self._interrupted_run()
+
+        pages = ScrapeRunPage.objects.filter(run=run).order_by('page_no')
+        self.assertEqual(
+            [(page.page_no, page.processed) for page in pages], [('1', ['a']), ('2', ['d'])]
+        )
+        self.assertEqual(pages[0].jobs, [[{'title': h}, h] for h in ('a', 'b', 'c')])
+
+    def test_completed_runs_discarded_with_their_pages_by_next_run(self):
+        checkpoint = Checkpoint.start(self.company, self.started)
+        checkpoint.record_listed('1', [Job({}, 'a', '1')])
+        checkpoint.finish(ScrapeRun.COMPLETED, timezone.now())
+
+        run = ScrapeRun.objects.get(id=checkpoint.run.id)
+        self.assertEqual(run.status, ScrapeRun.COMPLETED)
+        self.assertIsNotNone(run.date_finished)
+
+        # completed runs are not resumed
+        resumed = Checkpoint.start(self.company, timezone.now(), resume=True)
+        self.assertNotEqual(resumed.run.id, run.id)
+        self.assertFalse(ScrapeRun.objects.filter(id=run.id).exists())
+        self.assertFalse(ScrapeRunPage.objects.filter(run_id=run.id).exists())
@@ -0,0 +1,117 @@
+import hashlib
+from unittest import mock
+
+from django.test import SimpleTestCase
+from parameterized import parameterized
+from requests_html import HTML
+
+from jobs import extract
+from jobs.scraper import WorldBankGroupScraper
+
+
+RESULTS_PAGE = '''
+<html>
+<body>
+  <input type="hidden" name="__VIEWSTATE" value="state" />
+  <input type="hidden" name="__VIEWSTATEGENERATOR" value="generator" />
+  <table id="tableResults">
+    <tr><th>Title</th><th>Location</th><th>Family</th><th>Deadline</th></tr>
+    <tr>
+      <td><a href="/job/1">Senior&nbsp;Economist</a></td>
+      <td>Washington, DC</td>
+      <td>Economics</td>
+      <td>10/31/2020</td>
+    </tr>
+    <tr>
+      <td><a href="/job/2">Data <b>Scientist</b></a></td>
+      <td>Nairobi,
+          Kenya</td>
+      <td>Information <br/>Technology</td>
+      <td>11/15/2020</td>
+    </tr>
+  </table>
+  <div class="results-paging">
+    <span class="pagerLink" id="ctl00_pager_1">1</span>
+    <span class="pagerLink" id="ctl00_pager_2">2</span>
+  </div>
+</body>
+</html>
+'''
+
+
+class ExtractTests(SimpleTestCase):
+
+    @parameterized.expand([
+        ('<div><p>Title</p><p>Sub   title</p></div>', 'div'),
+        ('<ul><li><a href="#">Role<div>Remote</div></a>\n</li></ul>', 'a'),
+        ('<p><span>Title</span> - Full time</p>', 'span'),
+        ('<p>Line one<br>Line two</p>', 'p'),
+        ('<table><tr><td>\n  Spaced\xa0 cell \n</td></tr></table>', 'td'),
+    ])
+    def test_text_matches_requests_html(self, html, css):
+        expected = HTML(html=html).find(css, first=True).text
+        element = extract.Selector(css).first(extract.parse_html(html))
+        self.assertEqual(extract.text(element), expected)
+
+    def test_outer_html_matches_requests_html(self):
+        html = '<div><div class="desc"><p>About the <b>role</b></p></div>\n</div>'
+        expected = HTML(html=html).find('.desc', first=True).raw_html.decode('utf-8')
+        element = extract.Selector('.desc').first(extract.parse_html(html))
+        self.assertEqual(extract.outer_html(element), expected)
+
+    def test_selector_matches_queried_element(self):
+        root = extract.parse_html('<div><div>a</div><div>b</div></div>')
+        outer = extract.Selector('body > div').first(root)
+        self.assertEqual(len(extract.Selector('div').all(outer)), 3)
+        self.assertIsNone(extract.Selector('span').first(outer))
+
+    def test_parse_response_decodes_content(self):
+        content = '<meta charset="iso-8859-1"><p>Caf\xe9</p>'.encode('latin-1')
+        res = mock.Mock(content=content, encoding='iso-8859-1')
+
+        page = extract.parse_response(res)
+        self.assertEqual(extract.text(extract.Selector('p').first(page)), 'Caf\xe9')
+
+
+class WorldBankGroupExtractTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scraper = WorldBankGroupScraper('http://localhost/search.aspx')
+        self.page = extract.parse_html(RESULTS_PAGE)
+
+    def test_get_jobs(self):
+        jobs = self.scraper.get_jobs(self.page, '1')
+        self.assertEqual([job.data for job in jobs], [{
+            'title': 'Senior Economist',
+            'href': '/job/1',
+            'location': 'Washington, DC',
+            'job-family': 'Economics',
+            'deadline': '10/31/2020',
+        }, {
+            'title': 'Data Scientist',
+            'href': '/job/2',
+            'location': 'Nairobi, Kenya',
+            'job-family': 'Information\nTechnology',
+            'deadline': '11/15/2020',
+        }])
+
+    def test_get_jobs_hashes_match_requests_html(self):
+        rows = HTML(html=RESULTS_PAGE).find('table#tableResults tr')
+        texts = ['::'.join(cell.text for cell in row.find('td')) for row in rows[1:]]
+        hashes = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+
+        jobs = self.scraper.get_jobs(self.page, '1')
+        self.assertEqual([job.hash for job in jobs], hashes)
+
+    def test_get_pagination_details(self):
+        self.assertEqual(self.scraper.get_pagination_details(self.page), [
+            {'page_no': '1', 'event_target': 'ctl00$pager$1'},
+            {'page_no': '2', 'event_target': 'ctl00$pager$2'},
+        ])
+
+    def test_update_state(self):
+        self.scraper._update_state(self.page)
+        self.assertEqual(self.scraper.form_state, {
+            '__VIEWSTATE': 'state', '__VIEWSTATEGENERATOR': 'generator'
+        })
+
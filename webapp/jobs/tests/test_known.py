@@ -0,0 +1,52 @@
+import hashlib
+import sys
+
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from jobs.known import KnownOpenings
+
+
+def get_hash(n):
+    return hashlib.sha256(str(n).encode('utf-8')).hexdigest()
+
+
+class KnownOpeningsTests(SimpleTestCase):
+
+    def test_openings_found_by_entry_hash(self):
+        verified = timezone.now() - timedelta(hours=1)
+        rows = sorted(
+            (get_hash(n), n, verified if n % 2 else None, get_hash(-n)) for n in range(100)
+        )
+        known = KnownOpenings.load(rows)
+
+        self.assertEqual(len(known), 100)
+        for n in (0, 1, 57, 99):
+            index = known.find(get_hash(n))
+            self.assertEqual(known.get_id(index), n)
+            self.assertEqual(known.get_content_hash(index), get_hash(-n))
+        self.assertEqual(known.get_verified(known.find(get_hash(1))), verified.timestamp())
+        self.assertIsNone(known.get_verified(known.find(get_hash(2))))
+        self.assertIsNone(known.find(get_hash(100)))
+        self.assertNotIn(get_hash(100), known)
+
+    def test_unordered_and_non_hex_hashes_loaded(self):
+        rows = [(get_hash(n), n, None, None) for n in range(20)] + [('k1', 20, None, '')]
+        known = KnownOpenings.load(reversed(rows))
+
+        self.assertEqual([known.get_id(known.find(row[0])) for row in rows], list(range(21)))
+        self.assertEqual(known.get_content_hash(known.find('k1')), '0' * 64)
+
+        known.mark_seen(known.find('k1'))
+        known.mark_seen(known.find(get_hash(3)))
+        self.assertEqual(known.count_seen(), 2)
+        self.assertEqual(sorted(known.seen_hashes()), sorted([get_hash(3), 'k1']))
+
+    def test_index_is_compact(self):
+        known = KnownOpenings.load((get_hash(n), n, None, None) for n in range(1000))
+        size = sum(sys.getsizeof(buffer) for buffer in (
+            known.digests, known.ids, known.verified, known.content_hashes, known.seen
+        ))
+        self.assertLess(size / len(known), 100)
@@ -1,13 +1,16 @@
 from copy import deepcopy
-from parameterized import parameterized
 
 from django.db.models import Q
 from django.forms.models import model_to_dict
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
 from glom import glom
 
-from jobs.models import Company, Opening
-from jobs.logic import opening_insert, opening_update
+from jobs.models import Company, Location, Opening, compute_content_hash
+from jobs.logic import (
+    opening_insert, opening_update, openings_bulk_insert, openings_deactivate,
+    openings_refresh_tsdocument, openings_tsdocument_deferred
+)
 from jobs.exceptions import JobsError, OpeningExistError
 
 
@@ -33,18 +36,6 @@ class OpeningTestCase(OpeningTestBase):
         self.assertIsNotNone(opening)
         self.assertEqual(opening.role_title, 'Senior Investment Officer | IFC | req8313')
 
-    @parameterized.expand([
-        ({'company': '?', 'job': {'description': 'description changed'}}, 1, False),
-        ({'company': '?', 'job': {'role_title': 'title changed'}}, 1, False),
-        ({'company': '?', 'job': {'date_active': '2020-08-16'}}, 1, True),
-        ({'company': '?', 'job': {'date_inactive': '2020-08-16'}}, 1, True),
-        ({'company': '?', 'job': {'date_created': '2020-08-16'}}, 1, True)
-    ])
-    def test_is_match(self, data, pkey, expected):
-        opening = Opening.objects.get(pk=pkey)
-        self.assertIsNotNone(opening)
-        self.assertEqual(opening.is_match(data), expected)
-
 
 class OpeningInsertTestCase(OpeningTestBase):
 
@@ -118,3 +109,142 @@ class OpeningUpdateTestCase(OpeningTestBase):
         self.assertEqual(upd_opening.id, opening.id)
         self.assertEqual(upd_opening.url, opening.url)
         self.assertNotEqual(old_description, opening.description)
+
+
+class ContentHashTests(SimpleTestCase):
+
+    DATA = {
+        'role_title': 'Senior Economist | World Bank | req9125',
+        'description': '<div>\n  <p>Do you want to build a career?</p>\n</div>',
+        'url': 'https://foo.bar/jobs/9125',
+        'is_remote': None,
+    }
+
+    def test_whitespace_within_contents_ignored(self):
+        data = {**self.DATA, 'description': '<div> <p>Do you want to build a career?</p> </div>'}
+        self.assertEqual(compute_content_hash(data), compute_content_hash(self.DATA))
+
+    def test_changed_contents_change_hash(self):
+        for (field, value) in [('description', '<div></div>'), ('is_remote', True)]:
+            data = {**self.DATA, field: value}
+            self.assertNotEqual(compute_content_hash(data), compute_content_hash(self.DATA))
+
+    def test_opening_hash_matches_scraped_details(self):
+        opening = Opening(date_active='2020-09-16', **self.DATA)
+        self.assertEqual(opening.get_content_hash(), compute_content_hash(self.DATA))
+
+
+class OpeningsBulkInsertTestCase(TestCase):
+    fixtures = ['companies.json', 'locations.json', 'openings.json']
+
+    def _get_entries(self, count):
+        company = Company.objects.first()
+        locations = list(Location.objects.all()[:2])
+        return [{
+            'company': company,
+            'locations': locations,
+            'entry_hash': f'bulk-hash-{n}',
+            'url': f'https://foo.bar/jobs/bulk/{n}',
+            'role_title': f'Foo Bar Job {n}',
+            'description': 'A job to do Foo Bar',
+            'date_active': '2020-09-16'
+        } for n in range(count)]
+
+    def test_inserts_openings_with_locations(self):
+        entries = self._get_entries(3)
+        openings = openings_bulk_insert(entries)
+
+        self.assertEqual(len(openings), 3)
+        for opening in openings:
+            self.assertIsNotNone(opening.id)
+            self.assertEqual(opening.locations.count(), 2)
+            self.assertEqual(
+                Opening.objects.get(id=opening.id).content_hash, opening.get_content_hash()
+            )
+
+    def test_skips_openings_conflicting_with_existing_openings(self):
+        entries = self._get_entries(3)
+        entries[1]['url'] = Opening.objects.first().url
+
+        openings = openings_bulk_insert(entries)
+        self.assertEqual(
+            [opening.entry_hash for opening in openings],
+            ['bulk-hash-0', 'bulk-hash-2']
+        )
+        self.assertEqual(Opening.objects.filter(entry_hash__startswith='bulk-hash').count(), 2)
+
+    def test_skips_openings_with_invalid_data(self):
+        entries = self._get_entries(3)
+        entries[1]['role_title'] = 'Foo Bar Job ' * 20
+
+        openings = openings_bulk_insert(entries)
+        self.assertEqual(
+            [opening.entry_hash for opening in openings],
+            ['bulk-hash-0', 'bulk-hash-2']
+        )
+
+
+class OpeningsTsDocumentTestCase(TestCase):
+    fixtures = ['companies.json', 'locations.json', 'openings.json']
+
+    _get_entries = OpeningsBulkInsertTestCase._get_entries
+
+    def _find(self, term):
+        return list(
+            Opening.objects.filter(entry_hash__startswith='bulk-hash', tsdocument=term)
+            .values_list('entry_hash', flat=True)
+        )
+
+    def test_location_names_indexed_once_locations_added(self):
+        location = Location.objects.first()
+        openings_bulk_insert(self._get_entries(1))
+
+        term = location.name.split(',')[0]
+        self.assertEqual(self._find(term), ['bulk-hash-0'])
+
+        Opening.objects.get(entry_hash='bulk-hash-0').locations.clear()
+        self.assertEqual(self._find(term), [])
+
+    def test_deferred_documents_refreshed_on_exit(self):
+        opening = Opening.objects.first()
+        updated_ids = set()
+
+        with openings_tsdocument_deferred(updated_ids):
+            openings_bulk_insert(self._get_entries(2))
+            self.assertEqual(self._find('Foo'), [])
+
+            opening.role_title = 'Chief Cartographer'
+            opening.save()
+            updated_ids.add(opening.id)
+            self.assertFalse(Opening.objects.filter(id=opening.id, tsdocument='cartographer'))
+
+        self.assertEqual(sorted(self._find('Foo')), ['bulk-hash-0', 'bulk-hash-1'])
+        self.assertTrue(Opening.objects.filter(id=opening.id, tsdocument='cartographer'))
+        self.assertEqual(openings_refresh_tsdocument(), 0)
+
+
+class OpeningsDeactivateTestCase(TestCase):
+    fixtures = ['companies.json', 'openings.json']
+
+    def test_unseen_openings_of_companies_deactivated(self):
+        company = Company.objects.get(pk=1)
+        openings = Opening.objects.filter(company=company, date_inactive__isnull=True)
+        (seen, count) = (openings.first(), openings.count())
+        others = Opening.objects.exclude(company=company).filter(date_inactive__isnull=True).count()
+
+        counts = openings_deactivate(
+            [company.id], [seen.entry_hash], timezone.now().date(), timezone.now()
+        )
+        self.assertEqual(counts, {company.id: count - 1})
+        self.assertEqual(list(openings.values_list('id', flat=True)), [seen.id])
+        self.assertEqual(
+            Opening.objects.exclude(company=company).filter(date_inactive__isnull=True).count(),
+            others
+        )
+
+    def test_openings_created_after_scrape_started_not_deactivated(self):
+        company = Company.objects.get(pk=1)
+        started = Opening.objects.order_by('date_created').first().date_created
+
+        counts = openings_deactivate([company.id], [], timezone.now().date(), started)
+        self.assertEqual(counts, {})
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from jobs import metrics
+from jobs.metrics import Histogram, Metrics
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_observations_are_counted_within_buckets(self):
+        histogram = Histogram()
+        for value in (0.001, 0.002, 0.3, 100):
+            histogram.observe(value)
+
+        data = histogram.to_dict()
+        self.assertEqual(data['count'], 4)
+        self.assertAlmostEqual(data['sum'], 100.303)
+        self.assertEqual(data['max'], 100)
+        self.assertEqual(data['buckets']['0.001'], 1)
+        self.assertEqual(data['buckets']['0.0025'], 2)
+        self.assertEqual(data['buckets']['0.25'], 2)
+        self.assertEqual(data['buckets']['0.5'], 3)
+        self.assertEqual(data['buckets']['60.0'], 3)
+        self.assertEqual(data['buckets']['+Inf'], 4)
+
+    def test_merge(self):
+        (first, second) = (Histogram(), Histogram())
+        first.observe(0.01)
+        second.observe(0.01)
+        second.observe(5)
+
+        first.merge(second.to_dict())
+        self.assertEqual(first.count, 3)
+        self.assertEqual(first.to_dict()['buckets']['0.01'], 2)
+        self.assertEqual(first.to_dict()['buckets']['+Inf'], 3)
+        self.assertEqual(first.max, 5)
+
+
+class MetricsTests(SimpleTestCase):
+
+    def test_durations_are_attributed_to_thread_company(self):
+        collected = Metrics()
+
+        def scrape():
+            with collected.company('sequoai'):
+                collected.observe(metrics.PARSE, 0.5)
+
+        with collected.company('world-bank-group'):
+            thread = threading.Thread(target=scrape)
+            thread.start()
+            thread.join()
+            collected.observe(metrics.PARSE, 0.25)
+        collected.observe(metrics.DB_WRITE, 0.1)
+
+        data = collected.to_dict()
+        self.assertEqual(data[metrics.PARSE]['sequoai']['sum'], 0.5)
+        self.assertEqual(data[metrics.PARSE]['world-bank-group']['sum'], 0.25)
+        self.assertEqual(data[metrics.DB_WRITE][metrics.ALL_COMPANIES]['count'], 1)
+
+    def test_statements_are_timed_as_reads_or_writes(self):
+        collected = Metrics()
+        execute = lambda sql, params, many, context: None
+        with collected.company('sequoai'):
+            collected(execute, 'SELECT 1', None, False, {})
+            collected(execute, ' select 1', None, False, {})
+            collected(execute, 'INSERT INTO jobs_location ...', None, False, {})
+
+        data = collected.to_dict()
+        self.assertEqual(data[metrics.DB_READ]['sequoai']['count'], 2)
+        self.assertEqual(data[metrics.DB_WRITE]['sequoai']['count'], 1)
+
+    def test_statements_classified_by_leading_keyword(self):
+        reads = [
+            'WITH seen AS (SELECT 1) SELECT * FROM seen', 'EXPLAIN (FORMAT JSON) SELECT 1',
+            '\n  show server_version', 'Select 1'
+        ]
+        writes = [
+            'UPDATE jobs_opening SET date_inactive = %s', 'DELETE FROM jobs_scraperun',
+            'SELECTED', 'CREATE TEMPORARY TABLE seen (entry_hash varchar)', ''
+        ]
+        for sql in reads:
+            self.assertTrue(metrics.is_read(sql), sql)
+        for sql in writes:
+            self.assertFalse(metrics.is_read(sql), sql)
+
+    def test_prometheus_export(self):
+        collected = Metrics()
+        collected.observe(metrics.DETAIL_FETCH, 0.2, 'world-bank-group')
+
+        text = collected.to_prometheus(
+            {'world-bank-group': {'created': 3}}, finished=1600000000.0
+        )
+        lines = text.splitlines()
+        name = 'jobscraper_stage_duration_seconds'
+        labels = 'stage="detail_fetch",company="world-bank-group"'
+
+        self.assertIn(f'# TYPE {name} histogram', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="0.1"}} 0', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="0.25"}} 1', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="+Inf"}} 1', lines)
+        self.assertIn(f'{name}_count{{{labels}}} 1', lines)
+        self.assertIn('jobscraper_openings{company="world-bank-group",outcome="created"} 3', lines)
+        self.assertIn('jobscraper_last_run_timestamp_seconds 1600000000.0', lines)
+
+        # the textfile collector reads the Prometheus text format
+        self.assertFalse([line for line in lines if line.startswith(('# UNIT', '# EOF'))])
+
+    def test_write_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics', 'scrape.json')
+            metrics.write_json(path, {'stages': {}})
+
+            with open(path) as fp:
+                self.assertEqual(json.load(fp), {'stages': {}})
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['scrape.json'])
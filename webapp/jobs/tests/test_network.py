@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+from requests_html import HTMLResponse
+
+from jobs.network import HttpCache, RateLimiter, SessionManager, TokenBucket
+
+
+def make_response(status_code: int, content: bytes = b'', **headers) -> HTMLResponse:
+    res = HTMLResponse(session=None)
+    res.status_code = status_code
+    res.headers.update(headers)
+    res.encoding = 'utf-8'
+    res._content = content
+    return res
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_burst_is_served_without_waiting(self):
+        bucket = TokenBucket(rate=1, burst=3)
+        delays = [bucket.acquire() for _ in range(3)]
+        self.assertEqual(delays, [0, 0, 0])
+
+    def test_requests_beyond_burst_are_paced(self):
+        bucket = TokenBucket(rate=20, burst=1)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+
+        # first token is from the burst, the other four wait 1/20th of a second each
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def test_hosts_have_separate_buckets(self):
+        limiter = RateLimiter(rate=1, burst=1, respect_robots=False)
+        self.assertEqual(limiter.wait('http://a.example.com/jobs'), 0)
+        self.assertEqual(limiter.wait('http://b.example.com/jobs'), 0)
+        self.assertIs(
+            limiter.get_bucket('http://a.example.com/jobs/1'),
+            limiter.get_bucket('http://a.example.com/jobs/2')
+        )
+
+    def test_crawl_delay_caps_host_rate(self):
+        limiter = RateLimiter(rate=10, burst=1, respect_robots=True)
+        limiter.get_crawl_delay = lambda url: 4
+        self.assertEqual(limiter.get_bucket('http://a.example.com/').rate, 0.25)
+
+
+class SessionManagerTests(SimpleTestCase):
+
+    def test_session_is_shared_per_scraper_and_host(self):
+        sessions = SessionManager(pool_size=2, timeout=5)
+        session = sessions.get_session('scraper', 'https://a.example.com/jobs')
+        self.assertIs(session, sessions.get_session('scraper', 'https://a.example.com/jobs/1'))
+        self.assertIsNot(session, sessions.get_session('scraper', 'https://b.example.com/'))
+        self.assertIsNot(session, sessions.get_session('other', 'https://a.example.com/'))
+
+    def test_session_pools_connections(self):
+        sessions = SessionManager(pool_size=3, timeout=5)
+        session = sessions.get_session('scraper', 'https://a.example.com/jobs')
+        adapter = session.get_adapter('https://a.example.com/jobs')
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+
+        sessions.close()
+        self.assertEqual(sessions.sessions, {})
+
+
+class HttpCacheTests(SimpleTestCase):
+    URL = 'https://a.example.com/jobs/1'
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache = HttpCache(self.tempdir.name, max_size=1024)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_validators_sent_for_cached_response(self):
+        self.assertEqual(self.cache.get_headers(self.URL), {})
+
+        res = make_response(200, b'<p>job</p>', ETag='"v1"', **{'Last-Modified': 'Mon'})
+        self.assertFalse(self.cache.process(self.URL, res).from_cache)
+        self.assertEqual(self.cache.get_headers(self.URL), {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'
+        })
+
+    def test_not_modified_response_served_from_cache(self):
+        self.cache.process(self.URL, make_response(200, b'<p>job</p>', ETag='"v1"'))
+
+        res = self.cache.process(self.URL, make_response(304))
+        self.assertTrue(res.from_cache)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'<p>job</p>')
+
+    def test_response_without_validators_not_cached(self):
+        self.cache.process(self.URL, make_response(200, b'<p>job</p>'))
+        self.assertEqual(self.cache.get_headers(self.URL), {})
+
+    def test_least_recently_used_entries_evicted(self):
+        urls = [f'{self.URL}?n={n}' for n in range(3)]
+        for url in urls[:2]:
+            self.cache.process(url, make_response(200, b'x' * 400, ETag='"v1"'))
+
+        # use the first entry so the second becomes the least recently used
+        self.cache.process(urls[0], make_response(304))
+        self.cache.process(urls[2], make_response(200, b'x' * 400, ETag='"v1"'))
+
+        self.assertTrue(self.cache.get_headers(urls[0]))
+        self.assertFalse(self.cache.get_headers(urls[1]))
+        self.assertTrue(self.cache.get_headers(urls[2]))
+        self.assertEqual(len(os.listdir(self.tempdir.name)), 4)
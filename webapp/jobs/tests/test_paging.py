@@ -0,0 +1,150 @@
+from datetime import date
+from unittest import mock
+
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase
+
+from jobs.forms import SearchForm
+from jobs.models import Opening
+from jobs.paging import (
+    InvalidCursor, KeysetPage, RowCount, count_rows, decode_cursor, encode_cursor,
+    keyset_filter, keyset_paginate
+)
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor(['-date_active', '-id'], [date(2020, 8, 15), 42])
+        self.assertEqual(decode_cursor(token), [['-date_active', '-id'], ['2020-08-15', 42]])
+
+        token = encode_cursor(['-rank', 'id'], [0.10000000149011612, 7])
+        self.assertEqual(decode_cursor(token)[1], [0.10000000149011612, 7])
+
+    def test_tampered_cursor_rejected(self):
+        token = encode_cursor(['-rank', 'id'], [0.5, 7])
+        for value in (token[:-1], 'page-2', token.replace(':', '.', 1)):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(value)
+
+        form = SearchForm({'after': 'page-2'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('after', form.errors)
+
+    def test_keyset_filter_follows_ordering(self):
+        condition = keyset_filter(['-rank', 'id'], [0.5, 7])
+        self.assertEqual(
+            condition, Q(rank__lte=0.5) & (Q(rank__lt=0.5) | Q(rank=0.5, id__gt=7))
+        )
+
+        condition = keyset_filter(['distance', 'id'], [10.5, 7], Opening)
+        self.assertEqual(
+            condition, Q(distance__gte=10.5) & (Q(distance__gt=10.5) | Q(distance=10.5, id__gt=7))
+        )
+
+    def test_keyset_filter_compares_rows_of_fields(self):
+        condition = keyset_filter(['-date_active', '-id'], ['2020-08-15', 42], Opening)
+        sql = str(Opening.objects.filter(condition).query)
+        self.assertIn(
+            'WHERE (("jobs_opening"."date_active", "jobs_opening"."id") < (2020-08-15, 42))', sql
+        )
+
+        condition = keyset_filter(['date_active', 'id'], ['2020-08-15', 42], Opening)
+        sql = str(Opening.objects.filter(condition).query)
+        self.assertIn('"jobs_opening"."id") > (2020-08-15, 42))', sql)
+
+    def test_next_after_set_for_last_row(self):
+        rows = [
+            Opening(id=9, date_active=date(2020, 9, 1)),
+            Opening(id=4, date_active=date(2020, 8, 1))
+        ]
+        page = KeysetPage(rows, ['-date_active', '-id'], has_next=True, has_previous=False)
+        self.assertEqual(decode_cursor(page.next_after)[1], ['2020-08-01', 4])
+
+        page = KeysetPage(rows, ['-date_active', '-id'], has_next=False, has_previous=True)
+        self.assertIsNone(page.next_after)
+
+
+class FakeQuerySet:
+    model = Opening
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.limits = []
+
+    def order_by(self):
+        return self
+
+    def __getitem__(self, limits):
+        self.limits.append(limits.stop)
+        return mock.Mock(count=lambda: min(self.rows, limits.stop))
+
+
+class CountRowsTests(SimpleTestCase):
+
+    def setUp(self):
+        patchers = [
+            mock.patch('jobs.paging._planner_estimate', return_value=250000),
+            mock.patch('jobs.paging._table_estimate', return_value=900000),
+        ]
+        (self.planner, self.table) = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def test_rows_counted_exactly_up_to_threshold(self):
+        queryset = FakeQuerySet(42)
+        self.assertEqual(count_rows(queryset, 100), RowCount(42, RowCount.EXACT))
+        self.assertEqual(queryset.limits, [101])
+        self.planner.assert_not_called()
+
+    def test_rows_estimated_beyond_threshold(self):
+        count = count_rows(FakeQuerySet(5000), 100)
+        self.assertEqual(count, RowCount(250000, RowCount.PLANNER))
+        self.assertFalse(count.is_exact)
+
+        count = count_rows(FakeQuerySet(5000), 100, filtered=False)
+        self.assertEqual(count, RowCount(900000, RowCount.RELTUPLES))
+
+        # estimates are no lower than the rows counted
+        self.planner.return_value = 10
+        self.assertEqual(count_rows(FakeQuerySet(5000), 100).value, 101)
+
+
+class KeysetPaginateTestCase(TestCase):
+    fixtures = ['companies.json', 'openings.json']
+
+    def test_pages_follow_each_other_without_overlap(self):
+        ordering = ['-date_active', '-id']
+        expected = list(Opening.objects.order_by(*ordering).values_list('id', flat=True))
+
+        (seen, after) = ([], None)
+        while True:
+            page = keyset_paginate(Opening.objects.all(), ordering, 2, after)
+            self.assertEqual(page.has_previous, after is not None)
+            seen.extend(opening.id for opening in page)
+            after = page.next_after
+            if not page.has_next:
+                break
+
+        self.assertEqual(seen, expected)
+
+    def test_cursor_for_other_ordering_ignored(self):
+        after = encode_cursor(['-rank', 'id'], [0.5, 1])
+        page = keyset_paginate(Opening.objects.all(), ['-date_active', '-id'], 10, after)
+        self.assertFalse(page.has_previous)
+        self.assertEqual(len(page), Opening.objects.count())
+
+
+class CountRowsTestCase(TestCase):
+    fixtures = ['companies.json', 'openings.json']
+
+    def test_counts_beyond_threshold_estimated_from_planner(self):
+        self.assertEqual(count_rows(Opening.objects.all(), 10), RowCount(3, RowCount.EXACT))
+
+        count = count_rows(Opening.objects.filter(date_inactive__isnull=True), 1)
+        self.assertEqual(count.mode, RowCount.PLANNER)
+        self.assertGreaterEqual(count.value, 2)
+
+        count = count_rows(Opening.objects.all(), 1, filtered=False)
+        self.assertEqual(count.mode, RowCount.RELTUPLES)
+        self.assertGreaterEqual(count.value, 2)
@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+from datetime import date
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from jobs.models import Opening
+from jobs.paging import RowCount, decode_cursor
+from jobs.results import (
+    INITIAL_VERSION, ResultCache, SearchResult, bump_data_version, get_data_version,
+    paginate_results, result_cache
+)
+
+
+class DataVersionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, 'cache', 'data_version')
+
+    def test_version_changes_once_bumped(self):
+        self.assertEqual(get_data_version(self.path), INITIAL_VERSION)
+
+        version = bump_data_version(self.path)
+        self.assertEqual(get_data_version(self.path), version)
+        self.assertNotEqual(bump_data_version(self.path), version)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['data_version'])
+
+    def test_results_for_earlier_versions_not_served(self):
+        results = ResultCache(max_size=10, path=self.path)
+        result = SearchResult([(date(2020, 8, 15), 1)], RowCount(1, RowCount.EXACT), True)
+
+        version = results.get_version()
+        results.set(('economist',), version, result)
+        self.assertEqual(results.get(('economist',), version), result)
+
+        bump_data_version(self.path)
+        self.assertIsNone(results.get(('economist',), results.get_version()))
+        self.assertEqual(len(results.results), 0)
+
+        # results computed before the version was bumped are not cached
+        results.set(('economist',), version, result)
+        self.assertEqual(len(results.results), 0)
+
+    def test_least_recently_used_results_evicted(self):
+        results = ResultCache(max_size=2, path=self.path)
+        version = results.get_version()
+        for key in ('a', 'b'):
+            results.set((key,), version, SearchResult([], RowCount(0, RowCount.EXACT), True))
+
+        results.get(('a',), version)
+        results.set(('c',), version, SearchResult([], RowCount(0, RowCount.EXACT), True))
+        self.assertEqual(list(results.results.keys()), [('a',), ('c',)])
+
+    def test_result_position_found_by_opening_id(self):
+        result = SearchResult([(0.5, 7), (0.5, 9), (0.1, 3)], RowCount(3, RowCount.EXACT), True)
+        self.assertEqual(result.find(9), 1)
+        self.assertIsNone(result.find(4))
+
+
+@override_settings(SEARCH_CACHE_MAX_RESULTS=2)
+class PaginateResultsTestCase(TestCase):
+    fixtures = ['companies.json', 'openings.json']
+    ORDERING = ('-date_active', '-id')
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, 'data_version')
+        self.addCleanup(setattr, result_cache, 'path', result_cache.path)
+        result_cache.path = self.path
+        result_cache.clear()
+
+    def test_cached_results_served_without_searching(self):
+        openings = Opening.objects.all()
+        (page, count) = paginate_results(openings, self.ORDERING, 1, key=('all',))
+        self.assertEqual(count, RowCount(3, RowCount.EXACT))
+        self.assertTrue(page.has_next)
+
+        # the second page is held by the cached results, openings are fetched by id
+        with self.assertNumQueries(1):
+            (second, _) = paginate_results(
+                openings, self.ORDERING, 1, page.next_after, key=('all',)
+            )
+        self.assertEqual(decode_cursor(page.next_after)[1][1], page[0].id)
+        self.assertNotEqual(second[0].id, page[0].id)
+
+        # the third page is beyond the cached results
+        with self.assertNumQueries(1):
+            (third, _) = paginate_results(
+                openings, self.ORDERING, 1, second.next_after, key=('all',)
+            )
+        self.assertEqual(len({page[0].id, second[0].id, third[0].id}), 3)
+
+    def test_results_searched_again_once_data_version_bumped(self):
+        openings = Opening.objects.filter(role_title__icontains='senior')
+        (_, count) = paginate_results(openings, self.ORDERING, 10, key=('senior',))
+        self.assertEqual(count, RowCount(3, RowCount.EXACT))
+
+        Opening.objects.filter(role_title__icontains='ifc').update(role_title='Analyst')
+        (_, count) = paginate_results(openings, self.ORDERING, 10, key=('senior',))
+        self.assertEqual(count.value, 3)
+
+        bump_data_version(self.path)
+        (page, count) = paginate_results(openings, self.ORDERING, 10, key=('senior',))
+        self.assertEqual(count, RowCount(2, RowCount.EXACT))
+        self.assertEqual(len(page), 2)
@@ -0,0 +1,553 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+import requests
+
+from pyppeteer.errors import TimeoutError as RenderTimeoutError
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from jobs.benchmark import Benchmark, FixtureServer, PrerenderedSequoiaScraper
+from jobs.known import KnownOpenings
+from jobs.metrics import PARSE, Metrics
+from jobs.mocksite import MockSite
+from jobs.models import Location, Opening, compute_content_hash
+from jobs.network import RateLimiter
+from jobs.results import get_data_version
+from jobs.scraper import (
+    Engine, Job, JobDetail, LocationResolver, Page, ScrapResult, SequoiaScraper,
+    SiteScraper, Stats, WorldBankGroupScraper
+)
+
+
+class FakeCompany:
+    name = 'Fake Company'
+    name_slug = 'world-bank-group'
+
+
+class FakeScraper(SiteScraper):
+    ASYNC = True
+    DELAY = 0.05  # seconds
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def scrape_vacancy_details(self, company, job):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.DELAY)
+        with self.lock:
+            self.in_flight -= 1
+
+        if job.data.get('fail'):
+            raise ValueError(job.hash)
+        return JobDetail(entry_hash=job.hash, company=company)
+
+
+def fake_execute_companies(company_ids, options):
+    metrics = Metrics()
+    for company_id in company_ids:
+        metrics.observe(PARSE, company_id, 'world-bank-group')
+    stats = Stats(created=sum(company_ids), failed=len(company_ids))
+    return ({'world-bank-group': stats}, metrics.to_dict())
+
+
+def fake_execute_host(company_ids, options):
+    metrics = Metrics()
+    metrics.observe(PARSE, len(company_ids), 'world-bank-group')
+    return ({}, metrics.to_dict())
+
+
+class EngineTests(SimpleTestCase):
+
+    def _get_results(self, scraper, count, failing=()):
+        company = FakeCompany()
+        return [
+            ScrapResult(company, Job({'fail': n in failing}, str(n), '1'), scraper)
+            for n in range(count)
+        ]
+
+    def test_connections_closed_once_per_worker_thread(self):
+        scraper = FakeScraper()
+        engine = Engine([], max_in_flight=4)
+
+        with mock.patch.object(BaseDatabaseWrapper, 'close', autospec=True) as close:
+            details = list(engine.scrape_vacancies_details(self._get_results(scraper, 12)))
+        self.assertEqual(len(details), 12)
+
+        closed = [call.args[0] for call in close.call_args_list]
+        self.assertEqual(len(closed), len(set(map(id, closed))))
+        self.assertLessEqual(len(closed), 4)
+        self.assertTrue(all(not conn.allow_thread_sharing for conn in closed))
+
+    def test_vacancy_details_scraped_concurrently_within_limit(self):
+        scraper = FakeScraper()
+        engine = Engine([], max_in_flight=4)
+
+        details = list(engine.scrape_vacancies_details(self._get_results(scraper, 12)))
+        self.assertEqual(len(details), 12)
+        self.assertEqual(scraper.max_in_flight, 4)
+        self.assertEqual(
+            sorted(detail.entry_hash for (_, detail, _) in details),
+            sorted(str(n) for n in range(12))
+        )
+
+    def test_vacancy_details_errors_are_returned_with_results(self):
+        scraper = FakeScraper()
+        engine = Engine([], max_in_flight=3)
+
+        results = self._get_results(scraper, 6, failing=(2, 5))
+        details = list(engine.scrape_vacancies_details(results))
+        errors = {result.job.hash: error for (result, _, error) in details if error}
+        self.assertEqual(sorted(errors.keys()), ['2', '5'])
+        self.assertIsInstance(errors['2'], ValueError)
+
+    def test_details_for_recently_verified_known_openings_not_scraped(self):
+        scraper = FakeScraper()
+        engine = Engine([])
+        engine.known_openings = KnownOpenings.load([
+            ('0', 10, timezone.now() - timedelta(hours=1), None),
+            ('1', 11, timezone.now() - timedelta(days=365), None),
+            ('2', 12, None, None),
+        ])
+
+        details = engine.scrape_vacancies_details(self._get_results(scraper, 4))
+        scraped = {result.job.hash: detail for (result, detail, _) in details}
+        self.assertIsNone(scraped['0'])
+        self.assertEqual([scraped[h].entry_hash for h in '123'], ['1', '2', '3'])
+
+    def test_deep_verify_scrapes_details_for_all_known_openings(self):
+        scraper = FakeScraper()
+        engine = Engine([], deep_verify=True)
+        engine.known_openings = KnownOpenings.load([('0', 10, timezone.now(), None)])
+
+        details = engine.scrape_vacancies_details(self._get_results(scraper, 2))
+        self.assertTrue(all(detail for (_, detail, _) in details))
+
+    def test_pipeline_returns_details_for_streamed_listings(self):
+        scraper = FakeScraper()
+        engine = Engine([], max_in_flight=2)
+        engine.queue_size = 2
+        engine.scrape_vacancies = lambda: iter(self._get_results(scraper, 10))
+
+        details = list(engine.scrape_pipeline())
+        self.assertEqual(len(details), 10)
+        self.assertEqual(engine.queue_depths['listings'].count, 10)
+        self.assertLessEqual(engine.queue_depths['listings'].max, 2)
+        self.assertLessEqual(engine.queue_depths['details'].max, 2)
+
+    def test_pipeline_raises_listing_errors_after_returning_details(self):
+        scraper = FakeScraper()
+        results = self._get_results(scraper, 3)
+        engine = Engine([])
+
+        def scrape_vacancies():
+            yield from results
+            raise ValueError('listing failed')
+
+        engine.scrape_vacancies = scrape_vacancies
+        details = []
+        with self.assertRaises(ValueError):
+            for item in engine.scrape_pipeline():
+                details.append(item)
+        self.assertEqual(len(details), 3)
+
+    def test_known_openings_compared_by_content_hash(self):
+        engine = Engine([])
+        (unchanged, changed) = self._get_results(FakeScraper(), 2)
+        details = [
+            JobDetail(entry_hash=result.job.hash, role_title='Economist', description='...')
+            for result in (unchanged, changed)
+        ]
+        content_hash = compute_content_hash(details[0]._asdict())
+        engine.known_openings = KnownOpenings.load([
+            ('0', 10, None, content_hash), ('1', 11, None, 'stale')
+        ])
+
+        with mock.patch.object(Opening.objects, 'filter') as filter_openings:
+            engine.process_vacancy(unchanged, details[0])
+            filter_openings.assert_not_called()
+
+            engine.process_vacancy(changed, details[1])
+            filter_openings.assert_called_once_with(id=11)
+            update = filter_openings.return_value.update
+            self.assertEqual(update.call_args[1]['role_title'], 'Economist')
+
+        self.assertEqual(engine.verified_openings, [10])
+        self.assertEqual(engine.updated_openings, {11})
+        index = engine.known_openings.find('1')
+        self.assertEqual(
+            engine.known_openings.get_content_hash(index), update.call_args[1]['content_hash']
+        )
+        self.assertEqual(engine.stats['world-bank-group'], Stats(updated=1, ignored=1))
+
+    @mock.patch('jobs.scraper.openings_deactivate', return_value={1: 4})
+    def test_unseen_known_openings_deactivated_for_scraped_companies(self, deactivate):
+        company = FakeCompany()
+        company.id = 1
+        engine = Engine([company])
+        engine.scraped_companies = [company]
+        engine.known_openings = KnownOpenings.load([('a', 10, None, None), ('b', 11, None, None)])
+        engine.known_openings.mark_seen(engine.known_openings.find('a'))
+
+        engine._update_inactive_openings()
+        (company_ids, seen_hashes, _, created_before) = deactivate.call_args[0]
+        self.assertEqual((company_ids, list(seen_hashes)), ([1], ['a']))
+        self.assertEqual(created_before, engine.scrape_time)
+        self.assertEqual(engine.stats['world-bank-group'].deactivated, 4)
+
+    @mock.patch('jobs.scraper.bump_data_version')
+    @mock.patch('jobs.scraper.openings_tsdocument_deferred')
+    def test_scrape_aborted_when_known_openings_not_loaded(self, deferred, _):
+        engine = Engine([], metrics_json='', metrics_textfile='')
+        names = ('_before_scrape', 'scrape_pipeline', '_after_scrape')
+        patchers = [mock.patch.object(engine, name) for name in names]
+        (_, pipeline, after_scrape) = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        engine.execute()
+        pipeline.assert_not_called()
+        after_scrape.assert_called_once_with(completed=False)
+
+    def _get_companies(self, urls):
+        companies = []
+        for (company_id, url) in enumerate(urls, 1):
+            company = FakeCompany()
+            (company.id, company.vacancies_url) = (company_id, url)
+            companies.append(company)
+        return companies
+
+    def test_render_timeout_fails_only_its_company(self):
+        class ListingScraper(SiteScraper):
+            def __init__(self, url):
+                self.url = url
+
+            def scrape_vacancies(self):
+                yield Job({}, 'a', '1')
+
+        (sequoia, world_bank) = (FakeCompany(), FakeCompany())
+        (sequoia.id, sequoia.name_slug, sequoia.vacancies_url) = (1, 'sequoai', 'http://sequoia')
+        (world_bank.id, world_bank.vacancies_url) = (2, 'http://world-bank')
+
+        engine = Engine([sequoia, world_bank], full_scrape=True)
+        engine.scrapers = {'sequoai': SequoiaScraper, 'world-bank-group': ListingScraper}
+        browsers = mock.Mock()
+        browsers.render.side_effect = RenderTimeoutError('Waiting for selector failed')
+        patchers = [
+            mock.patch.object(SiteScraper, 'browsers', browsers),
+            mock.patch.object(SiteScraper, 'sessions', mock.Mock()),
+            mock.patch.object(
+                SiteScraper, 'rate_limiter',
+                RateLimiter(rate=1e6, burst=1000, respect_robots=False)
+            ),
+        ] + [
+            mock.patch.object(engine, name) for name in (
+                '_update_inactive_openings', '_update_scraped_companies',
+                '_update_verified_openings'
+            )
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        results = list(engine.scrape_vacancies())
+        self.assertEqual([(r.company, r.job.hash) for r in results], [(world_bank, 'a')])
+        self.assertEqual(engine.failed_companies, [sequoia])
+        self.assertEqual(engine.scraped_companies, [world_bank])
+
+        engine._after_scrape()
+        self.assertEqual(engine.stats['sequoai'].failed, 1)
+        self.assertEqual(engine.stats['world-bank-group'].failed, 0)
+
+    @mock.patch('jobs.scraper.bump_data_version')
+    @mock.patch('jobs.scraper.execute_companies', fake_execute_companies)
+    def test_stats_from_workers_are_merged(self, bump_data_version):
+        companies = self._get_companies(
+            ['https://a.example.com/jobs', 'https://b.example.com/jobs', 'https://c.example.com']
+        )
+
+        engine = Engine(companies, metrics_json='', metrics_textfile='')
+        engine.execute(workers=2)
+        self.assertEqual(engine.stats['world-bank-group'], Stats(created=6, failed=3))
+
+        histogram = engine.metrics.to_dict()[PARSE]['world-bank-group']
+        self.assertEqual((histogram['count'], histogram['sum'], histogram['max']), (3, 6, 3))
+        bump_data_version.assert_called_once()
+
+    @mock.patch('jobs.scraper.bump_data_version')
+    def test_companies_sharing_a_host_scraped_by_one_worker(self, bump_data_version):
+        companies = self._get_companies([
+            'https://jobs.example.com/acme', 'https://other.example.com/jobs',
+            'https://JOBS.example.com/globex'
+        ])
+
+        engine = Engine(companies, metrics_json='', metrics_textfile='')
+        with mock.patch('jobs.scraper.execute_companies', fake_execute_host):
+            engine.execute(workers=2)
+
+        # each worker observes the number of companies it scraped
+        histogram = engine.metrics.to_dict()[PARSE]['world-bank-group']
+        self.assertEqual((histogram['count'], histogram['sum'], histogram['max']), (2, 3, 2))
+
+
+class LocationResolverTests(SimpleTestCase):
+
+    def test_known_names_resolved_from_memory(self):
+        resolver = LocationResolver(max_size=10)
+        resolver.ids.update({'Abuja, Nigeria': 1, 'Kyiv, Ukraine': 2})
+
+        locations = resolver.resolve(['Kyiv, Ukraine', '', 'Abuja, Nigeria', 'Kyiv, Ukraine'])
+        self.assertEqual(
+            [(loc.id, loc.name) for loc in locations],
+            [(2, 'Kyiv, Ukraine'), (1, 'Abuja, Nigeria')]
+        )
+
+    def test_least_recently_used_names_evicted(self):
+        resolver = LocationResolver(max_size=2)
+        resolver.ids.update({'A': 1, 'B': 2})
+        resolver.resolve(['A'])
+
+        resolver._add({'C': 3})
+        self.assertEqual(list(resolver.ids.keys()), ['A', 'C'])
+
+
+class LocationResolverTestCase(TestCase):
+    fixtures = ['locations.json']
+
+    def test_unknown_names_created_once(self):
+        resolver = LocationResolver(max_size=100)
+        resolver.warm()
+        known = Location.objects.first()
+
+        locations = resolver.resolve([known.name, 'Abuja, Nigeria', 'Lagos, Nigeria'])
+        self.assertEqual(locations[0].id, known.id)
+        self.assertEqual(
+            Location.objects.filter(name__in=['Abuja, Nigeria', 'Lagos, Nigeria']).count(), 2
+        )
+
+        # a fresh resolver finds the created names without creating them again
+        count = Location.objects.count()
+        ids = [loc.id for loc in LocationResolver(max_size=100).resolve(['Abuja, Nigeria'])]
+        self.assertEqual(ids, [locations[1].id])
+        self.assertEqual(Location.objects.count(), count)
+
+
+class WorldBankGroupScraperTests(SimpleTestCase):
+
+    def _get_scraper(self, pages, known_hashes, incremental):
+        scraper = WorldBankGroupScraper('http://localhost/search.aspx')
+        scraper.known_hashes = known_hashes
+        scraper.incremental = incremental
+        scraper.incremental_pages = 2
+        scraper.request = mock.Mock(return_value=mock.Mock(content=b'<html></html>', encoding='utf-8'))
+        scraper._update_state = mock.Mock()
+
+        paging = [{'page_no': str(n + 1), 'event_target': f'p{n}'} for n in range(len(pages))]
+        scraper._get_page = mock.Mock(side_effect=[
+            Page(jobs=[Job({}, h, str(n + 1)) for h in hashes], paging=paging)
+            for (n, hashes) in enumerate(pages)
+        ])
+        return scraper
+
+    def test_incremental_scrape_stops_after_known_pages(self):
+        pages = [['a', 'b'], ['c', 'k1'], ['k2', 'k3'], ['k4'], ['k5'], ['d']]
+        known_hashes = {'k1', 'k2', 'k3', 'k4', 'k5'}
+        scraper = self._get_scraper(pages, known_hashes, incremental=True)
+
+        hashes = [job.hash for job in scraper.scrape_vacancies()]
+        self.assertEqual(hashes, ['a', 'b', 'c', 'k1', 'k2', 'k3', 'k4'])
+        self.assertTrue(scraper.is_partial)
+
+    def test_full_scrape_walks_all_pages(self):
+        pages = [['k1'], ['k2'], ['k3'], ['d']]
+        scraper = self._get_scraper(pages, {'k1', 'k2', 'k3'}, incremental=False)
+
+        hashes = [job.hash for job in scraper.scrape_vacancies()]
+        self.assertEqual(hashes, ['k1', 'k2', 'k3', 'd'])
+        self.assertFalse(scraper.is_partial)
+
+    def test_pages_done_are_not_fetched(self):
+        pages = [['a'], ['c']]
+        scraper = self._get_scraper(pages, set(), incremental=False)
+        scraper.pages_done = frozenset({'2'})
+        scraper._get_page.side_effect = [
+            Page(jobs=[Job({}, 'a', '1')], paging=[
+                {'page_no': str(n), 'event_target': f'p{n}'} for n in (1, 2, 3)
+            ]),
+            Page(jobs=[Job({}, 'c', '3')], paging=[]),
+        ]
+
+        hashes = [job.hash for job in scraper.scrape_vacancies()]
+        self.assertEqual(hashes, ['a', 'c'])
+        scraper._get_page.assert_called_with(page_no='3', event_target='p3')
+
+
+class SequoiaScraperTests(SimpleTestCase):
+
+    JOB_PAGE = b'''
+        <html><body><div class="job _content">
+          <div class="job _job-locations">San Francisco, CA<br>Remote</div>
+          <h1 class="job _job-desc-title">Software Engineer</h1>
+          <div class="job _job-description"><p>Build reliable systems.</p></div>
+        </div></body></html>
+    '''
+
+    def test_vacancy_details(self):
+        scraper = SequoiaScraper('http://localhost/jobs')
+        scraper.get_vacancy_page = mock.Mock(
+            return_value=mock.Mock(content=self.JOB_PAGE, encoding='utf-8')
+        )
+        href = 'http://localhost/jobs/acme/engineer'
+        job = Job({'href': href, 'company_name': 'Acme'}, 'hash', '1')
+
+        with mock.patch.object(scraper, 'get_locations', side_effect=lambda names: names):
+            detail = scraper.scrape_vacancy_details(FakeCompany(), job)
+
+        self.assertEqual(detail.role_title, 'Software Engineer | Acme')
+        self.assertEqual(detail.locations, ['San Francisco, CA'])
+        self.assertTrue(detail.is_remote)
+
+
+class FixturePagesTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FixtureServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            SiteScraper, 'rate_limiter', RateLimiter(rate=1e6, burst=1000, respect_robots=False)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_world_bank_group_listings(self):
+        scraper = WorldBankGroupScraper(f'{self.server.url}/world-bank-group/search.aspx')
+        jobs = list(scraper.scrape_vacancies())
+
+        self.assertEqual(len(jobs), 80)
+        self.assertEqual(len({job.hash for job in jobs}), 80)
+        self.assertEqual([job.page_no for job in jobs[::20]], ['1', '2', '3', '4'])
+        self.assertTrue(jobs[0].data['href'].startswith('requisition.aspx?id='))
+
+    def test_sequoia_listings(self):
+        scraper = PrerenderedSequoiaScraper(f'{self.server.url}/sequoai/jobs')
+        jobs = list(scraper.scrape_vacancies())
+
+        self.assertEqual(len(jobs), 36)
+        self.assertEqual(len({job.hash for job in jobs}), 36)
+        self.assertEqual(jobs[0].data['company_name'], 'Acme Robotics')
+        self.assertEqual(len(jobs[0].data['title'].split(' | ')), 2)
+
+    def test_world_bank_group_vacancy_details(self):
+        scraper = WorldBankGroupScraper(f'{self.server.url}/world-bank-group/search.aspx')
+        job = Job({'href': 'requisition.aspx?id=9001'}, 'hash', '1')
+
+        with mock.patch.object(scraper, 'get_locations', side_effect=lambda names: names):
+            detail = scraper.scrape_vacancy_details(FakeCompany(), job)
+
+        self.assertEqual(detail.role_title, 'Senior Economist | World Bank | req9125')
+        self.assertEqual(detail.locations, ['Washington, DC,United States', 'Nairobi, Kenya'])
+        self.assertTrue(detail.description.startswith('<table class="jobDescription">'))
+
+    def test_parse_benchmark(self):
+        results = Benchmark(self.server).run_parse(rounds=2)
+
+        self.assertEqual(results['world-bank-group']['pages'], 8)
+        self.assertEqual(results['world-bank-group']['jobs'], 2 * (80 + 16))
+        self.assertEqual(results['sequoai']['jobs'], 2 * 36)
+        self.assertGreater(results['sequoai']['pages_per_sec'], 0)
+
+
+class BenchmarkTestCase(TransactionTestCase):
+
+    def test_engine_runs(self):
+        version = get_data_version()
+        with FixtureServer() as server:
+            results = Benchmark(server).run(runs=2, parse_rounds=1)
+
+        # benchmarks leave the data version of the site alone
+        self.assertEqual(get_data_version(), version)
+
+        (cold, warm) = results['engine']
+        self.assertEqual(cold['stats']['world-bank-group']['created'], 80)
+        self.assertEqual(cold['stats']['sequoai']['created'], 36)
+        self.assertEqual(cold['openings'], 116)
+        self.assertEqual(cold['pages'], 5 + 80 + 1 + 36)
+        self.assertGreater(cold['statements_per_opening'], 0)
+
+        self.assertEqual(warm['stats']['world-bank-group']['ignored'], 80)
+        self.assertEqual(warm['stats']['sequoai']['ignored'], 36)
+        self.assertEqual(warm['pages'], 5 + 1)
+
+
+class MockSiteTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            SiteScraper, 'rate_limiter', RateLimiter(rate=1e6, burst=1000, respect_robots=False)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _scrape(self, site):
+        return list(WorldBankGroupScraper(site.vacancies_url).scrape_vacancies())
+
+    def test_listings_are_paged_through_postbacks(self):
+        with MockSite(postings=250, page_size=50) as site:
+            jobs = self._scrape(site)
+
+        self.assertEqual(len(jobs), 250)
+        self.assertEqual(len({job.hash for job in jobs}), 250)
+        self.assertEqual(jobs[-1].page_no, '5')
+
+    def test_postings_churn_between_scrapes(self):
+        with MockSite(postings=500, page_size=100, churn=0.2) as site:
+            first = {job.hash for job in self._scrape(site)}
+            second = {job.hash for job in self._scrape(site)}
+
+        self.assertEqual(len(second), 500)
+        self.assertTrue(300 < len(first & second) < 500)
+
+    def test_postback_requires_viewstate(self):
+        with MockSite(postings=10) as site:
+            res = requests.post(site.vacancies_url, data={'__EVENTTARGET': 'pager$1'})
+        self.assertEqual(res.status_code, 500)
+
+    def test_failed_requests(self):
+        with MockSite(postings=10, error_rate=1) as site:
+            with self.assertRaises(requests.HTTPError):
+                self._scrape(site)
+            self.assertEqual(site.errors, 1)
+
+    def test_vacancy_details(self):
+        with MockSite(postings=10, churn=1) as site:
+            scraper = WorldBankGroupScraper(site.vacancies_url)
+            job = self._scrape(site)[0]
+
+            with mock.patch.object(scraper, 'get_locations', side_effect=lambda names: names):
+                detail = scraper.scrape_vacancy_details(FakeCompany(), job)
+
+            # postings of the previous generation are no longer listed
+            self._scrape(site)
+            with self.assertRaises(requests.HTTPError):
+                scraper.scrape_vacancy_details(FakeCompany(), job)
+
+        self.assertEqual(detail.role_title, f"{job.data['title']} | World Bank | req1")
+        self.assertTrue(1 <= len(detail.locations) <= 3)
@@ -0,0 +1,71 @@
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.test import SimpleTestCase, TestCase
+
+from jobs.models import Location, Opening
+from jobs.search import (
+    format_headline, openings_add_headlines, openings_nearby, openings_search
+)
+
+
+class SearchQueryTests(SimpleTestCase):
+
+    def test_search_parses_websearch_syntax_and_ranks_by_cover_density(self):
+        sql = str(openings_search(Opening.objects.all(), '"data science" -java').query)
+        self.assertIn('@@ websearch_to_tsquery(english::regconfig', sql)
+        self.assertIn('ts_rank_cd("jobs_opening"."tsdocument", websearch_to_tsquery(', sql)
+        self.assertTrue(sql.endswith('ORDER BY "rank" DESC, "jobs_opening"."id" ASC'))
+
+    def test_search_defers_descriptions(self):
+        sql = str(openings_search(Opening.objects.all(), 'economist').query)
+        self.assertNotIn('"jobs_opening"."description"', sql)
+
+    def test_nearby_searches_geography_without_distinct(self):
+        origin = Point(-77.05, 38.92, srid=4326)
+        sql = str(openings_nearby(Opening.objects.all(), origin, D(mi=10)).query)
+        self.assertIn('ST_DWithin(("jobs_location"."geom")::geography, ST_GeogFromText(', sql)
+        self.assertIn('GROUP BY "jobs_opening"."id"', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertTrue(sql.endswith('ORDER BY "distance" ASC, "jobs_opening"."id" ASC'))
+
+    def test_headline_text_escaped_and_matches_marked(self):
+        headline = format_headline('Research &amp; <mark>Economist</mark>  for  a <b> team')
+        self.assertEqual(
+            headline, 'Research &amp; <mark>Economist</mark> for a &lt;b&gt; team'
+        )
+
+
+class OpeningsSearchTestCase(TestCase):
+    fixtures = ['companies.json', 'locations.json', 'openings.json']
+
+    def test_openings_ranked_by_relevance(self):
+        openings = list(openings_search(Opening.objects.all(), 'ifc private sector'))
+        self.assertEqual(len(openings), 1)
+        self.assertIn('req8313', openings[0].role_title)
+
+        openings = list(openings_search(Opening.objects.all(), 'development -ifc'))
+        self.assertTrue(openings)
+        self.assertTrue(all('IFC' not in opening.role_title for opening in openings))
+        ranks = [opening.rank for opening in openings]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_headlines_added_for_given_openings(self):
+        openings = list(openings_search(Opening.objects.all(), 'reconstruction'))
+        openings_add_headlines(openings, 'reconstruction')
+        self.assertEqual(len(openings), 1)
+        self.assertIn('<mark>Reconstruction</mark>', openings[0].headline)
+
+    def test_nearby_openings_returned_once_nearest_first(self):
+        origin = Location.objects.get(name='Kyiv, Ukraine').geom
+        openings = list(openings_nearby(Opening.objects.all(), origin, D(mi=2000)))
+
+        ids = [opening.id for opening in openings]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertIn('req8313', openings[0].role_title)
+        self.assertEqual(openings[0].distance, 0)
+        distances = [opening.distance for opening in openings]
+        self.assertEqual(distances, sorted(distances))
+
+        origin = Location.objects.get(name='Washington, DC,United States').geom
+        openings = list(openings_nearby(Opening.objects.all(), origin, D(mi=10)))
+        self.assertEqual([opening.locations.get().geom for opening in openings], [origin])
@@ -1,16 +1,22 @@
 from django.contrib.gis.measure import D
-from django.core.paginator import Paginator
 from django.db import models
 from django.http import HttpRequest, QueryDict
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 
 from jobs.forms import SearchForm
-from jobs.models import Opening, Location
+from jobs.models import Opening
+from jobs.results import paginate_results
+from jobs.search import (
+    NEAREST_ORDERING, RANKED_ORDERING, openings_add_headlines, openings_nearby, openings_search
+)
 
 
 PAGE_SIZE = 25
 
+# ordering of listed openings, latest first
+LATEST_ORDERING = ('-date_active', '-id')
+
 
 @login_required
 def opening_list(request: HttpRequest):
@@ -29,36 +35,53 @@ def opening_list(request: HttpRequest):
     q = data.get('q')
     is_spatial = data.get('is_spatial') or False
     include_inactive = data.get('include_inactive') or False
+    location = data.get('location')
 
     openings = Opening.objects.all()
     if not include_inactive:
         openings = openings.filter(date_inactive__isnull=True)
 
-    if not is_spatial:
-        # perform full-text search if term provided
-        if q:
-            openings = openings.filter(tsdocument=q)
-    else:
-        location = data.get('location')
-        if not (q and location.geom):
-            locations = [location]
-        else:
-            locations = Location.objects.filter(
-                geom__distance_lte=(location.geom, D(mi=int(q)))
-            )
-
-        # filter openings by locations
-        openings = openings.filter(locations__in=locations).distinct()
-
-    # paginate results
-    openings = openings.order_by('id')
-    p = Paginator(openings, data.get('page_size') or PAGE_SIZE)
-    page = p.get_page(data.get('page') or 1)
+    is_ranked = bool(q) and not is_spatial
+    is_nearby = bool(q) and is_spatial and location.geom is not None
+    if is_ranked:
+        # perform full-text search ranked by relevance
+        openings = openings_search(openings, q)
+    elif is_nearby:
+        # find openings located within distance of the location, nearest first
+        openings = openings_nearby(openings, location.geom, D(mi=int(q)))
+    elif is_spatial:
+        locations = [location]
+        openings = openings.filter(locations=location)
+
+    # paginate results by keyset, following the last opening of the previous page;
+    # results are cached until jobs are next scraped
+    ordering = (
+        RANKED_ORDERING if is_ranked else NEAREST_ORDERING if is_nearby else LATEST_ORDERING
+    )
+    (page, count) = paginate_results(
+        openings, ordering, data.get('page_size') or PAGE_SIZE, data.get('after'),
+        key=(
+            ' '.join((q or '').lower().split()), is_spatial,
+            location.id if is_spatial and location else None, include_inactive
+        ),
+        filtered=bool(q) or is_spatial or not include_inactive
+    )
+
+    # highlight search terms within the openings on the page
+    if is_ranked:
+        openings_add_headlines(page, q)
+
+    # convert distances to the nearest location of openings to miles
+    if is_nearby:
+        for opening in page:
+            opening.distance_mi = D(m=opening.distance).mi
 
     # extract and return set query string values
     return render(request, 'jobs/list.html', {
         'locations': locations,
+        'nearby': is_nearby,
         'openings': page,
+        'count': count,
         'form': form
     })
 
@@ -73,7 +96,7 @@ def opening_show(request: HttpRequest, opening_id: int):
     :type opening_id: int
     """
     opening = get_object_or_404(Opening, pk=opening_id)
-    exclude_list = ('id', 'role_title', 'tsdocument', 'entry_hash')
+    exclude_list = ('id', 'role_title', 'tsdocument', 'entry_hash', 'content_hash')
 
     data = []
     for field in opening._meta.get_fields():
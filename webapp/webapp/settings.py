@@ -190,3 +190,68 @@ LOGGING = {
         'level': get_env_value('DJANGO_LOG_LEVEL', 'DEBUG')
     }
 }
+
+
+## Scraper
+# maximum number of vacancy details scraped concurrently by the scraping engine
+SCRAPER_MAX_IN_FLIGHT = int(get_env_value('SCRAPER_MAX_IN_FLIGHT', '4'))
+
+# requests per second and burst size allowed for each host scraped
+SCRAPER_RATE_LIMIT = float(get_env_value('SCRAPER_RATE_LIMIT', '0.5'))
+SCRAPER_RATE_BURST = int(get_env_value('SCRAPER_RATE_BURST', '2'))
+
+# indicates whether the Crawl-delay set within robots.txt of hosts should be honored
+SCRAPER_RESPECT_ROBOTS = get_env_value('SCRAPER_RESPECT_ROBOTS', 'true').lower() == 'true'
+
+# connections kept alive for each host scraped and seconds to wait for a response
+SCRAPER_POOL_SIZE = int(get_env_value('SCRAPER_POOL_SIZE', '10'))
+SCRAPER_TIMEOUT = float(get_env_value('SCRAPER_TIMEOUT', '30'))
+
+# directory and maximum size (in megabytes) of the on-disk cache of scraped pages
+SCRAPER_CACHE_DIR = get_env_value('SCRAPER_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'http'))
+SCRAPER_CACHE_SIZE = int(get_env_value('SCRAPER_CACHE_SIZE', '256'))
+
+# hours after which details of known openings are scraped again to verify them
+SCRAPER_VERIFY_MAX_AGE = int(get_env_value('SCRAPER_VERIFY_MAX_AGE', '72'))
+
+# number of new openings persisted together within a single transaction
+SCRAPER_BATCH_SIZE = int(get_env_value('SCRAPER_BATCH_SIZE', '100'))
+
+# maximum number of location names kept in memory for resolving scraped locations
+SCRAPER_LOCATIONS_CACHE_SIZE = int(get_env_value('SCRAPER_LOCATIONS_CACHE_SIZE', '10000'))
+
+# maximum number of browser pages (tabs) open at once for rendering javascript pages
+SCRAPER_BROWSER_PAGES = int(get_env_value('SCRAPER_BROWSER_PAGES', '2'))
+
+# maximum number of items queued between the stages of the scraping pipeline
+SCRAPER_QUEUE_SIZE = int(get_env_value('SCRAPER_QUEUE_SIZE', '100'))
+
+# hours after which all listings of a company are scraped again; listings scraped in between
+# stop once the given number of consecutive pages list only known openings
+SCRAPER_FULL_SCRAPE_INTERVAL = int(get_env_value('SCRAPER_FULL_SCRAPE_INTERVAL', '72'))
+SCRAPER_INCREMENTAL_PAGES = int(get_env_value('SCRAPER_INCREMENTAL_PAGES', '2'))
+
+# files to which per-stage timing metrics of scrape runs are exported as JSON and in the
+# Prometheus text format; point the latter into the node exporter textfile collector directory
+SCRAPER_METRICS_JSON = get_env_value(
+    'SCRAPER_METRICS_JSON', os.path.join(BASE_DIR, 'metrics', 'scrape.json')
+)
+SCRAPER_METRICS_TEXTFILE = get_env_value(
+    'SCRAPER_METRICS_TEXTFILE', os.path.join(BASE_DIR, 'metrics', 'jobscraper.prom')
+)
+
+
+## Search
+# number of matching openings up to which search results are counted exactly; beyond it,
+# their number is estimated by the query planner
+SEARCH_COUNT_THRESHOLD = int(get_env_value('SEARCH_COUNT_THRESHOLD', '1000'))
+
+# maximum number of searches whose results are cached in memory, and of matching openings
+# cached for each search; cached results are invalidated once jobs are scraped
+SEARCH_CACHE_SIZE = int(get_env_value('SEARCH_CACHE_SIZE', '256'))
+SEARCH_CACHE_MAX_RESULTS = int(get_env_value('SEARCH_CACHE_MAX_RESULTS', '1000'))
+
+# file holding the version of scraped data, replaced by the scraping engine once done
+SEARCH_DATA_VERSION_FILE = get_env_value(
+    'SEARCH_DATA_VERSION_FILE', os.path.join(BASE_DIR, 'cache', 'data_version')
+)